@@ -1,29 +1,41 @@
-
 import streamlit as st
+import asyncio
+import logging
 import os
 import time
-import openai
 
 from dotenv import load_dotenv
 
 # =======================
 # LangChain / LLM Imports
 # =======================
-from langchain_groq import ChatGroq
+## langchain, FAISS, the embedding model and the Groq client are imported inside the
+## functions that use them, so the first page paint does not wait on them
 #from langchain_openai import OpenAIEmbeddings
-from langchain_huggingface import HuggingFaceEmbeddings
-
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rag_common.config import Config
+from rag_common import async_runtime
+from rag_common.shared_store import SharedIndex
+from rag_common.answer_cache import AnswerCache, context_key
+from rag_common.streaming import StreamTimer
+from rag_common.tracing import Tracer, span
+from rag_common.warmup import Warmup, import_modules
 
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains.retrieval import create_retrieval_chain
+## Answer latency (TTFT, total) and per-file PDF parse timings are reported through logging
+logging.basicConfig(level=logging.INFO,format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger=logging.getLogger(__name__)
 
-from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import PyPDFDirectoryLoader
+HEAVY_MODULES=[
+    "rag_common.llm_client" if Config.LLM_CLIENT=="pooled" else "langchain_groq",
+    "langchain_text_splitters",
+    "langchain.chains.combine_documents",
+    "rag_common.doc_index",
+    "rag_common.context",
+    "rag_common.trace_callbacks",
+]
 
 
 
@@ -38,55 +50,189 @@ os.environ['GROQ_API_KEY']=os.getenv("GROQ_API_KEY")
 
 groq_api_key=os.getenv("GROQ_API_KEY")
 
-llm=ChatGroq(groq_api_key=groq_api_key,model_name="llama-3.1-8b-instant")
-
-prompt=ChatPromptTemplate.from_template(
-    """
-    Answer the questions based on the provided context only.
-    Please provide the most accurate response based on the question
-    <context>
-    {context}
-    <context>
-    Question:{input}
-
-    """
-
-)
+## One client per process; with RAG_LLM_CLIENT=pooled a shared connection pool paced to the key's quotas, with retries
+@st.cache_resource
+def get_llm():
+    if Config.LLM_CLIENT=="pooled":
+        from rag_common.llm_client import chat_model
+        return chat_model(groq_api_key)
+    from langchain_groq import ChatGroq
+    return ChatGroq(groq_api_key=groq_api_key,model_name=Config.LLM_MODEL)
+
+@st.cache_resource
+def get_document_chain():
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from rag_common.doc_index import PROMPT_TEMPLATE
+    prompt=ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
+    return create_stuff_documents_chain(get_llm(),prompt)
+
+DOCS_DIR="research_papers"
+
+## The embedding model and index are built once per process and shared by all sessions
+@st.cache_resource
+def get_embeddings():
+    from rag_common.embedding_cache import cached_huggingface_embeddings
+    return cached_huggingface_embeddings(
+        Config.EMBEDDING_MODEL,Config.EMBED_CACHE_DIR,Config.EMBED_BATCH_SIZE,Config.EMBED_CACHE_DTYPE,Config.EMBEDDING_SERVER)
+
+def load_retrieval_index():
+    ## Ingest (incremental or full), ANN conversion and BM25, all cached next to the index
+    from rag_common import doc_index
+    return doc_index.load_retrieval_index(DOCS_DIR,get_embeddings())
+
+@st.cache_resource
+def get_shared_index():
+    return SharedIndex(load_retrieval_index)
+
+@st.cache_resource
+def get_answer_cache():
+    return AnswerCache(Config.ANSWER_CACHE_THRESHOLD,Config.ANSWER_CACHE_TTL,Config.ANSWER_CACHE_SIZE)
+
+shared_index=get_shared_index()
+answer_cache=get_answer_cache()
+
+@st.cache_resource
+def get_tracer():
+    return Tracer(Config.TRACE_FILE,Config.TRACE_WINDOW)
+
+tracer=get_tracer()
+
+@st.cache_resource
+def get_reranker():
+    from rag_common.rerank import CrossEncoderReranker
+    return CrossEncoderReranker(Config.RERANK_MODEL,Config.RETRIEVER_K)
+
+@st.cache_resource
+def get_context_processor():
+    from rag_common.context import ContextProcessor
+    return ContextProcessor(
+        get_embeddings() if Config.CONTEXT_MAX_SENTENCES else None,Config.CONTEXT_MERGE,Config.CONTEXT_DEDUP_THRESHOLD,Config.CONTEXT_MAX_SENTENCES)
+
+def load_cached_index():
+    ## Load a previously built index (or its shards) instead of waiting for the button
+    from rag_common import doc_index
+    if shared_index.get() is None and doc_index.has_cached_index():
+        shared_index.ensure_built()
+
+## Runs once per process: imports, the embedding model and a cached index load in the background
+@st.cache_resource
+def start_warmup():
+    return Warmup([
+        ("imports",lambda: import_modules(HEAVY_MODULES)),
+        ("embeddings",get_embeddings),
+        ("index",load_cached_index),
+    ]).start()
+
+async def aretrieve(user_prompt,retriever,chain_config,reranker,context_processor,query_embedding):
+    ## Runs on the shared event loop; CPU-bound steps go to worker threads
+    context=await retriever.ainvoke(user_prompt,config=chain_config,embedding=query_embedding)
+    if reranker is not None:
+        context=await asyncio.to_thread(reranker.rerank,user_prompt,context)
+    return await asyncio.to_thread(context_processor.process,context,user_prompt)
 
 def create_vector_embedding():
-    if "vectors" not in st.session_state:
-        st.session_state.embeddings=HuggingFaceEmbeddings()
-        st.session_state.loader=PyPDFDirectoryLoader("research_papers") ## Data Ingestion step
-        st.session_state.docs=st.session_state.loader.load() ## Document Loading
-        st.session_state.text_splitter=RecursiveCharacterTextSplitter(chunk_size=1000,chunk_overlap=200)
-        st.session_state.final_documents=st.session_state.text_splitter.split_documents(st.session_state.docs[:50])
-        st.session_state.vectors=FAISS.from_documents(st.session_state.final_documents,st.session_state.embeddings)
+    ## First click builds the shared index; later clicks rebuild it and swap it in
+    if shared_index.get() is None:
+        shared_index.ensure_built()
+    else:
+        shared_index.rebuild()
+
 st.title("RAG Document Q&A With Groq And Lama3")
 
+if Config.WARMUP:
+    start_warmup()
+
 user_prompt=st.text_input("Enter your query from the research paper")
 
 if st.button("Document Embedding"):
     create_vector_embedding()
     st.write("Vector Database is ready")
 
-import time
-
-if user_prompt:
-    document_chain=create_stuff_documents_chain(llm,prompt)
-    retriever=st.session_state.vectors.as_retriever()
-    retrieval_chain=create_retrieval_chain(retriever,document_chain)
-
-    start=time.process_time()
-    response=retrieval_chain.invoke({'input':user_prompt})
-    print(f"Response time :{time.process_time()-start}")
-
-    st.write(response['answer'])
-
-    ## With a streamlit expander
-    with st.expander("Document similarity Search"):
-        for i,doc in enumerate(response['context']):
-            st.write(doc.page_content)
-            st.write('------------------------')
+if user_prompt and shared_index.get() is None:
+    ## Waits for the warm-up if it is still loading the index
+    load_cached_index()
+
+if user_prompt and shared_index.get() is None:
+    st.warning("Click \"Document Embedding\" to build the vector database first")
+elif user_prompt:
+    from rag_common.trace_callbacks import TracingCallbackHandler
+    document_chain=get_document_chain()
+    context_processor=get_context_processor()
+    index,index_version=shared_index.snapshot()
+    retriever=index.as_retriever()
+
+    with tracer.trace("query",index_version=index_version) as trace:
+        chain_config={"callbacks":[TracingCallbackHandler(trace)]}
+        ## Wall-clock time, so the network wait for the LLM is included
+        start=time.perf_counter()
+        ## The question is embedded once, for both the vector search and the answer cache
+        query_embedding=get_embeddings().embed_query(user_prompt) if Config.ANSWER_CACHE else None
+        ## Retrieve first so the answer cache can check the context is identical
+        if Config.ASYNC_CHAINS:
+            context=async_runtime.run(aretrieve(
+                user_prompt,retriever,chain_config,
+                get_reranker() if Config.RERANK else None,context_processor,query_embedding))
+        else:
+            context=retriever.invoke(user_prompt,config=chain_config,embedding=query_embedding)
+            if Config.RERANK:
+                ## Score the candidate set in one cross-encoder batch and keep the best few
+                context=get_reranker().rerank(user_prompt,context)
+            ## Merge overlapping chunks and drop repeats before they reach the prompt
+            context=context_processor.process(context,user_prompt)
+        answer=None
+        if Config.ANSWER_CACHE:
+            with span("answer_cache") as cache_span:
+                answer=answer_cache.lookup(query_embedding,context_key(context),index_version)
+                cache_span["cache_hit"]=answer is not None
+        cached=answer is not None
+        if cached:
+            with span("render"):
+                st.write(answer)
+                st.caption(f"Answered from cache in {time.perf_counter()-start:.2f}s")
+        elif Config.STREAM_ANSWERS:
+            ## Tokens are rendered while they stream, so render overlaps the llm span here
+            with span("render",streamed=True):
+                inputs={'input':user_prompt,'context':context}
+                if Config.ASYNC_CHAINS:
+                    stream=async_runtime.iterate(document_chain.astream(inputs,config=chain_config))
+                else:
+                    stream=document_chain.stream(inputs,config=chain_config)
+                timer=StreamTimer(stream,start)
+                answer=st.write_stream(timer)
+            timer.log()
+            st.caption(timer.summary())
+        else:
+            inputs={'input':user_prompt,'context':context}
+            if Config.ASYNC_CHAINS:
+                answer=async_runtime.run(document_chain.ainvoke(inputs,config=chain_config))
+            else:
+                answer=document_chain.invoke(inputs,config=chain_config)
+            with span("render"):
+                st.write(answer)
+            st.caption(f"Response time {time.perf_counter()-start:.2f}s")
+        if not cached and Config.ANSWER_CACHE:
+            answer_cache.store(query_embedding,context_key(context),answer,index_version)
+        response={'input':user_prompt,'context':context,'answer':answer}
+        logger.info("Response time: %.2fs",time.perf_counter()-start)
+
+        ## With a streamlit expander
+        with span("render",chunks=len(context)):
+            with st.expander("Document similarity Search"):
+                for i,doc in enumerate(response['context']):
+                    st.write(doc.page_content)
+                    ## Near-duplicate copies were collapsed into this chunk at ingest; cite them too
+                    if doc.metadata.get("duplicates"):
+                        st.caption("Also in: "+"; ".join(f"{os.path.basename(str(d.get('source')))} p.{d.get('page')}" for d in doc.metadata["duplicates"]))
+                    st.write('------------------------')
+
+## Rolling per-stage latency over the most recent questions
+with st.sidebar.expander("Latency breakdown"):
+    breakdown=tracer.breakdown()
+    if breakdown:
+        st.dataframe(breakdown,hide_index=True)
+    else:
+        st.caption("No queries traced yet")
 
 
 
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Compare ANN index types against the exact flat index for a built corpus.
+
+Reads the flat index saved by the app (faiss_index/index.faiss), builds each
+requested index type from the same vectors and reports recall@k against
+exact search, p50/p99 single-query latency, build time and index memory.
+
+Examples:
+    python scripts/ann_report.py
+    python scripts/ann_report.py --types ivf_flat,hnsw --nprobe 4,16,64 --ef-search 32,128
+    python scripts/ann_report.py --synthetic 200000 --dim 768
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+root = Path(__file__).resolve().parents[2]
+sys.path.append(str(root))
+from rag_common.index_factory import IndexSpec, build_from, index_memory_bytes
+
+
+def int_list(value):
+    return [int(v) for v in value.split(",")]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--index-dir", default=str(Path(__file__).resolve().parents[1] / "faiss_index"))
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random vectors instead of a saved index")
+    parser.add_argument("--dim", type=int, default=768, help="Dimension for --synthetic")
+    parser.add_argument("--types", default="flat,ivf_flat,ivf_pq,hnsw")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int_list, default=[16])
+    parser.add_argument("--pq-m", type=int, default=32)
+    parser.add_argument("--pq-nbits", type=int, default=8)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-search", type=int_list, default=[64])
+    return parser.parse_args()
+
+
+def load_flat(args):
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        flat = faiss.IndexFlatL2(args.dim)
+        flat.add(rng.standard_normal((args.synthetic, args.dim)).astype(np.float32))
+        return flat
+    path = os.path.join(args.index_dir, "index.faiss")
+    if not os.path.exists(path):
+        print("Index not found:", path)
+        raise SystemExit(1)
+    return faiss.read_index(path)
+
+
+def make_queries(flat, count):
+    """Perturbed copies of stored vectors, so queries land inside the real distribution."""
+    rng = np.random.default_rng(1)
+    rows = rng.choice(flat.ntotal, min(count, flat.ntotal), replace=False)
+    base = np.vstack([flat.reconstruct(int(i)) for i in rows])
+    noise = rng.standard_normal(base.shape).astype(np.float32) * base.std() * 0.1
+    return base + noise
+
+
+def measure(index, queries, truth, k):
+    latencies = []
+    hits = 0
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, labels = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(labels[0]) & set(truth[i]))
+    return hits / (len(queries) * k), np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    args = parse_args()
+    flat = load_flat(args)
+    queries = make_queries(flat, args.queries)
+    _, truth = flat.search(queries, args.k)
+    print(f"Corpus: {flat.ntotal} vectors x {flat.d} dims, {len(queries)} queries, k={args.k}\n")
+    print(f"{'index':<56} {'recall@k':>8} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'MB':>8}")
+
+    for kind in args.types.split(","):
+        spec = IndexSpec(kind, nlist=args.nlist, pq_m=args.pq_m, pq_nbits=args.pq_nbits,
+                         hnsw_m=args.hnsw_m, ef_construction=args.ef_construction)
+        start = time.perf_counter()
+        index = build_from(flat, spec)
+        build_seconds = time.perf_counter() - start
+        megabytes = index_memory_bytes(index) / 1e6
+
+        # Search-time knobs are swept without rebuilding
+        sweep = [{}]
+        if kind.startswith("ivf"):
+            sweep = [{"nprobe": n} for n in args.nprobe]
+        elif kind == "hnsw":
+            sweep = [{"efSearch": ef} for ef in args.ef_search]
+        for params in sweep:
+            if "nprobe" in params:
+                faiss.extract_index_ivf(index).nprobe = params["nprobe"]
+            if "efSearch" in params:
+                index.hnsw.efSearch = params["efSearch"]
+            recall, p50, p99 = measure(index, queries, truth, args.k)
+            settings = {**spec.build_params(), **params}
+            settings.pop("kind")
+            label = " ".join([kind] + [f"{name}={value}" for name, value in settings.items()])
+            print(f"{label:<56} {recall:>8.3f} {p50:>8.3f} {p99:>8.3f} {build_seconds:>8.2f} {megabytes:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Answer a JSONL file of questions against the 2.RAG index, without the UI.
+
+Loads (or incrementally updates) the same persisted index the app uses,
+retrieves context for all questions in one batch, then calls the LLM
+asynchronously with bounded concurrency and a requests-per-minute limit.
+Every answer is written to the output JSONL with its context and timings.
+
+Input lines look like ``{"id": "q1", "question": "What is ...?"}``; extra
+fields are copied to the output.
+
+Examples:
+    python scripts/batch_query.py questions.jsonl
+    python scripts/batch_query.py questions.jsonl -o answers.jsonl --concurrency 16 --rpm 300
+    python scripts/batch_query.py questions.jsonl --fake-llm   # retrieval only, no API calls
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+
+app_dir = Path(__file__).resolve().parents[1]
+sys.path.append(str(app_dir.parent))
+from rag_common import batch, doc_index
+from rag_common.config import Config
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("questions", help="JSONL file with one question per line")
+    parser.add_argument("-o", "--output", help="Output JSONL (default: <questions>.answers.jsonl)")
+    parser.add_argument("--docs-dir", default=str(app_dir / "research_papers"))
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM calls in flight")
+    parser.add_argument("--rpm", type=float, default=30, help="LLM requests per minute (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=2, help="Extra attempts per failed LLM call")
+    parser.add_argument("--model", default=Config.LLM_MODEL)
+    parser.add_argument("--fake-llm", action="store_true", help="Use a local fake chat model (dry run)")
+    return parser.parse_args()
+
+
+def client_paced(args):
+    """Whether the LLM client enforces ``--rpm`` and ``--retries`` itself (the pooled Groq client)."""
+    return not args.fake_llm and Config.LLM_CLIENT == "pooled"
+
+
+def make_llm(args):
+    if args.fake_llm:
+        from rag_common.fakes import FakeChatModel
+
+        return FakeChatModel(first_token_latency=0.05)
+    if client_paced(args):
+        from rag_common.llm_client import PooledChatGroq, shared_client
+
+        settings = {**Config.llm_client_settings(), "requests_per_minute": args.rpm, "max_retries": args.retries}
+        return PooledChatGroq(client=shared_client(os.getenv("GROQ_API_KEY"), **settings), model_name=args.model)
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(groq_api_key=os.getenv("GROQ_API_KEY"), model_name=args.model)
+
+
+def make_postprocess(embeddings):
+    """Reranking and context compression exactly as the app applies them."""
+    from rag_common.context import ContextProcessor
+
+    reranker = None
+    if Config.RERANK:
+        from rag_common.rerank import CrossEncoderReranker
+
+        reranker = CrossEncoderReranker(Config.RERANK_MODEL, Config.RETRIEVER_K)
+    processor = ContextProcessor(
+        embeddings if Config.CONTEXT_MAX_SENTENCES else None,
+        Config.CONTEXT_MERGE, Config.CONTEXT_DEDUP_THRESHOLD, Config.CONTEXT_MAX_SENTENCES,
+    )
+
+    def postprocess(question, documents):
+        if reranker is not None:
+            documents = reranker.rerank(question, documents)
+        return processor.process(documents, question)
+
+    return postprocess
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = parse_args()
+    questions = os.path.abspath(args.questions)
+    output = os.path.abspath(args.output or os.path.splitext(questions)[0] + ".answers.jsonl")
+    docs_dir = os.path.abspath(args.docs_dir)
+    # Cache paths in Config are relative to the app folder, where the app runs
+    os.chdir(app_dir)
+
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from langchain_core.prompts import ChatPromptTemplate
+    from rag_common.embedding_cache import cached_huggingface_embeddings
+
+    items = batch.read_questions(questions)
+    embeddings = cached_huggingface_embeddings(
+        Config.EMBEDDING_MODEL, Config.EMBED_CACHE_DIR, Config.EMBED_BATCH_SIZE, Config.EMBED_CACHE_DTYPE,
+        Config.EMBEDDING_SERVER)
+    index = doc_index.load_retrieval_index(docs_dir, embeddings)
+    if index is None:
+        print("No PDFs found in", docs_dir)
+        raise SystemExit(1)
+    chain = create_stuff_documents_chain(make_llm(args), ChatPromptTemplate.from_template(doc_index.PROMPT_TEMPLATE))
+
+    # The pooled client already paces to the quota and backs off on 429/5xx; do not do it twice
+    paced = client_paced(args)
+    summary = batch.run_batch(
+        index, chain, items, output,
+        concurrency=args.concurrency, requests_per_minute=0 if paced else args.rpm,
+        retries=0 if paced else args.retries,
+        postprocess=make_postprocess(embeddings),
+    )
+    print(json.dumps(summary, indent=2))
+    print("Answers written to", output)
+
+
+if __name__ == "__main__":
+    main()
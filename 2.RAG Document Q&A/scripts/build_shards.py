@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Build, update or rebuild the shards of the 2.RAG index, without the UI.
+
+Uses the app's settings, so ``RAG_SHARDS`` (2 or more) must be set the same
+way the app runs. By default every shard is brought up to date
+incrementally. ``--shard`` restricts the run to some shards, and
+``--rebuild`` drops those shards' caches and re-embeds their PDFs from
+scratch, leaving the other shards untouched.
+
+Examples:
+    RAG_SHARDS=8 python scripts/build_shards.py
+    RAG_SHARDS=8 python scripts/build_shards.py --shard 3 --rebuild
+    RAG_SHARDS=8 python scripts/build_shards.py --list
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+app_dir = Path(__file__).resolve().parents[1]
+sys.path.append(str(app_dir.parent))
+from rag_common import doc_index, index_cache, shards
+from rag_common.config import Config
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--docs-dir", default=str(app_dir / "research_papers"))
+    parser.add_argument("--shard", type=int, action="append", help="Shard number (repeatable; default: all)")
+    parser.add_argument("--rebuild", action="store_true", help="Re-embed the selected shards from scratch")
+    parser.add_argument("--list", action="store_true", help="Only print which PDFs belong to which shard")
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = parse_args()
+    if Config.SHARDS < 2:
+        raise SystemExit("Set RAG_SHARDS to 2 or more to use a sharded index")
+    docs_dir = os.path.abspath(args.docs_dir)
+    # Cache paths in Config are relative to the app folder, where the app runs
+    os.chdir(app_dir)
+
+    groups = shards.partition(index_cache.list_pdfs(docs_dir), Config.SHARDS)
+    selected = args.shard if args.shard is not None else range(Config.SHARDS)
+    for shard in selected:
+        if not 0 <= shard < Config.SHARDS:
+            raise SystemExit(f"Shard {shard} out of range 0..{Config.SHARDS - 1}")
+    if args.list:
+        for shard in selected:
+            print(f"{shard:3d}  {len(groups[shard]):4d} PDFs  {', '.join(groups[shard])}")
+        return
+
+    from rag_common.embedding_cache import cached_huggingface_embeddings
+
+    embeddings = cached_huggingface_embeddings(
+        Config.EMBEDDING_MODEL, Config.EMBED_CACHE_DIR, Config.EMBED_BATCH_SIZE, Config.EMBED_CACHE_DTYPE,
+        Config.EMBEDDING_SERVER)
+    for shard in selected:
+        start = time.perf_counter()
+        index, report = doc_index.update_shard(docs_dir, embeddings, shard, groups[shard], rebuild=args.rebuild)
+        summary = {
+            "shard": shard,
+            "pdfs": len(groups[shard]),
+            "chunks": len(index.vectors.index_to_docstore_id) if index is not None else 0,
+            "seconds": round(time.perf_counter() - start, 2),
+            **report,
+        }
+        print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Export the 2.RAG index as a single-file snapshot for serving nodes.
+
+Builds (or incrementally updates) the index exactly as the app would, with
+the app's settings, then packs it into one versioned, checksummed file (see
+``rag_common.snapshot``). With ``RAG_SHARDS`` set, every non-empty shard is
+written to its own file, ``<stem>-003-of-008<ext>``. Serving nodes then set
+``RAG_SNAPSHOT`` to the same path and open the file instead of ingesting the
+PDFs. The export is read back and checked before the script reports it.
+
+Examples:
+    python scripts/export_snapshot.py --output /srv/rag/index.ragsnap
+    RAG_SHARDS=8 python scripts/export_snapshot.py --output /srv/rag/index.ragsnap
+    python scripts/export_snapshot.py --info /srv/rag/index.ragsnap
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+app_dir = Path(__file__).resolve().parents[1]
+sys.path.append(str(app_dir.parent))
+from rag_common import doc_index, index_cache, shards, snapshot
+from rag_common.config import Config
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default=Config.SNAPSHOT or str(app_dir / "index.ragsnap"))
+    parser.add_argument("--docs-dir", default=str(app_dir / "research_papers"))
+    parser.add_argument("--info", metavar="PATH", help="Only print the manifest of an existing snapshot")
+    return parser.parse_args()
+
+
+def summarize(path, seconds):
+    start = time.perf_counter()
+    opened = snapshot.Snapshot(path, verify=True)
+    manifest = opened.manifest
+    return {
+        "path": path,
+        "chunks": manifest["chunks"],
+        "index": manifest["index"]["type"],
+        "bm25": "bm25.terms" in opened,
+        "mb": round(os.path.getsize(path) / 1e6, 2),
+        "export_s": round(seconds, 2),
+        "open_and_verify_s": round(time.perf_counter() - start, 3),
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = parse_args()
+    if args.info:
+        manifest = snapshot.Snapshot(args.info, verify=True).manifest
+        manifest["sections"] = {name: section["nbytes"] for name, section in manifest["sections"].items()}
+        print(json.dumps(manifest, indent=2))
+        return
+    docs_dir = os.path.abspath(args.docs_dir)
+    output = os.path.abspath(args.output)
+    # Cache paths in Config are relative to the app folder, where the app runs
+    os.chdir(app_dir)
+
+    from rag_common.embedding_cache import cached_huggingface_embeddings
+
+    embeddings = cached_huggingface_embeddings(
+        Config.EMBEDDING_MODEL, Config.EMBED_CACHE_DIR, Config.EMBED_BATCH_SIZE, Config.EMBED_CACHE_DTYPE,
+        Config.EMBEDDING_SERVER)
+    if Config.SHARDS > 1:
+        groups = shards.partition(index_cache.list_pdfs(docs_dir), Config.SHARDS)
+        targets = [(doc_index.snapshot_path(shard, output),
+                    lambda shard=shard: doc_index.update_shard(docs_dir, embeddings, shard, groups[shard])[0])
+                   for shard in range(Config.SHARDS)]
+    else:
+        def build():
+            vectors = doc_index.load_vector_index(docs_dir, embeddings)
+            return doc_index.retrieval_index(vectors, Config.INDEX_CACHE_DIR) if vectors is not None else None
+        targets = [(output, build)]
+
+    for path, build in targets:
+        start = time.perf_counter()
+        index = build()
+        if index is None:
+            # An empty shard is not exported; drop an older file so nodes do not serve stale chunks
+            if os.path.exists(path):
+                os.remove(path)
+            print(json.dumps({"path": path, "chunks": 0, "skipped": True}))
+            continue
+        snapshot.export_snapshot(index, path, embeddings, Config.EMBEDDING_MODEL, doc_index.build_settings())
+        print(json.dumps(summarize(path, time.perf_counter() - start)))
+
+
+if __name__ == "__main__":
+    main()
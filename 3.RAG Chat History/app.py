@@ -2,38 +2,140 @@
 
 ## RAG Q&A Conversation With PDF Including Chat History
 import streamlit as st
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_chroma import Chroma
-from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_groq import ChatGroq
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
-from chromadb import Client
-from chromadb.config import Settings
+import asyncio
+import hashlib
+import logging
 import os
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rag_common.config import Config
+from rag_common import async_runtime
+from rag_common.tracing import Tracer, span
+from rag_common.warmup import Warmup, import_modules
+## langchain, Chroma, the embedding model and the Groq client are imported where they
+## are used, so the first page paint does not wait on them
+
+## Parse timings, cache statistics and LLM retries are reported through logging
+logging.basicConfig(level=logging.INFO,format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
 from dotenv import load_dotenv
 load_dotenv()
 
 os.environ['HF_TOKEN']=os.getenv("HF_TOKEN")
-embeddings=HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
 
+HEAVY_MODULES=[
+    "rag_common.llm_client" if Config.LLM_CLIENT=="pooled" else "langchain_groq",
+    "langchain_chroma",
+    "langchain_text_splitters",
+    "langchain.chains",
+    "langchain_community.chat_message_histories",
+    "langchain_core.runnables.history",
+    "rag_common.pdf_loader",
+    "rag_common.context",
+    "rag_common.trace_callbacks",
+]
+
+## The embedding model is loaded once per process, not on every rerun
+@st.cache_resource
+def get_embeddings():
+    from rag_common.embedding_cache import cached_huggingface_embeddings
+    return cached_huggingface_embeddings("all-MiniLM-L6-v2",Config.EMBED_CACHE_DIR,Config.EMBED_BATCH_SIZE,Config.EMBED_CACHE_DTYPE,Config.EMBEDDING_SERVER)
+
+## Uploads are parsed, split and embedded once per distinct set of files; widget reruns reuse the store
+@st.cache_resource(max_entries=8)
+def get_vectorstore(upload_key,_uploaded_files):
+    from chromadb import Client
+    from chromadb.config import Settings
+    from langchain_chroma import Chroma
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from rag_common.pdf_loader import ParallelPDFLoader
+    from rag_common.splitter import TokenAwareSplitter,load_tokenizer
+
+    ## Write every upload to its own temp file, then parse them in parallel
+    upload_dir=tempfile.mkdtemp(prefix="rag_uploads_")
+    temp_paths={}
+    for i,uploaded_file in enumerate(_uploaded_files):
+        temppdf=os.path.join(upload_dir,f"{i}.pdf")
+        with open(temppdf,"wb") as file:
+            file.write(uploaded_file.getvalue())
+        temp_paths[temppdf]=uploaded_file.name
+
+    loader=ParallelPDFLoader(list(temp_paths),Config.PDF_WORKERS,Config.PDF_PAGES_PER_TASK,source_names=temp_paths)
+    documents=loader.load()
+    shutil.rmtree(upload_dir,ignore_errors=True)
+    timings=[(temp_paths[path],timing) for path,timing in loader.timings.items()]
+
+    # Split and create embeddings for the documents
+    if Config.SPLITTER=="token":
+        ## About 5000/500 characters, measured in the embedding model's own tokens
+        text_splitter=TokenAwareSplitter(load_tokenizer("sentence-transformers/all-MiniLM-L6-v2"),chunk_size=1250,chunk_overlap=125)
+    else:
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=5000, chunk_overlap=500)
+    splits = text_splitter.split_documents(documents)
+
+    client = Client(
+        Settings(
+            persist_directory="./chroma_db",
+            anonymized_telemetry=False
+        ),
+        tenant="default_tenant",
+        database="default_database"
+    )
+    ## One collection per upload set; stable ids make re-adding after a restart an upsert
+    vectorstore = Chroma.from_documents(
+        documents=splits,
+        embedding=get_embeddings(),
+        ids=[f"{upload_key[:16]}-{i}" for i in range(len(splits))],
+        client=client,
+        collection_name=f"rag_{upload_key[:16]}"
+    )
+    #vectorstore = Chroma.from_documents(documents=splits, embedding=embeddings)
+    return vectorstore,timings
+
+
+## One LLM client per API key, kept across reruns and sessions instead of a new one on every rerun
+@st.cache_resource(max_entries=16)
+def get_llm(api_key):
+    if Config.LLM_CLIENT=="pooled":
+        from rag_common.llm_client import chat_model
+        return chat_model(api_key)
+    from langchain_groq import ChatGroq
+    return ChatGroq(groq_api_key=api_key,model_name=Config.LLM_MODEL)
 
 ## set up Streamlit 
+@st.cache_resource
+def get_tracer():
+    return Tracer(Config.TRACE_FILE,Config.TRACE_WINDOW)
+
+tracer=get_tracer()
+
+@st.cache_resource
+def get_reranker():
+    from rag_common.rerank import CrossEncoderReranker
+    return CrossEncoderReranker(Config.RERANK_MODEL,Config.RETRIEVER_K)
+
+## Runs once per process: imports and the embedding model load in the background
+@st.cache_resource
+def start_warmup():
+    return Warmup([
+        ("imports",lambda: import_modules(HEAVY_MODULES)),
+        ("embeddings",get_embeddings),
+    ]).start()
+
 st.title("Conversational RAG With PDF uplaods and chat history")
 st.write("Upload Pdf's and chat with their content")
 
+if Config.WARMUP:
+    start_warmup()
+
 ## Input the Groq API Key
 api_key=st.text_input("Enter your Groq API key:",type="password")
 
 ## Check if groq api key is provided
 if api_key:
-    llm=ChatGroq(groq_api_key=api_key,model_name="llama-3.1-8b-instant")
+    llm=get_llm(api_key)
 
     ## chat interface
 
@@ -46,37 +148,26 @@ if api_key:
     uploaded_files=st.file_uploader("Choose A PDf file",type="pdf",accept_multiple_files=True)
     ## Process uploaded  PDF's
     if uploaded_files:
-        documents=[]
+        from langchain.chains import create_history_aware_retriever, create_retrieval_chain
+        from langchain.chains.combine_documents import create_stuff_documents_chain
+        from langchain_community.chat_message_histories import ChatMessageHistory
+        from langchain_core.chat_history import BaseChatMessageHistory
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+        from langchain_core.runnables import RunnableLambda
+        from langchain_core.runnables.history import RunnableWithMessageHistory
+        from rag_common.context import ContextProcessor
+        from rag_common.trace_callbacks import TracingCallbackHandler
+
+        upload_digest=hashlib.sha256()
         for uploaded_file in uploaded_files:
-            temppdf=f"./temp.pdf"
-            with open(temppdf,"wb") as file:
-                file.write(uploaded_file.getvalue())
-                file_name=uploaded_file.name
+            upload_digest.update(uploaded_file.name.encode("utf-8"))
+            upload_digest.update(hashlib.sha256(uploaded_file.getvalue()).digest())
+        vectorstore,timings=get_vectorstore(upload_digest.hexdigest(),uploaded_files)
+        for name,timing in timings:
+            st.caption(f"Parsed {name}: {timing['pages']} pages in {timing['seconds']:.2f}s")
 
-            loader=PyPDFLoader(temppdf)
-            docs=loader.load()
-            documents.extend(docs)
-
-    # Split and create embeddings for the documents
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=5000, chunk_overlap=500)
-        splits = text_splitter.split_documents(documents)
-        
-        client = Client(
-            Settings(
-                persist_directory="./chroma_db",
-                anonymized_telemetry=False
-            ),
-            tenant="default_tenant",
-            database="default_database"
-        )
-        vectorstore = Chroma.from_documents(
-            documents=splits,
-            embedding=embeddings,
-            client=client,
-            collection_name="rag_collection"
-        )   
-        #vectorstore = Chroma.from_documents(documents=splits, embedding=embeddings)
-        retriever = vectorstore.as_retriever()    
+        retriever = vectorstore.as_retriever(search_kwargs={"k": Config.retrieval_k()})    
 
         contextualize_q_system_prompt=(
             "Given a chat history and the latest user question"
@@ -93,7 +184,9 @@ if api_key:
                 ]
             )
         
-        history_aware_retriever=create_history_aware_retriever(llm,retriever,contextualize_q_prompt)
+        ## Named so its span is told apart from the answer call in traces
+        history_aware_retriever=create_history_aware_retriever(
+            llm.with_config(run_name="contextualize_llm"),retriever,contextualize_q_prompt)
 
         ## Answer question
 
@@ -115,13 +208,46 @@ if api_key:
                 ]
             )
         
+        ## Merge overlapping chunks and drop repeats before they reach the prompt
+        context_processor=ContextProcessor(
+            get_embeddings(),Config.CONTEXT_MERGE,Config.CONTEXT_DEDUP_THRESHOLD,Config.CONTEXT_MAX_SENTENCES)
+        reranker=get_reranker() if Config.RERANK else None
+        def retrieve_context(inputs,config):
+            docs=history_aware_retriever.invoke(inputs,config=config)
+            if reranker is not None:
+                docs=reranker.rerank(inputs["input"],docs)
+            return context_processor.process(docs,inputs["input"])
+
+        contextualize_q_chain=contextualize_q_prompt|llm.with_config(run_name="contextualize_llm")|StrOutputParser()
+        async def aretrieve_context(inputs,config):
+            ## The answer needs the rewritten question, so the two LLM calls stay in sequence.
+            ## While the question is rewritten, the original question is searched speculatively;
+            ## when the rewrite comes back unchanged that result is used as is
+            question=inputs["input"]
+            if not inputs.get("chat_history"):
+                docs=await retriever.ainvoke(question,config=config)
+            else:
+                rewritten,early=await asyncio.gather(
+                    contextualize_q_chain.ainvoke(inputs,config=config),
+                    retriever.ainvoke(question,config=config))
+                if rewritten.strip()==question.strip():
+                    docs=early
+                else:
+                    docs=await retriever.ainvoke(rewritten,config=config)
+            if reranker is not None:
+                docs=await asyncio.to_thread(reranker.rerank,question,docs)
+            return await asyncio.to_thread(context_processor.process,docs,question)
+
         question_answer_chain=create_stuff_documents_chain(llm,qa_prompt)
-        rag_chain=create_retrieval_chain(history_aware_retriever,question_answer_chain)
+        rag_chain=create_retrieval_chain(RunnableLambda(retrieve_context,afunc=aretrieve_context),question_answer_chain)
 
+        ## Captured here: with async chains the history is looked up on the event loop thread,
+        ## which has no access to st.session_state
+        store=st.session_state.store
         def get_session_history(session:str)->BaseChatMessageHistory:
-            if session_id not in st.session_state.store:
-                st.session_state.store[session_id]=ChatMessageHistory()
-            return st.session_state.store[session_id]
+            if session_id not in store:
+                store[session_id]=ChatMessageHistory()
+            return store[session_id]
         
         conversational_rag_chain=RunnableWithMessageHistory(
             rag_chain,get_session_history,
@@ -133,15 +259,28 @@ if api_key:
         user_input = st.text_input("Your question:")
         if user_input:
             session_history=get_session_history(session_id)
-            response = conversational_rag_chain.invoke(
-                {"input": user_input},
-                config={
-                    "configurable": {"session_id":session_id}
-                },  # constructs a key "abc123" in `store`.
-            )
-            st.write(st.session_state.store)
-            st.write("Assistant:", response['answer'])
-            st.write("Chat History:", session_history.messages)
+            with tracer.trace("chat",session_id=session_id) as trace:
+                chain_config={
+                    "configurable": {"session_id":session_id},
+                    "callbacks": [TracingCallbackHandler(trace)],
+                }  # constructs a key "abc123" in `store`.
+                if Config.ASYNC_CHAINS:
+                    ## Awaited on the shared event loop; this thread only waits for the result
+                    response=async_runtime.run(conversational_rag_chain.ainvoke({"input": user_input},config=chain_config))
+                else:
+                    response = conversational_rag_chain.invoke({"input": user_input},config=chain_config)
+                with span("render"):
+                    st.write(st.session_state.store)
+                    st.write("Assistant:", response['answer'])
+                    st.write("Chat History:", session_history.messages)
+
+    ## Rolling per-stage latency over the most recent questions
+    with st.sidebar.expander("Latency breakdown"):
+        breakdown=tracer.breakdown()
+        if breakdown:
+            st.dataframe(breakdown,hide_index=True)
+        else:
+            st.caption("No queries traced yet")
 else:
     st.warning("Please enter the GRoq API Key")
 
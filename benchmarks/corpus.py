@@ -0,0 +1,102 @@
+"""
+Deterministic synthetic PDF corpora for offline benchmarks.
+
+PDFs are written by hand (one Helvetica text stream per page), so no PDF
+authoring library is needed. Each file draws most words from its own topic
+vocabulary, which gives retrieval something real to separate.
+"""
+
+import os
+import random
+
+WORDS = (
+    "model attention layer token embedding training data loss gradient network "
+    "transformer encoder decoder sequence vector matrix query key value head "
+    "optimizer batch learning rate benchmark dataset evaluation accuracy score "
+    "parameter scaling inference latency memory compute cluster retrieval index"
+).split()
+
+LINES_PER_PAGE = 55
+WORDS_PER_LINE = 14
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_stream(lines):
+    body = ["BT", "/F1 10 Tf", "12 TL", "50 760 Td"]
+    for line in lines:
+        body.append(f"({_escape(line)}) Tj T*")
+    body.append("ET")
+    return "\n".join(body).encode("latin-1")
+
+
+def write_pdf(path, pages):
+    """
+    Write a minimal valid PDF.
+
+    Args:
+        path: Output file
+        pages: List of pages, each a list of text lines
+    """
+    objects = []
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode("latin-1"))
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for pid, lines in zip(page_ids, pages):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {pid + 1} 0 R "
+            f"/Resources << /Font << /F1 3 0 R >> >> >>".encode("latin-1")
+        )
+        stream = _page_stream(lines)
+        objects.append(b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def generate_corpus(directory, files=4, pages_per_file=20, seed=0):
+    """
+    Write ``files`` synthetic PDFs into ``directory``.
+
+    Returns:
+        List of ``(path, topic words)`` for building queries
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    corpus = []
+    for f in range(files):
+        topic = [f"topic{f}x{i}" for i in range(8)]
+        vocab = WORDS + topic * 3
+        pages = [
+            [" ".join(rng.choice(vocab) for _ in range(WORDS_PER_LINE)) for _ in range(LINES_PER_PAGE)]
+            for _ in range(pages_per_file)
+        ]
+        path = os.path.join(directory, f"paper_{f:04d}.pdf")
+        write_pdf(path, pages)
+        corpus.append((path, topic))
+    return corpus
+
+
+def generate_queries(corpus, count=50, seed=1):
+    """Questions mixing a file's topic words with shared vocabulary."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        _, topic = rng.choice(corpus)
+        words = rng.sample(topic, 2) + rng.sample(WORDS, 3)
+        queries.append("What does the paper say about " + " ".join(words) + "?")
+    return queries
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Concurrent query-embedding benchmark for the shared embedding server.
+
+Starts ``rag_common.embedding_server`` in this process, then has
+``--clients`` threads (standing in for Streamlit sessions across worker
+processes) each embed ``--queries`` single queries through
+``RemoteEmbeddings``. It runs once with micro-batching off
+(``max_batch_size=1``) and once with it on, and reports queries/sec,
+p50/p95/p99 latency and the mean batch size.
+
+By default the model is simulated: every forward pass costs ``--call-ms``
+plus ``--text-ms`` per text, roughly how a transformer encoder on CPU
+behaves for short queries. ``--model`` loads a real sentence-transformers
+model instead.
+
+Examples:
+    python benchmarks/embedding_server_benchmark.py
+    python benchmarks/embedding_server_benchmark.py --clients 32 --max-wait-ms 2
+    python benchmarks/embedding_server_benchmark.py --model sentence-transformers/all-MiniLM-L6-v2 --unix
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+root = Path(__file__).resolve().parents[1]
+sys.path.append(str(root))
+from rag_common.embedding_client import RemoteEmbeddings
+from rag_common.embedding_server import ModelRegistry, huggingface_model, make_server
+from rag_common.fakes import HashingEmbeddings
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=50, help="Queries per client")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--call-ms", type=float, default=15.0, help="Simulated cost of one forward pass")
+    parser.add_argument("--text-ms", type=float, default=0.5, help="Simulated cost per text in a pass")
+    parser.add_argument("--model", help="Real model to serve instead of the simulated one")
+    parser.add_argument("--unix", action="store_true", help="Serve on a Unix socket instead of localhost TCP")
+    parser.add_argument("--json", help="Also write the results to this file")
+    return parser.parse_args()
+
+
+class SimulatedModel(HashingEmbeddings):
+    """Hashing embeddings that take as long as a small encoder would."""
+
+    def __init__(self, call_ms, text_ms):
+        super().__init__()
+        self.call_s = call_ms / 1000
+        self.text_s = text_ms / 1000
+
+    def embed_documents(self, texts):
+        time.sleep(self.call_s + self.text_s * len(texts))
+        return super().embed_documents(texts)
+
+
+def run(args, max_batch_size, max_wait_ms):
+    if args.model:
+        factory = huggingface_model
+    else:
+        def factory(model_name, batch_size):
+            return SimulatedModel(args.call_ms, args.text_ms)
+    registry = ModelRegistry(factory, max_batch_size, max_wait_ms)
+    model_name = args.model or "simulated"
+    registry.get(model_name)
+    if args.unix:
+        address = "unix:" + os.path.join(tempfile.mkdtemp(prefix="rag_embed_"), "embed.sock")
+    else:
+        address = "127.0.0.1:0"
+    server = make_server(address, registry)
+    if not args.unix:
+        address = f"127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    client = RemoteEmbeddings(address, model_name)
+    client.embed_query("warm up")
+    latencies = [[] for _ in range(args.clients)]
+
+    def session(i):
+        for q in range(args.queries):
+            start = time.perf_counter()
+            client.embed_query(f"question {q} from session {i} about attention and retrieval")
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stats = client.health()["models"][model_name]
+    server.shutdown()
+    server.server_close()
+
+    ms = np.concatenate([np.asarray(l) for l in latencies]) * 1000
+    return {
+        "max_batch_size": max_batch_size,
+        "max_wait_ms": max_wait_ms,
+        "queries": int(len(ms)),
+        "queries_per_s": round(len(ms) / elapsed, 1),
+        **{f"p{p}_ms": round(float(np.percentile(ms, p)), 2) for p in (50, 95, 99)},
+        "mean_batch_texts": stats["mean_batch_texts"],
+    }
+
+
+def main():
+    args = parse_args()
+    results = {
+        "clients": args.clients,
+        "unbatched": run(args, 1, 0.0),
+        "batched": run(args, args.max_batch_size, args.max_wait_ms),
+    }
+    results["speedup"] = round(results["batched"]["queries_per_s"] / results["unbatched"]["queries_per_s"], 2)
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+LLM client benchmark against a local Groq stand-in: pooling, quotas, retries, hedging.
+
+Starts ``rag_common.fakes.FakeChatServer`` with a slow tail (``--slow-rate``
+of requests take ``--slow-ms`` longer), ``--error-rate`` 503s and a
+requests-per-minute quota, then sends ``--requests`` chat completions with
+``--concurrency`` in flight through three clients:
+
+- ``per_request``: a new client for every request with no pacing and no
+  retries, which is what building a ``ChatGroq`` per rerun amounted to
+- ``pooled``: one shared ``GroqClient`` with the quota limiter and retries
+- ``pooled_hedged``: the same with hedging after the recent p95 latency
+
+It reports successes, failures, p50/p95/p99 latency of the successful
+requests, and what the server saw: connections opened, requests and 429s.
+
+Examples:
+    python benchmarks/llm_client_benchmark.py
+    python benchmarks/llm_client_benchmark.py --requests 500 --concurrency 16 --slow-rate 0.02
+    python benchmarks/llm_client_benchmark.py --stream --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+root = Path(__file__).resolve().parents[1]
+sys.path.append(str(root))
+from rag_common.fakes import FakeChatServer
+from rag_common.llm_client import GroqClient
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="Normal time to first token")
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="Share of requests in the slow tail")
+    parser.add_argument("--slow-ms", type=float, default=1500.0, help="Extra latency of a slow request")
+    parser.add_argument("--error-rate", type=float, default=0.03, help="Share of requests failing with 503")
+    parser.add_argument("--rpm", type=int, default=3000, help="Server request quota (0 = unlimited)")
+    parser.add_argument("--stream", action="store_true", help="Stream the completions")
+    parser.add_argument("--json", help="Also write the results to this file")
+    return parser.parse_args()
+
+
+def run(args, name, make_client):
+    server = FakeChatServer(
+        first_token_latency=args.latency_ms / 1000, slow_rate=args.slow_rate, slow_latency=args.slow_ms / 1000,
+        error_rate=args.error_rate, requests_per_minute=args.rpm, seed=1,
+    )
+    latencies, failures = [], 0
+
+    async def request(client, i):
+        nonlocal failures
+        body = {"model": "fake", "messages": [{"role": "user", "content": f"Question {i} about attention?"}]}
+        start = time.perf_counter()
+        try:
+            if args.stream:
+                async for _ in client.stream(body):
+                    pass
+            else:
+                await client.complete(body)
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            failures += 1
+
+    async def main():
+        shared = make_client(server.base_url)
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def bounded(i):
+            async with semaphore:
+                client = shared or GroqClient("fake", server.base_url, 0, 0, max_retries=0)
+                await request(client, i)
+                if shared is None:
+                    await client.aclose()
+
+        await asyncio.gather(*[bounded(i) for i in range(args.requests)])
+        if shared is not None:
+            await shared.aclose()
+        return shared
+
+    with server:
+        start = time.perf_counter()
+        client = asyncio.run(main())
+        elapsed = time.perf_counter() - start
+    ms = np.asarray(latencies) * 1000
+    return {
+        "client": name,
+        "ok": len(latencies),
+        "failed": failures,
+        "elapsed_s": round(elapsed, 2),
+        **{f"p{p}_ms": round(float(np.percentile(ms, p)), 1) if len(ms) else None for p in (50, 95, 99)},
+        "server_connections": server.stats["connections"],
+        "server_requests": server.stats["requests"],
+        "server_429": server.stats.get(429, 0),
+        "client_stats": {k: round(v, 3) for k, v in client.stats.items()} if client else None,
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    args = parse_args()
+    settings = {"requests_per_minute": args.rpm, "tokens_per_minute": 0, "backoff_base": 0.1}
+    results = [
+        run(args, "per_request", lambda base_url: None),
+        run(args, "pooled", lambda base_url: GroqClient("fake", base_url, **settings)),
+        run(args, "pooled_hedged", lambda base_url: GroqClient("fake", base_url, hedge=True, **settings)),
+    ]
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end throughput benchmark for the two RAG apps.
+
+Runs the same pipelines as ``2.RAG Document Q&A`` (the index is built by
+``rag_common.doc_index`` from ``Config``, so chunking, dedup, docstore, ANN
+type, sharding and hybrid search follow the ``RAG_*`` settings exactly as in
+the app; then retrieval, rerank, context processing and the stuff-documents
+chain) and ``3.RAG Chat History`` (Chroma, history-aware retriever, chat
+history) on a generated PDF corpus, with a local fake chat model and hashing
+embeddings in place of Groq and HuggingFace. Nothing touches the network
+unless the settings ask for a HuggingFace tokenizer or reranker.
+
+The doc_qa index is always built from scratch in a temporary cache
+directory, so the app's own cache is neither reused nor overwritten.
+
+Reports ingest pages/sec and chunks/sec, query p50/p95/p99 and peak RSS.
+
+Examples:
+    python benchmarks/rag_benchmark.py
+    python benchmarks/rag_benchmark.py --files 20 --pages 50 --queries 200 --llm-latency-ms 0
+    python benchmarks/rag_benchmark.py --app doc_qa --json results.json
+    RAG_INDEX_TYPE=hnsw RAG_DEDUP=1 python benchmarks/rag_benchmark.py --app doc_qa
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Keep chromadb from trying to send usage telemetry
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+root = Path(__file__).resolve().parents[1]
+sys.path.append(str(root))
+sys.path.append(str(Path(__file__).resolve().parent))
+from corpus import generate_corpus, generate_queries
+from rag_common import doc_index
+from rag_common.config import Config
+from rag_common.context import ContextProcessor
+from rag_common.fakes import FakeChatModel, HashingEmbeddings
+from rag_common.pdf_loader import ParallelPDFLoader
+
+from langchain.chains import create_history_aware_retriever, create_retrieval_chain
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables.history import RunnableWithMessageHistory
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Prompts as used by the 3.RAG app
+CONTEXTUALIZE_PROMPT = (
+    "Given a chat history and the latest user question"
+    "which might reference context in the chat history, "
+    "formulate a standalone question which can be understood "
+    "without the chat history. Do NOT answer the question, "
+    "just reformulate it if needed and otherwise return it as is."
+)
+CHAT_SYSTEM_PROMPT = (
+    "You are an assistant for question-answering tasks. "
+    "Use the following pieces of retrieved context to answer "
+    "the question. If you don't know the answer, say that you "
+    "don't know. Use three sentences maximum and keep the "
+    "answer concise."
+    "\n\n"
+    "{context}"
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--app", choices=["doc_qa", "chat", "all"], default="all")
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=25, help="Pages per generated PDF")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--workers", type=int, help="PDF parsing processes, 0 = all cores (default: RAG_PDF_WORKERS)")
+    parser.add_argument("--batch-size", type=int, help="Chunks per ingest batch (default: RAG_INGEST_BATCH_SIZE)")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Fake LLM time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=500.0, help="Fake LLM generation rate")
+    parser.add_argument("--answer-tokens", type=int, default=50)
+    parser.add_argument("--docstore", choices=["mmap", "memory"],
+                        help="Chunk text store for doc_qa (default: RAG_DOCSTORE)")
+    parser.add_argument("--dim", type=int, default=384, help="Hashing embedding dimension")
+    parser.add_argument("--json", help="Also write the results to this file")
+    return parser.parse_args()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its (parsing) children."""
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 1e6
+    return round(own, 1), round(children, 1)
+
+
+def percentiles(latencies):
+    ms = np.asarray(latencies) * 1000
+    return {f"p{p}_ms": round(float(np.percentile(ms, p)), 2) for p in (50, 95, 99)}
+
+
+def ingest_rate(pages, chunks, seconds):
+    return {
+        "pages": pages,
+        "chunks": chunks,
+        "ingest_s": round(seconds, 3),
+        "pages_per_s": round(pages / seconds, 1),
+        "chunks_per_s": round(chunks / seconds, 1),
+    }
+
+
+def configure_doc_qa(args, cache_dir):
+    """Point ``Config`` at a fresh cache and apply the command-line overrides."""
+    Config.INDEX_CACHE_DIR = os.path.join(cache_dir, "faiss_index")
+    Config.SHARD_CACHE_DIR = os.path.join(cache_dir, "faiss_shards")
+    Config.SNAPSHOT = ""
+    if args.workers is not None:
+        Config.PDF_WORKERS = args.workers
+    if args.batch_size is not None:
+        Config.INGEST_BATCH_SIZE = args.batch_size
+    if args.docstore is not None:
+        Config.DOCSTORE = args.docstore
+
+
+def bench_doc_qa(corpus_dir, pages, queries, llm, embeddings, args):
+    with tempfile.TemporaryDirectory(prefix="rag_bench_cache_") as cache_dir:
+        configure_doc_qa(args, cache_dir)
+        start = time.perf_counter()
+        index = doc_index.load_retrieval_index(corpus_dir, embeddings)
+        result = ingest_rate(pages, len(index), time.perf_counter() - start)
+        result.update(index=Config.INDEX_TYPE, shards=Config.SHARDS, hybrid=Config.HYBRID_SEARCH,
+                      splitter=Config.SPLITTER, dedup=Config.DEDUP, docstore=Config.DOCSTORE)
+        return run_doc_qa(index, queries, llm, embeddings, result)
+
+
+def run_doc_qa(index, queries, llm, embeddings, result):
+    # The same per-question steps as the app's synchronous path
+    document_chain = create_stuff_documents_chain(llm, ChatPromptTemplate.from_template(doc_index.PROMPT_TEMPLATE))
+    retriever = index.as_retriever()
+    reranker = None
+    if Config.RERANK:
+        from rag_common.rerank import CrossEncoderReranker
+        reranker = CrossEncoderReranker(Config.RERANK_MODEL, Config.RETRIEVER_K)
+    context_processor = ContextProcessor(
+        embeddings if Config.CONTEXT_MAX_SENTENCES else None, Config.CONTEXT_MERGE,
+        Config.CONTEXT_DEDUP_THRESHOLD, Config.CONTEXT_MAX_SENTENCES,
+    )
+    latencies, retrieval = [], []
+    for query in queries:
+        began = time.perf_counter()
+        context = retriever.invoke(query)
+        if reranker is not None:
+            context = reranker.rerank(query, context)
+        context = context_processor.process(context, query)
+        retrieval.append(time.perf_counter() - began)
+        document_chain.invoke({"input": query, "context": context})
+        latencies.append(time.perf_counter() - began)
+    result.update(percentiles(latencies))
+    result["retrieval_p50_ms"] = percentiles(retrieval)["p50_ms"]
+    return result
+
+
+def bench_chat(paths, queries, llm, embeddings, args):
+    from chromadb import Client
+    from chromadb.config import Settings
+    from langchain_chroma import Chroma
+
+    start = time.perf_counter()
+    documents = ParallelPDFLoader(paths, args.workers or None).load()
+    splits = RecursiveCharacterTextSplitter(chunk_size=5000, chunk_overlap=500).split_documents(documents)
+    client = Client(Settings(anonymized_telemetry=False))
+    vectorstore = Chroma.from_documents(documents=splits, embedding=embeddings, client=client, collection_name="bench")
+    result = ingest_rate(len(documents), len(splits), time.perf_counter() - start)
+
+    contextualize_q_prompt = ChatPromptTemplate.from_messages(
+        [("system", CONTEXTUALIZE_PROMPT), MessagesPlaceholder("chat_history"), ("human", "{input}")]
+    )
+    qa_prompt = ChatPromptTemplate.from_messages(
+        [("system", CHAT_SYSTEM_PROMPT), MessagesPlaceholder("chat_history"), ("human", "{input}")]
+    )
+    history_aware_retriever = create_history_aware_retriever(llm, vectorstore.as_retriever(), contextualize_q_prompt)
+    rag_chain = create_retrieval_chain(history_aware_retriever, create_stuff_documents_chain(llm, qa_prompt))
+    store = {}
+
+    def get_session_history(session):
+        return store.setdefault(session, ChatMessageHistory())
+
+    chain = RunnableWithMessageHistory(
+        rag_chain, get_session_history,
+        input_messages_key="input", history_messages_key="chat_history", output_messages_key="answer",
+    )
+    latencies = []
+    for i, query in enumerate(queries):
+        began = time.perf_counter()
+        # A few turns per session, so the contextualisation call is exercised
+        chain.invoke({"input": query}, config={"configurable": {"session_id": f"s{i // 5}"}})
+        latencies.append(time.perf_counter() - began)
+    vectorstore.delete_collection()
+    result.update(percentiles(latencies))
+    return result
+
+
+def main():
+    args = parse_args()
+    llm = FakeChatModel(
+        first_token_latency=args.llm_latency_ms / 1000,
+        tokens_per_second=args.tokens_per_sec,
+        answer_tokens=args.answer_tokens,
+    )
+    embeddings = HashingEmbeddings(args.dim)
+    results = {"config": vars(args)}
+    with tempfile.TemporaryDirectory(prefix="rag_bench_") as corpus_dir:
+        corpus = generate_corpus(corpus_dir, args.files, args.pages)
+        paths = [path for path, _ in corpus]
+        queries = generate_queries(corpus, args.queries)
+        if args.app in ("doc_qa", "all"):
+            results["doc_qa"] = bench_doc_qa(corpus_dir, args.files * args.pages, queries, llm, embeddings, args)
+        if args.app in ("chat", "all"):
+            results["chat"] = bench_chat(paths, queries, llm, embeddings, args)
+    results["peak_rss_mb"], results["peak_child_rss_mb"] = peak_rss_mb()
+
+    for app in ("doc_qa", "chat"):
+        if app in results:
+            print(f"[{app}] " + "  ".join(f"{k}={v}" for k, v in results[app].items()))
+    print(f"peak RSS {results['peak_rss_mb']} MB (parsing workers {results['peak_child_rss_mb']} MB)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Retrieval quality-vs-latency harness over a golden query set.
+
+Sweeps retrieval configurations of ``2.RAG Document Q&A`` over the
+``research_papers/`` corpus and scores every one against a golden set of
+questions labelled with the pages that answer them. Each configuration is
+built and queried through the app's own code (``rag_common.doc_index``), so
+what is measured is what the app would serve. For each configuration it
+reports:
+
+- ``recall@c``: share of a question's relevant pages found in the top ``c``
+  chunks, averaged over questions, for every cutoff ``c`` up to ``k``
+- ``mrr``: mean reciprocal rank of the first relevant chunk in the top ``k``
+- ``p50_ms`` / ``p95_ms`` / ``p99_ms``: retrieval latency per question
+  (retriever plus reranking), over ``--repeat`` passes of the golden set
+- ``build_s``: parsing, splitting, embedding and indexing the corpus from an
+  empty cache
+
+``--sweep NAME=v1,v2`` takes any ``Config`` setting (``CHUNK_TOKENS``,
+``RETRIEVER_K``, ``INDEX_TYPE``, ``HYBRID_SEARCH``, ``RERANK``...) and the
+grid is every combination. Configurations that only differ in query-time
+settings share one build. A chunk counts as relevant when its own page, or a
+page its near-duplicate copies were collapsed from, is labelled relevant.
+
+Everything runs offline: the Hugging Face hub is switched off, so the
+embedding model (and the cross-encoder, when reranking) must already be in
+the local cache or be given as a local path. ``--hashing`` swaps in hashing
+embeddings for a quick smoke run; its quality numbers mean nothing.
+
+Results are written to ``--output`` as JSON, including per-question ranks,
+and ``--compare`` prints the change against an earlier results file.
+
+Golden set lines look like
+``{"id": "q1", "question": "...", "relevant": [{"source": "Attention.pdf", "page": 4}]}``
+with 1-based page numbers as a PDF viewer shows them; leaving out ``page``
+accepts any page of the source.
+
+Examples:
+    python benchmarks/retrieval_eval.py
+    python benchmarks/retrieval_eval.py --sweep CHUNK_TOKENS=128,256,512 --sweep RETRIEVER_K=4,10
+    python benchmarks/retrieval_eval.py --sweep INDEX_TYPE=flat,hnsw --sweep RERANK=0,1 --compare baseline.json
+    python benchmarks/retrieval_eval.py --hashing --repeat 1
+"""
+
+import argparse
+import datetime
+import hashlib
+import itertools
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Nothing may touch the network: models must come from the local cache
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import numpy as np
+
+root = Path(__file__).resolve().parents[1]
+sys.path.append(str(root))
+from rag_common import doc_index
+from rag_common.config import Config
+from rag_common.embedding_cache import CachedEmbeddings
+
+DEFAULT_SWEEPS = ["RETRIEVER_K=4,10", "HYBRID_SEARCH=0,1"]
+# Compared by --compare, in this order
+COMPARED = ("mrr", "p50_ms", "p95_ms", "build_s")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--golden", default=str(root / "benchmarks" / "golden" / "research_papers.jsonl"))
+    parser.add_argument("--docs-dir", default=str(root / "2.RAG Document Q&A" / "research_papers"))
+    parser.add_argument("--sweep", action="append", metavar="NAME=V1,V2",
+                        help=f"Config setting and values to sweep (repeatable; default: {' '.join(DEFAULT_SWEEPS)})")
+    parser.add_argument("--cutoffs", default="1,3,5,10", help="Recall cutoffs (those above k are skipped)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the golden set")
+    parser.add_argument("--model", help="Embedding model name or local path (default: RAG_EMBEDDING_MODEL)")
+    parser.add_argument("--hashing", action="store_true", help="Hashing embeddings instead of a model (smoke test)")
+    parser.add_argument("--shared-embedding-cache", action="store_true",
+                        help="Reuse chunk embeddings across builds, so build_s measures indexing only")
+    parser.add_argument("--work-dir", help="Directory for the per-build caches (default: a temporary one)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/retrieval_eval-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to print differences against")
+    return parser.parse_args()
+
+
+def load_golden(path):
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if not item.get("question") or not item.get("relevant"):
+                raise ValueError(f"{path}:{lineno}: needs \"question\" and \"relevant\"")
+            item.setdefault("id", f"q{lineno}")
+            item["relevant"] = {(r["source"], r.get("page")) for r in item["relevant"]}
+            questions.append(item)
+    return questions
+
+
+def parse_sweeps(specs):
+    """``["NAME=v1,v2", ...]`` -> ``{NAME: [typed values]}``, typed like the current ``Config`` value."""
+    sweeps = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        name = name.strip().upper()
+        current = getattr(Config, name, None)
+        if not values or current is None or callable(current):
+            raise SystemExit(f"Cannot sweep {spec!r}: expected NAME=V1,V2 with NAME a Config setting")
+        if isinstance(current, bool):
+            cast = lambda v: v.strip().lower() in ("1", "true", "yes", "on")
+        else:
+            cast = lambda v, kind=type(current): kind(v.strip())
+        sweeps[name] = [cast(v) for v in values.split(",")]
+    return sweeps
+
+
+def locations(doc):
+    """``(file name, 1-based page)`` of a chunk and of the near-duplicates collapsed into it."""
+    entries = [doc.metadata, *doc.metadata.get("duplicates", [])]
+    return {(os.path.basename(str(m.get("source"))), int(m["page"]) + 1) for m in entries if "page" in m}
+
+
+def score(ranked, relevant, cutoffs):
+    """
+    Recall at each cutoff and the reciprocal rank for one question.
+
+    Args:
+        ranked: Retrieved chunks, best first
+        relevant: Set of ``(source, page)``; a page of None matches any page of the source
+        cutoffs: Recall cutoffs
+
+    Returns:
+        Tuple of (``{cutoff: recall}``, reciprocal rank, location lists per rank)
+    """
+    found_at = {}
+    first_hit = None
+    ranks = []
+    for rank, doc in enumerate(ranked, start=1):
+        here = locations(doc)
+        ranks.append(sorted(here))
+        for source, page in relevant:
+            if (source, page) not in found_at and any(s == source and page in (None, p) for s, p in here):
+                found_at[(source, page)] = rank
+                first_hit = first_hit or rank
+    recall = {c: sum(r <= c for r in found_at.values()) / len(relevant) for c in cutoffs}
+    return recall, (1.0 / first_hit if first_hit else 0.0), ranks
+
+
+def build_key():
+    """Settings that change the built index; configurations sharing them share one build."""
+    settings = dict(doc_index.build_settings(), model=Config.EMBEDDING_MODEL, shards=Config.SHARDS,
+                    docstore=Config.DOCSTORE)
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+class Harness:
+    def __init__(self, args, questions):
+        self.args = args
+        self.questions = questions
+        self.cutoffs = sorted({int(c) for c in args.cutoffs.split(",")})
+        self.work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="retrieval_eval_"))
+        self.docs_dir = os.path.abspath(args.docs_dir)
+        self.models = {}
+        self.rerankers = {}
+        self.builds = {}
+
+    def model(self):
+        name = Config.EMBEDDING_MODEL
+        if name not in self.models:
+            if self.args.hashing:
+                from rag_common.fakes import HashingEmbeddings
+
+                self.models[name] = HashingEmbeddings()
+            else:
+                from langchain_huggingface import HuggingFaceEmbeddings
+
+                self.models[name] = HuggingFaceEmbeddings(
+                    model_name=name, encode_kwargs={"batch_size": Config.EMBED_BATCH_SIZE})
+        return self.models[name]
+
+    def reranker(self):
+        if not Config.RERANK:
+            return None
+        key = (Config.RERANK_MODEL, Config.RETRIEVER_K)
+        if key not in self.rerankers:
+            from rag_common.rerank import CrossEncoderReranker
+
+            self.rerankers[key] = CrossEncoderReranker(Config.RERANK_MODEL, Config.RETRIEVER_K)
+        return self.rerankers[key]
+
+    def load_index(self):
+        """Build (or reuse) the index for the current settings; returns (index, build info)."""
+        key = build_key()
+        build_dir = os.path.join(self.work_dir, key)
+        Config.INDEX_CACHE_DIR = os.path.join(build_dir, "faiss_index")
+        Config.SHARD_CACHE_DIR = os.path.join(build_dir, "faiss_shards")
+        embed_dir = os.path.join(self.work_dir if self.args.shared_embedding_cache else build_dir, "embedding_cache")
+        embeddings = CachedEmbeddings(self.model(), Config.EMBEDDING_MODEL, embed_dir,
+                                      Config.EMBED_BATCH_SIZE, Config.EMBED_CACHE_DTYPE)
+        start = time.perf_counter()
+        index = doc_index.load_retrieval_index(self.docs_dir, embeddings)
+        seconds = time.perf_counter() - start
+        if index is None:
+            raise SystemExit(f"No PDFs under {self.docs_dir}")
+        if key not in self.builds:
+            parts = getattr(index, "shards", [index])
+            self.builds[key] = {
+                "key": key,
+                "build_s": round(seconds, 3),
+                "chunks": sum(part.vectors.index.ntotal for part in parts),
+            }
+        return index, dict(self.builds[key], load_s=round(seconds, 3))
+
+    def evaluate(self, params):
+        index, build = self.load_index()
+        retriever = index.as_retriever()
+        reranker = self.reranker()
+        k = Config.RETRIEVER_K
+
+        def retrieve(question):
+            docs = retriever.invoke(question)
+            if reranker is not None:
+                docs = reranker.rerank(question, docs)
+            return docs[:k]
+
+        # The first query pays for lazy model loads and page faults
+        retrieve(self.questions[0]["question"])
+        latencies, rankings = [], {}
+        for _ in range(max(self.args.repeat, 1)):
+            for item in self.questions:
+                start = time.perf_counter()
+                ranked = retrieve(item["question"])
+                latencies.append(time.perf_counter() - start)
+                rankings.setdefault(item["id"], ranked)
+
+        cutoffs = [c for c in self.cutoffs if c < k] + [k]
+        per_query, recalls, reciprocal = [], {c: [] for c in cutoffs}, []
+        for item in self.questions:
+            recall, rr, ranks = score(rankings[item["id"]], item["relevant"], cutoffs)
+            for c in cutoffs:
+                recalls[c].append(recall[c])
+            reciprocal.append(rr)
+            per_query.append({"id": item["id"], "recall": recall[k], "rr": round(rr, 4), "ranks": ranks})
+        ms = np.asarray(latencies) * 1000
+        metrics = {f"recall@{c}": round(float(np.mean(recalls[c])), 4) for c in cutoffs}
+        metrics["mrr"] = round(float(np.mean(reciprocal)), 4)
+        metrics.update({f"p{p}_ms": round(float(np.percentile(ms, p)), 2) for p in (50, 95, 99)})
+        metrics["mean_ms"] = round(float(ms.mean()), 2)
+        return {"params": params, "k": k, "build": build, "metrics": metrics, "queries": per_query}
+
+    def run(self, sweeps):
+        # Builds go to the work directory only, never the app's own caches or snapshot
+        saved = {name: getattr(Config, name) for name in [*sweeps, "SNAPSHOT", "INDEX_CACHE_DIR", "SHARD_CACHE_DIR"]}
+        Config.SNAPSHOT = ""
+        results = []
+        try:
+            for values in itertools.product(*sweeps.values()):
+                params = dict(zip(sweeps, values))
+                for name, value in params.items():
+                    setattr(Config, name, value)
+                logging.info("Evaluating %s", params)
+                results.append(self.evaluate(params))
+                print(format_row(results[-1]), flush=True)
+        finally:
+            for name, value in saved.items():
+                setattr(Config, name, value)
+        return results
+
+
+def format_row(result):
+    metrics = result["metrics"]
+    params = " ".join(f"{name}={value}" for name, value in result["params"].items())
+    recall = " ".join(f"{name}={value:.3f}" for name, value in metrics.items() if name.startswith("recall@"))
+    return (f"{params:40s} chunks={result['build']['chunks']:<6d} build={result['build']['build_s']:.1f}s  "
+            f"{recall}  mrr={metrics['mrr']:.3f}  p50={metrics['p50_ms']:.1f}ms p95={metrics['p95_ms']:.1f}ms "
+            f"p99={metrics['p99_ms']:.1f}ms")
+
+
+def compare(results, previous_path):
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = {json.dumps(r["params"], sort_keys=True): r for r in json.load(f)["configs"]}
+    print(f"\nChange against {previous_path}:")
+    for result in results:
+        before = previous.get(json.dumps(result["params"], sort_keys=True))
+        params = " ".join(f"{name}={value}" for name, value in result["params"].items())
+        if before is None:
+            print(f"{params:40s} (not in the earlier run)")
+            continue
+        now = dict(result["metrics"], build_s=result["build"]["build_s"])
+        then = dict(before["metrics"], build_s=before["build"]["build_s"])
+        names = [f"recall@{result['k']}", *COMPARED]
+        deltas = "  ".join(f"{name} {now[name] - then[name]:+.3f}" for name in names if name in then)
+        print(f"{params:40s} {deltas}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+    args = parse_args()
+    if args.model:
+        Config.EMBEDDING_MODEL = args.model
+    questions = load_golden(args.golden)
+    sweeps = parse_sweeps(args.sweep or DEFAULT_SWEEPS)
+    results = Harness(args, questions).run(sweeps)
+
+    with open(args.golden, "rb") as f:
+        golden_sha = hashlib.sha256(f.read()).hexdigest()
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "golden": os.path.relpath(args.golden, root),
+        "golden_sha256": golden_sha,
+        "questions": len(questions),
+        "embeddings": "hashing" if args.hashing else Config.EMBEDDING_MODEL,
+        "repeat": args.repeat,
+        "sweeps": sweeps,
+        "configs": results,
+    }
+    output = args.output or str(root / "benchmarks" / "results" /
+                                f"retrieval_eval-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
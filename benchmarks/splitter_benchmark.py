@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Text splitter benchmark on the PDF corpus.
+
+Parses the PDFs once, then splits all pages (in the same page batches as
+``rag_common.ingest.iter_chunks``) with:
+
+- ``recursive_chars``: ``RecursiveCharacterTextSplitter`` sized in characters,
+  the apps' previous splitter
+- ``recursive_tokens``: the same splitter with the tokenizer as its
+  ``length_function``, the usual way to size LangChain chunks in tokens
+- ``token_aware``: ``rag_common.splitter.TokenAwareSplitter``
+
+and reports the split time (best of ``--repeat``), pages/sec, the chunk count
+and the token size of the chunks: mean, p95, max and the share of chunks over
+the token budget (``--chunk-tokens``), which the embedding model would
+truncate.
+
+The tokenizer is loaded from the local HuggingFace cache or the hub; offline,
+the regex stand-in from ``rag_common.splitter`` is used for every splitter.
+
+Examples:
+    python benchmarks/splitter_benchmark.py
+    python benchmarks/splitter_benchmark.py --synthetic --files 20 --pages 50
+    python benchmarks/splitter_benchmark.py --tokenizer sentence-transformers/all-MiniLM-L6-v2 --json split.json
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+root = Path(__file__).resolve().parents[1]
+sys.path.append(str(root))
+sys.path.append(str(Path(__file__).resolve().parent))
+from corpus import generate_corpus
+from rag_common import index_cache, ingest
+from rag_common.config import Config
+from rag_common.pdf_loader import ParallelPDFLoader
+from rag_common.splitter import RegexTokenizer, TokenAwareSplitter, load_tokenizer
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--docs-dir", default=str(root / "2.RAG Document Q&A" / "research_papers"))
+    parser.add_argument("--synthetic", action="store_true", help="Use a generated corpus instead of --docs-dir")
+    parser.add_argument("--files", type=int, default=8, help="Generated PDFs (with --synthetic)")
+    parser.add_argument("--pages", type=int, default=25, help="Pages per generated PDF (with --synthetic)")
+    parser.add_argument("--tokenizer", default=Config.SPLITTER_TOKENIZER)
+    parser.add_argument("--chunk-tokens", type=int, default=Config.CHUNK_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=Config.CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--chunk-size", type=int, default=Config.CHUNK_SIZE, help="Characters, for recursive_chars")
+    parser.add_argument("--chunk-overlap", type=int, default=Config.CHUNK_OVERLAP)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Also write the results to this file")
+    return parser.parse_args()
+
+
+def load_pages(args):
+    if args.synthetic:
+        directory = tempfile.mkdtemp(prefix="rag_split_bench_")
+        paths = [path for path, _ in generate_corpus(directory, args.files, args.pages)]
+    else:
+        paths = [str(Path(args.docs_dir) / rel) for rel in index_cache.list_pdfs(args.docs_dir)]
+    if not paths:
+        raise SystemExit(f"No PDFs found in {args.docs_dir}")
+    return ParallelPDFLoader(paths).load()
+
+
+def token_counts(tokenizer, texts):
+    return np.asarray([len(e.offsets) for e in tokenizer.encode_batch(texts, add_special_tokens=False)])
+
+
+def bench(splitter, pages, tokenizer, budget, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = list(ingest.iter_chunks(pages, splitter))
+        times.append(time.perf_counter() - start)
+    split_s = min(times)
+    tokens = token_counts(tokenizer, [chunk.page_content for chunk in chunks])
+    return {
+        "split_s": round(split_s, 4),
+        "pages_per_s": round(len(pages) / split_s, 1),
+        "chunks": len(chunks),
+        "tokens_mean": round(float(tokens.mean()), 1),
+        "tokens_p95": int(np.percentile(tokens, 95)),
+        "tokens_max": int(tokens.max()),
+        "over_budget_pct": round(float((tokens > budget).mean() * 100), 2),
+    }
+
+
+def main():
+    args = parse_args()
+    pages = load_pages(args)
+    tokenizer = load_tokenizer(args.tokenizer)
+
+    def length_in_tokens(text):
+        return len(tokenizer.encode_batch([text], add_special_tokens=False)[0].offsets)
+
+    splitters = {
+        "recursive_chars": RecursiveCharacterTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap),
+        "recursive_tokens": RecursiveCharacterTextSplitter(
+            chunk_size=args.chunk_tokens, chunk_overlap=args.overlap_tokens, length_function=length_in_tokens),
+        "token_aware": TokenAwareSplitter(tokenizer, args.chunk_tokens, args.overlap_tokens),
+    }
+    results = {
+        "pages": len(pages),
+        "characters": sum(len(page.page_content) for page in pages),
+        "tokenizer": "regex" if isinstance(tokenizer, RegexTokenizer) else args.tokenizer,
+        "chunk_tokens": args.chunk_tokens,
+    }
+    for name, splitter in splitters.items():
+        results[name] = bench(splitter, pages, tokenizer, args.chunk_tokens, args.repeat)
+        print(name, json.dumps(results[name]))
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
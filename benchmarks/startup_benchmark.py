@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the two RAG Streamlit apps.
+
+Every repeat starts a fresh interpreter (so nothing is already imported) and
+measures, for ``2.RAG Document Q&A`` and ``3.RAG Chat History``:
+
+- ``import_s``: importing the modules the app imports at its top level
+- ``first_render_s``: the first script run through Streamlit's ``AppTest``,
+  i.e. what a user waits for before the first page is complete
+- ``rerun_s``: a second script run in the same process, i.e. the cost of any
+  widget interaction
+- ``warmup_s``: time from the start of the first run until the background
+  warm-up thread (see ``rag_common.warmup``) has finished, if it ran
+
+With ``--importtime N`` the N slowest top-level imports of the first run are
+listed as well (from ``python -X importtime``; this includes what the warm-up
+thread imports while the page renders). Nothing touches the network:
+no API key is entered, so neither app gets past its first screen.
+
+Examples:
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --app chat --repeat 5 --importtime 10
+    python benchmarks/startup_benchmark.py --no-warmup --json startup.json
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+root = Path(__file__).resolve().parents[1]
+APPS = {
+    "doc_qa": root / "2.RAG Document Q&A" / "app.py",
+    "chat": root / "3.RAG Chat History" / "app.py",
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--app", choices=[*APPS, "all"], default="all")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per app")
+    parser.add_argument("--no-warmup", action="store_true", help="Run with RAG_WARMUP=0")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="List the N slowest imports")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Script run timeout in seconds")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def top_level_imports(app_path):
+    """Module names imported at the top level of the app script (not inside functions or branches)."""
+    tree = ast.parse(app_path.read_text(encoding="utf-8"))
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names.append(node.module)
+    return names
+
+
+def run_child(app_path, timeout):
+    """Measure one cold start in this (fresh) process and print the result as JSON."""
+    import importlib
+
+    sys.path.append(str(root))
+    start = time.perf_counter()
+    for name in top_level_imports(app_path):
+        importlib.import_module(name)
+    import_s = time.perf_counter() - start
+
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(app_path), default_timeout=timeout)
+    start = time.perf_counter()
+    app.run()
+    first_render_s = time.perf_counter() - start
+    rerun_start = time.perf_counter()
+    app.run()
+    rerun_s = time.perf_counter() - rerun_start
+
+    warmup_s = None
+    for thread in threading.enumerate():
+        if thread.name == "rag-warmup":
+            thread.join(timeout)
+            warmup_s = time.perf_counter() - start
+    print(json.dumps({
+        "import_s": import_s,
+        "first_render_s": first_render_s,
+        "rerun_s": rerun_s,
+        "warmup_s": warmup_s,
+        "exceptions": [str(e.value) for e in app.exception],
+    }))
+
+
+def slowest_imports(stderr, count):
+    """Parse ``-X importtime`` output into the ``count`` slowest top-level imports."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # nested imports are indented further
+            rows.append((int(cumulative), name.strip()))
+    return [{"module": name, "ms": round(us / 1000, 1)} for us, name in sorted(rows, reverse=True)[:count]]
+
+
+def bench_app(app_path, args):
+    env = dict(os.environ, RAG_WARMUP="0" if args.no_warmup else os.getenv("RAG_WARMUP", "1"))
+    # The apps copy these into os.environ at startup; placeholders keep them running without a .env
+    for name in ("GROQ_API_KEY", "OPENAI_API_KEY", "HF_TOKEN"):
+        env.setdefault(name, "unset")
+    runs = []
+    for i in range(args.repeat):
+        command = [sys.executable]
+        if args.importtime and i == 0:
+            command += ["-X", "importtime"]
+        command += [__file__, "--child", str(app_path), "--timeout", str(args.timeout)]
+        proc = subprocess.run(command, cwd=app_path.parent, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{app_path} failed to start:\n{proc.stderr[-2000:]}")
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        if args.importtime and i == 0:
+            imports = slowest_imports(proc.stderr, args.importtime)
+
+    result = {}
+    for metric in ("import_s", "first_render_s", "rerun_s", "warmup_s"):
+        values = [run[metric] for run in runs if run[metric] is not None]
+        if values:
+            result[metric] = round(float(np.median(values)), 3)
+    result["exceptions"] = sorted({e for run in runs for e in run["exceptions"]})
+    if args.importtime:
+        result["slowest_imports"] = imports
+    return result
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        run_child(Path(args.child), args.timeout)
+        return
+    results = {"config": {k: v for k, v in vars(args).items() if k != "child"}}
+    for name, app_path in APPS.items():
+        if args.app in (name, "all"):
+            results[name] = bench_app(app_path, args)
+
+    for name in APPS:
+        if name not in results:
+            continue
+        summary = {k: v for k, v in results[name].items() if k not in ("slowest_imports", "exceptions")}
+        print(f"[{name}] " + "  ".join(f"{k}={v}" for k, v in summary.items()))
+        for error in results[name]["exceptions"]:
+            print(f"  app raised: {error}")
+        for row in results[name].get("slowest_imports", []):
+            print(f"  {row['ms']:>9.1f} ms  {row['module']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
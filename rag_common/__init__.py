@@ -0,0 +1,7 @@
+"""
+Shared building blocks for the RAG Streamlit apps.
+
+The numbered app folders are plain script directories (their names contain
+spaces), so the apps add the repository root to ``sys.path`` and import the
+modules in this package directly.
+"""
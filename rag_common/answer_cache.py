@@ -0,0 +1,115 @@
+"""
+Semantic cache of LLM answers for repeated and near-duplicate questions.
+
+An answer is reused when a previously asked question is close enough in
+embedding space (cosine similarity above a threshold) AND retrieval returned
+exactly the same context chunks for both questions, so a reworded question
+can only hit when the LLM would have been given identical context. Entries
+expire after a TTL, the least recently used entry is evicted when the cache
+is full, and the whole cache is dropped when the index version changes.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def context_key(documents):
+    """Fingerprint of a retrieved context: the ordered chunk sources and texts."""
+    digest = hashlib.sha256()
+    for doc in documents:
+        digest.update(repr((doc.metadata.get("source"), doc.metadata.get("page"))).encode("utf-8"))
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    """Thread-safe semantic answer cache shared by all sessions of a process."""
+
+    def __init__(self, threshold=0.95, ttl_seconds=3600, max_entries=1000):
+        """
+        Args:
+            threshold: Minimum cosine similarity between questions for a hit
+            ttl_seconds: Age after which an entry is no longer served
+            max_entries: LRU capacity
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.index_version = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (unit vector, context key, answer, created)
+        self._next_key = 0
+        self._matrix = None
+        self._keys = []
+
+    def _normalize(self, embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _sync_version(self, index_version):
+        if index_version != self.index_version:
+            self._entries.clear()
+            self._matrix = None
+            self.index_version = index_version
+
+    def _expire(self, now):
+        stale = [key for key, entry in self._entries.items() if now - entry[3] > self.ttl_seconds]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._matrix = None
+
+    def lookup(self, embedding, context, index_version):
+        """
+        Return a cached answer, or None on a miss.
+
+        Args:
+            embedding: Query embedding
+            context: Context key of the documents retrieved for this query
+            index_version: Version of the index the context came from
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            self._sync_version(index_version)
+            self._expire(time.time())
+            if not self._entries:
+                self.misses += 1
+                return None
+            if self._matrix is None:
+                self._keys = list(self._entries)
+                self._matrix = np.vstack([self._entries[k][0] for k in self._keys])
+            similarities = self._matrix @ query
+            # Best match whose context is identical
+            for row in np.argsort(-similarities):
+                if similarities[row] < self.threshold:
+                    break
+                key = self._keys[row]
+                if self._entries[key][1] == context:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][2]
+            self.misses += 1
+            return None
+
+    def store(self, embedding, context, answer, index_version):
+        """Add an answer, evicting the least recently used entry if the cache is full."""
+        with self._lock:
+            self._sync_version(index_version)
+            self._entries[self._next_key] = (self._normalize(embedding), context, answer, time.time())
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
@@ -0,0 +1,92 @@
+"""
+One asyncio event loop per process, shared by every Streamlit session.
+
+Streamlit runs each session's script on its own thread. With the synchronous
+``invoke`` that thread also carries the network I/O to the LLM. Here the
+chains' ``ainvoke``/``astream`` coroutines are submitted to a single loop
+thread instead, where any number of in-flight LLM calls share one thread and
+independent steps of a request can be awaited together. The script thread
+only waits for its own result.
+
+Coroutines run with the caller's context variables, so spans recorded on the
+loop still land in the caller's ``rag_common.tracing`` trace.
+"""
+
+import asyncio
+import contextvars
+import queue
+import threading
+
+_loop = None
+_lock = threading.Lock()
+
+
+def get_loop():
+    """Return the shared event loop, starting its thread on first use."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="rag-event-loop", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+async def _in_context(context, coro):
+    # The task runs in its own copy of the loop thread's context; give it the caller's values
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+def submit(coro):
+    """Schedule ``coro`` on the shared loop and return a ``concurrent.futures.Future`` for it."""
+    return asyncio.run_coroutine_threadsafe(_in_context(contextvars.copy_context(), coro), get_loop())
+
+
+def run(coro, timeout=None):
+    """Run ``coro`` on the shared loop and block the calling thread until it finishes."""
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+class _End:
+    """Marks the end of an ``iterate`` stream, carrying the error that ended it, if any."""
+
+    def __init__(self, error=None):
+        self.error = error
+
+
+def iterate(aiterable):
+    """
+    Consume an async iterable on the shared loop, yielding its items in the calling thread.
+
+    Used to feed ``astream`` output to ``st.write_stream``. Closing the
+    generator early cancels the stream on the loop.
+    """
+    items = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in aiterable:
+                items.put(item)
+        except BaseException as e:
+            items.put(_End(e))
+            raise
+        items.put(_End())
+
+    future = submit(pump())
+    try:
+        while True:
+            item = items.get()
+            if isinstance(item, _End):
+                if item.error is not None:
+                    raise item.error
+                return
+            yield item
+    finally:
+        future.cancel()
@@ -0,0 +1,180 @@
+"""
+Headless batch answering of a question set against the document index.
+
+Retrieval runs for the whole set up front with ``RetrievalIndex.search_batch``:
+one embedding call and one matrix search. The LLM calls dominate the wall time
+and run concurrently on an asyncio event loop. They are bounded by a semaphore
+(``concurrency``) and a requests-per-minute limiter. Each answered question is
+written as a JSON line as soon as it finishes, so a long run can be followed
+with ``tail -f``, and an interrupted run keeps the answers it already has.
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+import numpy as np
+
+from rag_common.ratelimit import AsyncRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+def read_questions(path):
+    """
+    Read a JSONL question file.
+
+    Each line is an object with a ``question`` (or ``input``) field and an
+    optional ``id``; the line number is used when there is no ``id``. Other
+    fields (e.g. reference answers) are passed through to the output.
+    """
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            question = record.get("question") or record.get("input")
+            if not question:
+                raise ValueError(f"{path}:{lineno}: missing \"question\" field")
+            items.append(dict(record, id=record.get("id", lineno), question=question))
+    return items
+
+
+def context_records(documents):
+    return [
+        {
+            "source": doc.metadata.get("source"),
+            "page": doc.metadata.get("page"),
+            # Other places the same text appears (collapsed near-duplicates, see rag_common.dedup)
+            "also_in": [{"source": d.get("source"), "page": d.get("page")} for d in doc.metadata.get("duplicates", [])],
+            "text": doc.page_content,
+        }
+        for doc in documents
+    ]
+
+
+async def answer_all(chain, items, contexts, concurrency=8, limiter=None, retries=2, on_result=None,
+                     timings=None):
+    """
+    Answer every question with ``chain.ainvoke``, at most ``concurrency`` at a time.
+
+    Args:
+        chain: Runnable taking ``{"input", "context"}`` (e.g. a stuff-documents chain)
+        items: Question records from ``read_questions``
+        contexts: Retrieved Documents for each item
+        concurrency: Maximum LLM calls in flight
+        limiter: Optional ``AsyncRateLimiter`` paced before every call, retries included
+        retries: Extra attempts after a failed call, with exponential backoff
+        on_result: Called with each result record as soon as it is ready
+        timings: Optional per-item dicts of earlier stage timings to include in the results
+
+    Returns:
+        Result records in input order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer(item, context, earlier):
+        queued = time.perf_counter()
+        text, error, attempts = None, None, 0
+        async with semaphore:
+            started = None
+            while attempts <= retries:
+                attempts += 1
+                if limiter is not None:
+                    await limiter.acquire()
+                # Waiting for a slot and for the rate limiter counts as queueing
+                started = started or time.perf_counter()
+                try:
+                    text = await chain.ainvoke({"input": item["question"], "context": context})
+                    error = None
+                    break
+                except Exception as e:
+                    error = repr(e)
+                    logger.warning("Question %s failed (attempt %d): %s", item["id"], attempts, e)
+                    if attempts <= retries:
+                        await asyncio.sleep(2 ** (attempts - 1))
+            finished = time.perf_counter()
+        result = dict(
+            item,
+            answer=text,
+            error=error,
+            contexts=context_records(context),
+            timings={
+                **earlier,
+                "queue_ms": round((started - queued) * 1000, 1),
+                "llm_ms": round((finished - started) * 1000, 1),
+                "attempts": attempts,
+            },
+        )
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    timings = timings or [{} for _ in items]
+    return await asyncio.gather(*(answer(*args) for args in zip(items, contexts, timings)))
+
+
+def run_batch(index, chain, items, output_path, concurrency=8, requests_per_minute=0, retries=2,
+              postprocess=None):
+    """
+    Retrieve, answer and write results for a whole question set.
+
+    Args:
+        index: ``RetrievalIndex`` to search
+        chain: Answering chain (see ``answer_all``)
+        items: Question records from ``read_questions``
+        output_path: JSONL file the results are written to
+        concurrency: Maximum LLM calls in flight
+        requests_per_minute: LLM request budget; 0 disables rate limiting
+        retries: Extra attempts per failed LLM call
+        postprocess: Optional ``fn(question, documents) -> documents`` (rerank, compression)
+
+    Returns:
+        Summary dict with counts, stage times and throughput
+    """
+    start = time.perf_counter()
+    questions = [item["question"] for item in items]
+    contexts = index.search_batch(questions)
+    retrieval_s = time.perf_counter() - start
+    logger.info("Retrieved context for %d questions in %.2fs", len(items), retrieval_s)
+    context_ms = [0.0] * len(items)
+    if postprocess is not None:
+        for i, question in enumerate(questions):
+            began = time.perf_counter()
+            contexts[i] = postprocess(question, contexts[i])
+            context_ms[i] = (time.perf_counter() - began) * 1000
+
+    # Retrieval ran as one batch; each question is charged an equal share of it
+    retrieval_ms = round(retrieval_s * 1000 / max(len(items), 1), 2)
+    timings = [{"retrieval_ms": retrieval_ms, "context_ms": round(ms, 2)} for ms in context_ms]
+
+    limiter = AsyncRateLimiter.per_minute(requests_per_minute) if requests_per_minute > 0 else None
+    answered = 0
+    with open(output_path, "w", encoding="utf-8") as out:
+
+        def write(result):
+            nonlocal answered
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            answered += 1
+            if answered % 25 == 0:
+                logger.info("%d/%d questions answered", answered, len(items))
+
+        llm_start = time.perf_counter()
+        results = asyncio.run(answer_all(chain, items, contexts, concurrency, limiter, retries, write, timings))
+        llm_s = time.perf_counter() - llm_start
+
+    total_s = time.perf_counter() - start
+    llm_ms = np.asarray([r["timings"]["llm_ms"] for r in results] or [0.0])
+    return {
+        "questions": len(results),
+        "errors": sum(r["error"] is not None for r in results),
+        "retrieval_s": round(retrieval_s, 3),
+        "answer_s": round(llm_s, 3),
+        "total_s": round(total_s, 3),
+        "questions_per_min": round(len(results) / total_s * 60, 1) if total_s else None,
+        "llm_p50_ms": round(float(np.percentile(llm_ms, 50)), 1),
+        "llm_p95_ms": round(float(np.percentile(llm_ms, 95)), 1),
+    }
@@ -0,0 +1,137 @@
+"""
+BM25 inverted index stored as compact numpy postings arrays.
+
+Postings are kept in CSR layout: for term ``t`` the documents are
+``docs[offsets[t]:offsets[t + 1]]`` and their precomputed BM25 impact scores
+sit at the same positions in ``impacts``. Scoring a query is then one slice
+per query term plus a single ``np.bincount``, with no per-document Python
+work.
+"""
+
+import logging
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    """Lowercased word tokens; keeps digits so equation labels and model names match."""
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """Read-only BM25 index over a fixed list of chunk IDs."""
+
+    def __init__(self, doc_ids, vocab, offsets, docs, impacts):
+        self.doc_ids = np.asarray(doc_ids)
+        self.vocab = vocab
+        self.offsets = offsets
+        self.docs = docs
+        self.impacts = impacts
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, doc_ids, texts, k1=1.5, b=0.75):
+        """
+        Build an index over ``texts``.
+
+        Args:
+            doc_ids: Chunk IDs, aligned with ``texts``
+            texts: Chunk texts
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalisation
+
+        Returns:
+            BM25Index
+        """
+        vocab = {}
+        term_col, doc_col, tf_col = [], [], []
+        doc_len = np.zeros(len(texts), dtype=np.float32)
+        for d, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len[d] = sum(counts.values())
+            for term, tf in counts.items():
+                term_col.append(vocab.setdefault(term, len(vocab)))
+                doc_col.append(d)
+                tf_col.append(tf)
+
+        terms = np.asarray(term_col, dtype=np.int32)
+        order = np.argsort(terms, kind="stable")
+        docs = np.asarray(doc_col, dtype=np.int32)[order]
+        tf = np.asarray(tf_col, dtype=np.float32)[order]
+        df = np.bincount(terms, minlength=len(vocab))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+
+        n = max(len(texts), 1)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avgdl = float(doc_len.mean()) if len(texts) else 1.0
+        norm = k1 * (1 - b + b * doc_len[docs] / max(avgdl, 1e-9))
+        impacts = np.repeat(idf, df) * tf * (k1 + 1) / (tf + norm)
+        return cls(doc_ids, vocab, offsets, docs, impacts.astype(np.float32))
+
+    def search(self, query, k=10):
+        """
+        Return the top ``k`` ``(doc_id, score)`` pairs for ``query``.
+        """
+        term_ids = [self.vocab[t] for t in set(tokenize(query)) if t in self.vocab]
+        if not term_ids:
+            return []
+        slices = [slice(self.offsets[t], self.offsets[t + 1]) for t in term_ids]
+        docs = np.concatenate([self.docs[s] for s in slices])
+        impacts = np.concatenate([self.impacts[s] for s in slices])
+        scores = np.bincount(docs, weights=impacts, minlength=len(self.doc_ids))
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        ids = self.doc_ids[top]
+        if ids.dtype.kind == "S":
+            # Snapshots share one fixed-width bytes ID array between the docstore and BM25
+            ids = np.char.decode(ids, "utf-8")
+        return [(str(doc_id), float(scores[i])) for doc_id, i in zip(ids, top)]
+
+    def save(self, path):
+        """Save to a single ``.npz`` file."""
+        terms = np.empty(len(self.vocab), dtype=object)
+        for term, i in self.vocab.items():
+            terms[i] = term
+        np.savez(path, doc_ids=self.doc_ids.astype(str), terms=terms.astype(str),
+                 offsets=self.offsets, docs=self.docs, impacts=self.impacts)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        vocab = {term: i for i, term in enumerate(data["terms"].tolist())}
+        return cls(data["doc_ids"], vocab, data["offsets"], data["docs"], data["impacts"])
+
+
+def load_or_build(vectors, cache_dir=None):
+    """
+    Return the BM25 index over every chunk in a LangChain FAISS store.
+
+    The index is saved as ``bm25.npz`` in ``cache_dir``. Saving the vector
+    index replaces the whole cache directory, so an index found there always
+    covers the same chunks as the vectors next to it.
+    """
+    path = os.path.join(cache_dir, "bm25.npz") if cache_dir else None
+    if path and os.path.exists(path):
+        bm25 = BM25Index.load(path)
+        if len(bm25) == len(vectors.index_to_docstore_id):
+            return bm25
+    doc_ids = [vectors.index_to_docstore_id[i] for i in range(len(vectors.index_to_docstore_id))]
+    texts = [vectors.docstore.search(doc_id).page_content for doc_id in doc_ids]
+    bm25 = BM25Index.build(doc_ids, texts)
+    logger.info("Built BM25 index: %d chunks, %d terms", len(bm25), len(bm25.vocab))
+    if path:
+        bm25.save(path)
+    return bm25
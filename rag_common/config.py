@@ -0,0 +1,190 @@
+"""
+Configuration for the RAG apps.
+Values come from environment variables (or the root .env file) so the same
+settings can be tuned per deployment without code changes.
+"""
+
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env in the repository root
+env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
+load_dotenv(dotenv_path=env_path)
+
+
+class Config:
+    # -----------------------------
+    # Embeddings / Splitting
+    # -----------------------------
+    EMBEDDING_MODEL = os.getenv("RAG_EMBEDDING_MODEL", "sentence-transformers/all-mpnet-base-v2")
+    CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", 1000))
+    CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", 200))
+    # "recursive" sizes chunks in characters (CHUNK_SIZE / CHUNK_OVERLAP); "token" opts in to sizing them in
+    # tokens of SPLITTER_TOKENIZER (rag_common.splitter), which is fetched from the HuggingFace hub if not cached
+    SPLITTER = os.getenv("RAG_SPLITTER", "recursive")
+    SPLITTER_TOKENIZER = os.getenv("RAG_SPLITTER_TOKENIZER", EMBEDDING_MODEL)
+    CHUNK_TOKENS = int(os.getenv("RAG_CHUNK_TOKENS", 256))
+    CHUNK_OVERLAP_TOKENS = int(os.getenv("RAG_CHUNK_OVERLAP_TOKENS", 50))
+
+    # Chunk embeddings are cached per model; misses are encoded in batches of this size
+    EMBED_CACHE_DIR = os.getenv("RAG_EMBED_CACHE_DIR", "embedding_cache")
+    EMBED_CACHE_DTYPE = os.getenv("RAG_EMBED_CACHE_DTYPE", "float16")
+    EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", 256))
+    # Shared embedding server (rag_common.embedding_server), e.g. "unix:/tmp/rag-embed.sock" or
+    # "127.0.0.1:8765"; empty loads the model in every app process
+    EMBEDDING_SERVER = os.getenv("RAG_EMBEDDING_SERVER", "")
+
+    # -----------------------------
+    # PDF Parsing
+    # -----------------------------
+    # 0 uses every core, 1 parses inline without a process pool
+    PDF_WORKERS = int(os.getenv("RAG_PDF_WORKERS", 0))
+    PDF_PAGES_PER_TASK = int(os.getenv("RAG_PDF_PAGES_PER_TASK", 64))
+
+    # -----------------------------
+    # Ingest Pipeline
+    # -----------------------------
+    # "full" rebuilds on any corpus change, "incremental" only embeds new/changed PDFs
+    INGEST_MODE = os.getenv("RAG_INGEST_MODE", "incremental")
+    # Chunks embedded and appended to the index per step; bounds ingest memory
+    INGEST_BATCH_SIZE = int(os.getenv("RAG_INGEST_BATCH_SIZE", 256))
+    # Opt in to dropping chunks whose MinHash-estimated shingle similarity to a kept chunk reaches
+    # DEDUP_THRESHOLD; this changes what is indexed
+    DEDUP = os.getenv("RAG_DEDUP", "0") == "1"
+    DEDUP_THRESHOLD = float(os.getenv("RAG_DEDUP_THRESHOLD", 0.8))
+    DEDUP_NUM_PERM = int(os.getenv("RAG_DEDUP_NUM_PERM", 128))
+
+    # -----------------------------
+    # Index Cache
+    # -----------------------------
+    INDEX_CACHE_DIR = os.getenv("RAG_INDEX_CACHE_DIR", "faiss_index")
+    # "mmap" keeps chunk texts in a memory-mapped file, "memory" in LangChain's InMemoryDocstore
+    DOCSTORE = os.getenv("RAG_DOCSTORE", "mmap")
+    # Serve a prebuilt single-file snapshot (rag_common.snapshot) instead of building from the PDFs;
+    # with SHARDS, one file per shard named <stem>-003-of-008<ext>
+    SNAPSHOT = os.getenv("RAG_SNAPSHOT", "")
+    # Check every section's crc32 on load (one sequential read of the file)
+    SNAPSHOT_VERIFY = os.getenv("RAG_SNAPSHOT_VERIFY", "1") == "1"
+
+    # -----------------------------
+    # Sharding
+    # -----------------------------
+    # Split the corpus over this many independently cached indexes (0 or 1 keeps a single index)
+    SHARDS = int(os.getenv("RAG_SHARDS", 0))
+    SHARD_CACHE_DIR = os.getenv("RAG_SHARD_CACHE_DIR", "faiss_shards")
+    # Threads searching shards in parallel; 0 uses one per shard, up to the core count
+    SHARD_WORKERS = int(os.getenv("RAG_SHARD_WORKERS", 0))
+
+    # -----------------------------
+    # Search Index (flat | ivf_flat | ivf_pq | hnsw)
+    # -----------------------------
+    INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "flat")
+    INDEX_NLIST = int(os.getenv("RAG_INDEX_NLIST", 1024))
+    INDEX_NPROBE = int(os.getenv("RAG_INDEX_NPROBE", 16))
+    INDEX_PQ_M = int(os.getenv("RAG_INDEX_PQ_M", 32))
+    INDEX_PQ_NBITS = int(os.getenv("RAG_INDEX_PQ_NBITS", 8))
+    INDEX_HNSW_M = int(os.getenv("RAG_INDEX_HNSW_M", 32))
+    INDEX_EF_CONSTRUCTION = int(os.getenv("RAG_INDEX_EF_CONSTRUCTION", 200))
+    INDEX_EF_SEARCH = int(os.getenv("RAG_INDEX_EF_SEARCH", 64))
+
+    # -----------------------------
+    # Retrieval
+    # -----------------------------
+    RETRIEVER_K = int(os.getenv("RAG_RETRIEVER_K", 4))
+    # BM25 + dense search fused with reciprocal-rank fusion
+    HYBRID_SEARCH = os.getenv("RAG_HYBRID_SEARCH", "1") == "1"
+    HYBRID_FETCH_K = int(os.getenv("RAG_HYBRID_FETCH_K", 20))
+    RRF_K = int(os.getenv("RAG_RRF_K", 60))
+
+    # Render answers token by token as the LLM streams them
+    STREAM_ANSWERS = os.getenv("RAG_STREAM_ANSWERS", "1") == "1"
+    # Run the chains with ainvoke/astream on one shared event loop instead of blocking invoke
+    ASYNC_CHAINS = os.getenv("RAG_ASYNC_CHAINS", "1") == "1"
+
+    # -----------------------------
+    # LLM Client
+    # -----------------------------
+    # "langchain" uses a plain ChatGroq per app; "pooled" opts in to rag_common.llm_client
+    # (shared connection pool, quota throttling, retries and, with LLM_HEDGE, hedged requests)
+    LLM_CLIENT = os.getenv("RAG_LLM_CLIENT", "langchain")
+    LLM_MODEL = os.getenv("RAG_LLM_MODEL", "llama-3.1-8b-instant")
+    LLM_BASE_URL = os.getenv("RAG_LLM_BASE_URL", "https://api.groq.com/openai/v1")
+    # Quotas of the API key; the client also follows the x-ratelimit-* headers of each response
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv("RAG_LLM_RPM", 30))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv("RAG_LLM_TPM", 6000))
+    LLM_MAX_CONNECTIONS = int(os.getenv("RAG_LLM_MAX_CONNECTIONS", 20))
+    LLM_TIMEOUT = float(os.getenv("RAG_LLM_TIMEOUT", 60))
+    # Extra attempts after a 429/5xx, with jittered exponential backoff
+    LLM_MAX_RETRIES = int(os.getenv("RAG_LLM_MAX_RETRIES", 4))
+    # Send a second copy of a request still unanswered after the recent LLM_HEDGE_PERCENTILE latency
+    LLM_HEDGE = os.getenv("RAG_LLM_HEDGE", "0") == "1"
+    LLM_HEDGE_PERCENTILE = float(os.getenv("RAG_LLM_HEDGE_PERCENTILE", 95))
+
+    # -----------------------------
+    # Reranking
+    # -----------------------------
+    # Fetch RERANK_CANDIDATES chunks, keep the RETRIEVER_K best by cross-encoder score
+    RERANK = os.getenv("RAG_RERANK", "0") == "1"
+    RERANK_MODEL = os.getenv("RAG_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES = int(os.getenv("RAG_RERANK_CANDIDATES", 20))
+
+    # -----------------------------
+    # Context Post-processing
+    # -----------------------------
+    CONTEXT_MERGE = os.getenv("RAG_CONTEXT_MERGE", "1") == "1"
+    # Share of a passage's shingles already in a kept passage at which it is dropped (0 disables)
+    CONTEXT_DEDUP_THRESHOLD = float(os.getenv("RAG_CONTEXT_DEDUP_THRESHOLD", 0.85))
+    # Keep only this many query-relevant sentences in the whole context (0 disables)
+    CONTEXT_MAX_SENTENCES = int(os.getenv("RAG_CONTEXT_MAX_SENTENCES", 0))
+
+    # -----------------------------
+    # Answer Cache
+    # -----------------------------
+    ANSWER_CACHE = os.getenv("RAG_ANSWER_CACHE", "1") == "1"
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", 0.95))
+    ANSWER_CACHE_TTL = int(os.getenv("RAG_ANSWER_CACHE_TTL", 3600))
+    ANSWER_CACHE_SIZE = int(os.getenv("RAG_ANSWER_CACHE_SIZE", 1000))
+
+    # -----------------------------
+    # Tracing
+    # -----------------------------
+    # Spans are appended here as JSONL; empty string keeps traces in memory only
+    TRACE_FILE = os.getenv("RAG_TRACE_FILE", "traces.jsonl")
+    TRACE_WINDOW = int(os.getenv("RAG_TRACE_WINDOW", 50))
+
+    # -----------------------------
+    # Startup
+    # -----------------------------
+    # Load heavy modules, models and a cached index on a background thread at startup
+    WARMUP = os.getenv("RAG_WARMUP", "1") == "1"
+
+    @classmethod
+    def retrieval_k(cls):
+        """Number of chunks the retriever fetches (the rerank candidate budget when reranking)."""
+        return cls.RERANK_CANDIDATES if cls.RERANK else cls.RETRIEVER_K
+
+    @classmethod
+    def dedup_settings(cls):
+        """``NearDuplicateIndex`` settings for ingest, or None when deduplication is off."""
+        return {"threshold": cls.DEDUP_THRESHOLD, "num_perm": cls.DEDUP_NUM_PERM} if cls.DEDUP else None
+
+    @classmethod
+    def llm_client_settings(cls):
+        """``GroqClient`` settings (everything but the API key)."""
+        return {
+            "base_url": cls.LLM_BASE_URL, "requests_per_minute": cls.LLM_REQUESTS_PER_MINUTE,
+            "tokens_per_minute": cls.LLM_TOKENS_PER_MINUTE, "max_connections": cls.LLM_MAX_CONNECTIONS,
+            "timeout": cls.LLM_TIMEOUT, "max_retries": cls.LLM_MAX_RETRIES,
+            "hedge": cls.LLM_HEDGE, "hedge_percentile": cls.LLM_HEDGE_PERCENTILE,
+        }
+
+    @classmethod
+    def index_spec(cls):
+        """Build an ``IndexSpec`` from the search index settings."""
+        from rag_common.index_factory import IndexSpec
+
+        return IndexSpec(
+            cls.INDEX_TYPE, nlist=cls.INDEX_NLIST, nprobe=cls.INDEX_NPROBE,
+            pq_m=cls.INDEX_PQ_M, pq_nbits=cls.INDEX_PQ_NBITS, hnsw_m=cls.INDEX_HNSW_M,
+            ef_construction=cls.INDEX_EF_CONSTRUCTION, ef_search=cls.INDEX_EF_SEARCH,
+        )
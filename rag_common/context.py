@@ -0,0 +1,196 @@
+"""
+Post-processing of retrieved chunks before they are stuffed into the prompt.
+
+With chunk overlap, the top-k chunks often repeat the same spans verbatim.
+``ContextProcessor`` shrinks the context in three steps:
+
+1. merge chunks from the same source page whose texts overlap (the splitter
+   overlap region) into one passage
+2. drop passages that are near-duplicates of a higher-ranked one (share of
+   word shingles covered)
+3. optionally keep only the sentences most similar to the query, scored as
+   one matrix product over sentence embeddings; sentence vectors are kept in
+   a bounded in-memory LRU (``SentenceEmbeddings``) rather than the on-disk
+   chunk cache, which would otherwise grow with every retrieved sentence
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag_common.embedding_cache import CachedEmbeddings
+from rag_common.tracing import span
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+_WORD = re.compile(r"\w+")
+
+
+def _overlap_merge(first, second, min_overlap):
+    """Return ``first`` extended by ``second`` if a suffix of ``first`` starts ``second``, else None."""
+    if second in first:
+        return first
+    if first in second:
+        return second
+    probe = second[:min_overlap]
+    if len(probe) < min_overlap:
+        return None
+    start = first.find(probe)
+    while start != -1:
+        tail = first[start:]
+        if second.startswith(tail):
+            return first + second[len(tail):]
+        start = first.find(probe, start + 1)
+    return None
+
+
+def merge_overlapping(documents, min_overlap=30):
+    """
+    Merge chunks of the same source page whose texts overlap.
+
+    The merged passage takes the position of its best-ranked member.
+    """
+    merged = []
+    for doc in documents:
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        text = doc.page_content
+        for i, existing in enumerate(merged):
+            if (existing.metadata.get("source"), existing.metadata.get("page")) != key:
+                continue
+            combined = (
+                _overlap_merge(existing.page_content, text, min_overlap)
+                or _overlap_merge(text, existing.page_content, min_overlap)
+            )
+            if combined is not None:
+                merged[i] = Document(page_content=combined, metadata=existing.metadata)
+                break
+        else:
+            merged.append(doc)
+    # A chunk merged late can bridge two passages kept apart earlier
+    return merged if len(merged) == len(documents) else merge_overlapping(merged, min_overlap)
+
+
+def _shingles(text, size=5):
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def remove_near_duplicates(documents, threshold=0.85):
+    """
+    Drop passages mostly covered by a kept, higher-ranked passage.
+
+    Coverage is the share of a passage's word shingles that also occur in the
+    kept passage, so a repeated chunk is dropped even when the copy it
+    repeats was merged into a longer passage.
+    """
+    kept, kept_shingles = [], []
+    for doc in documents:
+        shingles = _shingles(doc.page_content)
+        if any(len(shingles & other) / max(len(shingles), 1) >= threshold for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(shingles)
+    return kept
+
+
+def split_sentences(text):
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+
+
+def keep_relevant_sentences(documents, query, embeddings, max_sentences):
+    """
+    Keep the ``max_sentences`` sentences (over all passages) most similar to ``query``.
+
+    Sentences keep their original order inside each passage, and passages
+    left without any sentence are dropped.
+    """
+    sentences = [split_sentences(doc.page_content) for doc in documents]
+    flat = [s for doc_sentences in sentences for s in doc_sentences]
+    if len(flat) <= max_sentences:
+        return documents
+    matrix = np.asarray(embeddings.embed_documents(flat), dtype=np.float32)
+    query_vector = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query_vector) or 1.0)
+    scores = matrix @ query_vector / np.where(norms == 0, 1.0, norms)
+    keep = np.zeros(len(flat), dtype=bool)
+    keep[np.argpartition(-scores, max_sentences - 1)[:max_sentences]] = True
+
+    compressed, position = [], 0
+    for doc, doc_sentences in zip(documents, sentences):
+        chosen = [s for j, s in enumerate(doc_sentences) if keep[position + j]]
+        position += len(doc_sentences)
+        if chosen:
+            compressed.append(Document(page_content=" ".join(chosen), metadata=doc.metadata))
+    return compressed
+
+
+class SentenceEmbeddings:
+    """Sentence embeddings served from an in-memory LRU in front of the model."""
+
+    def __init__(self, embeddings, max_size=20000):
+        """
+        Args:
+            embeddings: Embeddings model; a ``CachedEmbeddings`` is bypassed for its wrapped model
+            max_size: Sentence vectors kept in memory
+        """
+        self.embeddings = embeddings
+        self.model = embeddings.embeddings if isinstance(embeddings, CachedEmbeddings) else embeddings
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            vectors = [self._entries.get(text) for text in texts]
+            for text, vector in zip(texts, vectors):
+                if vector is not None:
+                    self._entries.move_to_end(text)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            fresh = dict(zip(missing, self.model.embed_documents(missing)))
+            with self._lock:
+                self._entries.update(fresh)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            vectors = [vector if vector is not None else fresh[text] for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+class ContextProcessor:
+    """Applies merge, deduplication and optional sentence selection to retrieved chunks."""
+
+    def __init__(self, embeddings=None, merge=True, dedup_threshold=0.85, max_sentences=0):
+        """
+        Args:
+            embeddings: Embeddings used for sentence scoring (required if ``max_sentences``)
+            merge: Merge overlapping chunks of the same page
+            dedup_threshold: Shingle coverage at which a passage counts as a duplicate; 0 disables the step
+            max_sentences: Sentence budget for the whole context; 0 disables compression
+        """
+        self.embeddings = SentenceEmbeddings(embeddings) if embeddings is not None else None
+        self.merge = merge
+        self.dedup_threshold = dedup_threshold
+        self.max_sentences = max_sentences
+
+    def process(self, documents, query=None):
+        with span("context_compress", chunks_in=len(documents)) as attrs:
+            chars_in = sum(len(doc.page_content) for doc in documents)
+            if self.merge:
+                documents = merge_overlapping(documents)
+            if self.dedup_threshold:
+                documents = remove_near_duplicates(documents, self.dedup_threshold)
+            if self.max_sentences and query and self.embeddings is not None:
+                documents = keep_relevant_sentences(documents, query, self.embeddings, self.max_sentences)
+            attrs.update(
+                chunks_out=len(documents),
+                chars_in=chars_in,
+                chars_out=sum(len(doc.page_content) for doc in documents),
+            )
+            return documents
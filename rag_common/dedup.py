@@ -0,0 +1,223 @@
+"""
+Near-duplicate chunk elimination with MinHash signatures and LSH banding.
+
+Paper collections repeat themselves: preprint and camera-ready versions of
+the same paper, license boilerplate, shared reference lists. Embedding every
+copy costs ingest time and index space, and fills the retrieved context with
+repeats. Before chunks are embedded, each one is fingerprinted:
+
+- its word 5-shingles are hashed (CRC32) and passed through ``num_perm``
+  multiply-shift hash functions; the per-function minima form the MinHash
+  signature, whose per-slot agreement with another signature estimates the
+  Jaccard similarity of the two shingle sets
+- the signature is cut into ``bands`` bands of ``rows`` slots; chunks sharing
+  any whole band land in the same bucket and become candidates, so a chunk is
+  only compared with the few chunks it plausibly duplicates
+
+A chunk whose estimated similarity to an already kept chunk reaches
+``threshold`` is not embedded. Instead its metadata (source, page) is
+appended to the kept chunk's ``duplicates`` metadata list, so the kept chunk
+can still be cited from every document it appears in.
+"""
+
+import logging
+import os
+import re
+import uuid
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+PROVENANCE_KEY = "duplicates"
+
+
+def lsh_params(num_perm, threshold):
+    """
+    Choose ``(bands, rows)`` with ``bands * rows == num_perm`` for a similarity ``threshold``.
+
+    The band S-curve rises around ``(1 / bands) ** (1 / rows)``. The largest
+    such point at least 0.05 below ``threshold`` is used, so chunks right at
+    the threshold are still very likely to become candidates. Candidates
+    below the threshold are rejected by the exact signature comparison.
+    """
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    curve = {option: (1 / option[0]) ** (1 / option[1]) for option in options}
+    below = [option for option in options if curve[option] <= threshold - 0.05]
+    if below:
+        return max(below, key=curve.get)
+    return min(options, key=curve.get)
+
+
+class MinHasher:
+    """MinHash signatures over word shingles."""
+
+    def __init__(self, num_perm=128, shingle_size=5, seed=0):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Odd multipliers for multiply-shift hashing of the 32-bit shingle hashes
+        self._a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+    def shingle_hashes(self, text):
+        words = _WORD.findall(text.lower())
+        size = self.shingle_size
+        if len(words) <= size:
+            shingles = [" ".join(words)]
+        else:
+            shingles = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+        return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+    def signature(self, text):
+        hashes = self.shingle_hashes(text)
+        # uint64 products wrap around; the top 32 bits are the hash value
+        values = (hashes[:, None] * self._a[None, :] + self._b[None, :]) >> np.uint64(32)
+        return values.min(axis=0).astype(np.uint32)
+
+    def signatures(self, texts):
+        return np.stack([self.signature(text) for text in texts]) if texts else np.zeros((0, self.num_perm), np.uint32)
+
+
+class NearDuplicateIndex:
+    """LSH index over the MinHash signatures of the chunks kept so far."""
+
+    def __init__(self, threshold=0.8, num_perm=128, shingle_size=5, seed=0):
+        """
+        Args:
+            threshold: Estimated Jaccard similarity of word shingles at which a chunk is a duplicate
+            num_perm: MinHash signature length
+            shingle_size: Words per shingle
+            seed: Seed of the hash functions; signatures are only comparable for equal settings
+        """
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.bands, self.rows = lsh_params(num_perm, threshold)
+        self._buckets = [{} for _ in range(self.bands)]
+        self._signatures = {}
+        # Provenance collected by ``filter``, per kept chunk ID, until ``apply_provenance``
+        self.pending = {}
+        self.collapsed = 0
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def settings(self):
+        """Settings that change which chunks are dropped (used in cache keys)."""
+        return {"threshold": self.threshold, "num_perm": self.hasher.num_perm, "shingle_size": self.hasher.shingle_size}
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, doc_id, signature):
+        self._signatures[doc_id] = signature
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, []).append(doc_id)
+
+    def remove(self, ids):
+        for doc_id in ids:
+            signature = self._signatures.pop(doc_id, None)
+            if signature is None:
+                continue
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                members = bucket[key]
+                members.remove(doc_id)
+                if not members:
+                    del bucket[key]
+
+    def query(self, signature):
+        """ID of the most similar kept chunk at or above ``threshold``, or None."""
+        candidates = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(key, ()))
+        best, best_score = None, self.threshold
+        for doc_id in candidates:
+            score = float(np.mean(self._signatures[doc_id] == signature))
+            if score >= best_score:
+                best, best_score = doc_id, score
+        return best
+
+    def filter(self, chunks, ids=None):
+        """
+        Drop chunks that near-duplicate a kept chunk (including earlier chunks of ``chunks``).
+
+        Args:
+            chunks: Chunk Documents
+            ids: Their docstore IDs; random IDs are assigned when None
+
+        Returns:
+            Tuple of (kept chunks, their IDs, the kept IDs the dropped chunks collapsed into)
+        """
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in chunks]
+        kept, kept_ids, targets = [], [], []
+        for chunk, doc_id, signature in zip(chunks, ids, self.hasher.signatures([c.page_content for c in chunks])):
+            canonical = self.query(signature)
+            if canonical is None:
+                self.add(doc_id, signature)
+                kept.append(chunk)
+                kept_ids.append(doc_id)
+                continue
+            provenance = {k: v for k, v in chunk.metadata.items() if k != PROVENANCE_KEY}
+            self.pending.setdefault(canonical, []).append(provenance)
+            targets.append(canonical)
+            self.collapsed += 1
+        return kept, kept_ids, targets
+
+    def apply_provenance(self, docstore):
+        """Append the collected provenance to the kept chunks' ``duplicates`` metadata in ``docstore``."""
+        for doc_id, entries in self.pending.items():
+            update_provenance(docstore, doc_id, lambda existing: existing + entries)
+        self.pending = {}
+
+    def save(self, path):
+        ids = list(self._signatures)
+        matrix = np.stack([self._signatures[i] for i in ids]) if ids else np.zeros((0, self.hasher.num_perm), np.uint32)
+        np.savez(path, ids=np.asarray(ids, dtype=str), signatures=matrix)
+
+    def load(self, path):
+        """Add the signatures saved with ``save``."""
+        data = np.load(path)
+        for doc_id, signature in zip(data["ids"].tolist(), data["signatures"]):
+            self.add(doc_id, signature)
+        return self
+
+
+def update_provenance(docstore, doc_id, fn):
+    """Replace a chunk's ``duplicates`` list with ``fn(current list)``; missing chunks are skipped."""
+    doc = docstore.search(doc_id)
+    if isinstance(doc, str):
+        return
+    entries = fn(doc.metadata.get(PROVENANCE_KEY, []))
+    if hasattr(docstore, "update_metadata"):
+        docstore.update_metadata(doc_id, {PROVENANCE_KEY: entries})
+    else:
+        # InMemoryDocstore hands out its stored Document, so the change sticks
+        doc.metadata[PROVENANCE_KEY] = entries
+
+
+def load_or_build(vectors, cache_dir=None, **settings):
+    """
+    Return a ``NearDuplicateIndex`` over every chunk in a LangChain FAISS store.
+
+    Signatures are saved as ``minhash.npz`` in ``cache_dir``; like the BM25
+    postings, a saved file is only used while it covers the store's chunk count.
+    """
+    index = NearDuplicateIndex(**settings)
+    if vectors is None:
+        return index
+    path = os.path.join(cache_dir, "minhash.npz") if cache_dir else None
+    if path and os.path.exists(path):
+        index.load(path)
+        if len(index) == len(vectors.index_to_docstore_id):
+            return index
+        index = NearDuplicateIndex(**settings)
+    doc_ids = list(vectors.index_to_docstore_id.values())
+    texts = [vectors.docstore.search(doc_id).page_content for doc_id in doc_ids]
+    for doc_id, signature in zip(doc_ids, index.hasher.signatures(texts)):
+        index.add(doc_id, signature)
+    logger.info("Built MinHash index over %d chunks", len(index))
+    if path:
+        index.save(path)
+    return index
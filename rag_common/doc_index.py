@@ -0,0 +1,237 @@
+"""
+Document index for ``2.RAG Document Q&A``, built and loaded from ``Config``.
+
+The Streamlit app and the headless scripts share these functions, so a batch
+run queries exactly the index (chunking, docstore, ANN type, BM25) the app
+serves, and reuses the cache the app persisted.
+"""
+
+import logging
+import os
+import shutil
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from rag_common import bm25, dedup, index_cache, index_factory, ingest, shards, snapshot
+from rag_common.config import Config
+from rag_common.docstore import MmapDocstore
+from rag_common.hybrid import RetrievalIndex
+from rag_common.pdf_loader import ParallelPDFLoader
+from rag_common.splitter import RegexTokenizer, TokenAwareSplitter, load_tokenizer
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TEMPLATE = """
+    Answer the questions based on the provided context only.
+    Please provide the most accurate response based on the question
+    <context>
+    {context}
+    <context>
+    Question:{input}
+
+    """
+
+
+def new_docstore():
+    """Empty docstore of the configured kind (None means LangChain's in-memory store)."""
+    # Chunk texts live in a memory-mapped file; Documents are only built for retrieved chunks
+    return MmapDocstore() if Config.DOCSTORE == "mmap" else None
+
+
+def text_splitter():
+    if Config.SPLITTER == "token":
+        return TokenAwareSplitter(load_tokenizer(Config.SPLITTER_TOKENIZER), Config.CHUNK_TOKENS,
+                                  Config.CHUNK_OVERLAP_TOKENS)
+    return RecursiveCharacterTextSplitter(chunk_size=Config.CHUNK_SIZE, chunk_overlap=Config.CHUNK_OVERLAP)
+
+
+def splitter_settings():
+    """Splitter settings that change the chunks, for the index cache keys."""
+    if Config.SPLITTER != "token":
+        return {"splitter": Config.SPLITTER}
+    # An offline fallback tokenizer chunks differently from the real one
+    fallback = isinstance(load_tokenizer(Config.SPLITTER_TOKENIZER), RegexTokenizer)
+    return {
+        "splitter": "token",
+        "tokenizer": "regex" if fallback else Config.SPLITTER_TOKENIZER,
+        "chunk_tokens": Config.CHUNK_TOKENS,
+        "chunk_overlap_tokens": Config.CHUNK_OVERLAP_TOKENS,
+    }
+
+
+def build_settings():
+    """Settings that change the index contents, recorded in exported snapshots."""
+    return {
+        "chunk_size": Config.CHUNK_SIZE,
+        "chunk_overlap": Config.CHUNK_OVERLAP,
+        "dedup": Config.dedup_settings(),
+        "index": Config.index_spec().build_params(),
+        "hybrid": Config.HYBRID_SEARCH,
+        **splitter_settings(),
+    }
+
+
+def build_vector_index(docs_dir, embeddings):
+    """Parse, split, embed and index every PDF under ``docs_dir`` from scratch."""
+    # PDFs are parsed across a process pool and stream through split -> embed -> index in bounded batches
+    paths = [os.path.join(docs_dir, rel) for rel in index_cache.list_pdfs(docs_dir)]
+    loader = ParallelPDFLoader(paths, Config.PDF_WORKERS, Config.PDF_PAGES_PER_TASK)
+    chunks = ingest.iter_chunks(loader.lazy_load(), text_splitter())
+    settings = Config.dedup_settings()
+    duplicates = dedup.NearDuplicateIndex(**settings) if settings is not None else None
+    vectors = ingest.stream_into_index(chunks, embeddings, Config.INGEST_BATCH_SIZE, docstore=new_docstore(),
+                                       duplicates=duplicates)
+    if duplicates is not None:
+        logger.info("Collapsed %d near-duplicate chunks before embedding", duplicates.collapsed)
+    return vectors
+
+
+def load_vector_index(docs_dir, embeddings):
+    """
+    Return the FAISS store for ``docs_dir``, reusing the persisted index when possible.
+
+    Returns:
+        FAISS store with the configured ANN index swapped in, or None if there are no PDFs
+    """
+    if Config.INGEST_MODE == "incremental":
+        # Only embed PDFs that were added or changed since the last run
+        key = ingest.settings_key(Config.CHUNK_SIZE, Config.CHUNK_OVERLAP, Config.EMBEDDING_MODEL,
+                                  docstore=Config.DOCSTORE, dedup=Config.dedup_settings(), **splitter_settings())
+        vectors, _ = ingest.incremental_ingest(
+            docs_dir, Config.INDEX_CACHE_DIR, embeddings, text_splitter(), key,
+            Config.PDF_WORKERS, Config.PDF_PAGES_PER_TASK, Config.INGEST_BATCH_SIZE, new_docstore(),
+            dedup_settings=Config.dedup_settings(),
+        )
+    else:
+        # Reuse the on-disk index while the papers and settings are unchanged
+        key = index_cache.corpus_key(docs_dir, Config.CHUNK_SIZE, Config.CHUNK_OVERLAP, Config.EMBEDDING_MODEL,
+                                     docstore=Config.DOCSTORE, dedup=Config.dedup_settings(), **splitter_settings())
+        vectors, _ = index_cache.load_or_build(
+            Config.INDEX_CACHE_DIR, key, embeddings, lambda: build_vector_index(docs_dir, embeddings))
+    # The flat index on disk is the source of truth; swap in the configured ANN index
+    return index_factory.load_or_convert(vectors, Config.index_spec(), Config.INDEX_CACHE_DIR)
+
+
+def retrieval_index(vectors, cache_dir):
+    """Wrap a FAISS store in a ``RetrievalIndex`` with the configured k and (cached) BM25 postings."""
+    # BM25 postings are built over the same chunks and cached next to the vectors
+    lexical = bm25.load_or_build(vectors, cache_dir) if Config.HYBRID_SEARCH else None
+    k = Config.retrieval_k()
+    return RetrievalIndex(vectors, lexical, k, max(Config.HYBRID_FETCH_K, k), Config.RRF_K)
+
+
+def update_shard(docs_dir, embeddings, shard, files=None, rebuild=False):
+    """
+    Bring one shard's cached index up to date (``SHARDS`` must be 2 or more).
+
+    Args:
+        docs_dir: Directory holding the PDFs
+        embeddings: Embeddings instance
+        shard: Shard number
+        files: The shard's relative PDF paths, if already partitioned
+        rebuild: Drop the shard's cache and re-embed all of its PDFs
+
+    Returns:
+        Tuple of (``RetrievalIndex`` or None if the shard holds no chunks, ingest report)
+    """
+    cache_dir = shards.shard_dir(Config.SHARD_CACHE_DIR, shard, Config.SHARDS)
+    if rebuild:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    if files is None:
+        files = shards.partition(index_cache.list_pdfs(docs_dir), Config.SHARDS)[shard]
+    # Sharded indexes are always maintained incrementally: each shard's manifest tracks its files
+    key = ingest.settings_key(Config.CHUNK_SIZE, Config.CHUNK_OVERLAP, Config.EMBEDDING_MODEL,
+                              docstore=Config.DOCSTORE, dedup=Config.dedup_settings(), shard=shard,
+                              shards=Config.SHARDS, **splitter_settings())
+    # Near-duplicates are only detected within a shard
+    vectors, report = ingest.incremental_ingest(
+        docs_dir, cache_dir, embeddings, text_splitter(), key,
+        Config.PDF_WORKERS, Config.PDF_PAGES_PER_TASK, Config.INGEST_BATCH_SIZE, new_docstore(), files,
+        Config.dedup_settings(),
+    )
+    if vectors is None or not vectors.index_to_docstore_id:
+        return None, report
+    vectors = index_factory.load_or_convert(vectors, Config.index_spec(), cache_dir)
+    return retrieval_index(vectors, cache_dir), report
+
+
+def load_sharded_index(docs_dir, embeddings):
+    """``ShardedIndex`` over every non-empty shard, or None if there are no chunks at all."""
+    groups = shards.partition(index_cache.list_pdfs(docs_dir), Config.SHARDS)
+    loaded = [update_shard(docs_dir, embeddings, shard, files)[0] for shard, files in enumerate(groups)]
+    loaded = [index for index in loaded if index is not None]
+    if not loaded:
+        return None
+    k = Config.retrieval_k()
+    return shards.ShardedIndex(loaded, k, max(Config.HYBRID_FETCH_K, k), Config.RRF_K, Config.SHARD_WORKERS)
+
+
+def snapshot_path(shard=None, path=None):
+    """The snapshot file (``SNAPSHOT`` unless ``path`` is given), or one shard's file (``<stem>-003-of-008<ext>``)."""
+    path = path or Config.SNAPSHOT
+    if shard is None:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}-{shard:03d}-of-{Config.SHARDS:03d}{ext}"
+
+
+def load_snapshot_index(embeddings):
+    """
+    Retrieval index served from ``SNAPSHOT`` (one file per shard when ``SHARDS`` is 2 or more).
+
+    The files are opened read-only: nothing is parsed or embedded from the
+    PDFs, and the query-time ANN knobs of this node's config are applied.
+    """
+    k = Config.retrieval_k()
+    fetch_k = max(Config.HYBRID_FETCH_K, k)
+
+    def load(path):
+        index = snapshot.load_snapshot(path, embeddings, Config.EMBEDDING_MODEL, k, fetch_k, Config.RRF_K,
+                                       Config.SNAPSHOT_VERIFY, build_settings())
+        index_factory.apply_search_params(index.vectors.index, Config.index_spec())
+        if not Config.HYBRID_SEARCH:
+            index.bm25 = None
+        return index
+
+    if Config.SHARDS < 2:
+        return load(Config.SNAPSHOT)
+    paths = [snapshot_path(shard) for shard in range(Config.SHARDS)]
+    # Shards without chunks are not exported
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        logger.warning("No snapshot for %d of %d shards: %s", len(missing), len(paths), ", ".join(missing))
+    loaded = [load(path) for path in paths if path not in missing]
+    if not loaded:
+        return None
+    return shards.ShardedIndex(loaded, k, fetch_k, Config.RRF_K, Config.SHARD_WORKERS)
+
+
+def has_cached_index():
+    """Whether a persisted index (or, when sharded, any persisted shard) exists."""
+    if Config.SNAPSHOT:
+        if Config.SHARDS > 1:
+            return any(os.path.exists(snapshot_path(shard)) for shard in range(Config.SHARDS))
+        return os.path.exists(Config.SNAPSHOT)
+    if Config.SHARDS > 1:
+        return any(index_cache.read_key(shards.shard_dir(Config.SHARD_CACHE_DIR, shard, Config.SHARDS))
+                   for shard in range(Config.SHARDS))
+    return index_cache.read_key(Config.INDEX_CACHE_DIR) is not None
+
+
+def load_retrieval_index(docs_dir, embeddings):
+    """
+    Retrieval index for ``docs_dir``, or None if there are no PDFs.
+
+    A ``RetrievalIndex`` (vector store plus, with ``HYBRID_SEARCH``, BM25
+    postings), or a ``ShardedIndex`` with the same interface when ``SHARDS``
+    is 2 or more. With ``SNAPSHOT`` set, the index is opened from the
+    snapshot file(s) instead of being built from ``docs_dir``.
+    """
+    if Config.SNAPSHOT:
+        return load_snapshot_index(embeddings)
+    if Config.SHARDS > 1:
+        return load_sharded_index(docs_dir, embeddings)
+    vectors = load_vector_index(docs_dir, embeddings)
+    if vectors is None:
+        return None
+    return retrieval_index(vectors, Config.INDEX_CACHE_DIR)
@@ -0,0 +1,228 @@
+"""
+Compact, memory-mapped docstore for the FAISS vector store.
+
+LangChain's ``InMemoryDocstore`` keeps a ``Document`` object (text, metadata
+dict, pydantic overhead) per chunk. ``MmapDocstore`` instead keeps:
+
+- ``texts.bin``: every chunk's UTF-8 text back to back, memory-mapped
+- ``offsets.npy``: int64 start offsets into the blob (n + 1 entries)
+- ``ids.npy``: chunk IDs as a fixed-width bytes array, plus a sort order for lookup
+- ``meta.npz`` / ``meta_values.json``: one int32 code column per metadata key,
+  with each key's distinct JSON values stored once
+
+A ``Document`` is only built when ``search`` is called for a retrieved ID.
+Chunks added after opening (ingest, incremental updates) are appended to a
+private spill file, so ingest memory stays bounded as well; ``write``
+compacts base rows, added rows and deletions into a new set of files.
+"""
+
+import json
+import mmap
+import os
+import tempfile
+
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+FILES = ("texts.bin", "offsets.npy", "ids.npy", "meta.npz", "meta_values.json")
+
+
+class MmapDocstore(Docstore, AddableMixin):
+    """Docstore backed by a memory-mapped text blob and columnar metadata."""
+
+    def __init__(self):
+        self.directory = None
+        self._blob = None
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._ids = np.zeros(0, dtype="S1")
+        self._order = np.zeros(0, dtype=np.int64)
+        self._codes = {}
+        self._values = {}
+        self._deleted = set()
+        # Metadata changed on base rows since opening, as ``{row: {key: JSON-encoded value}}``
+        self._updated = {}
+        # Rows added since opening: text lives in a spill file, the rest in small lists
+        self._spill = None
+        self._spill_offsets = [0]
+        self._added = {}
+        self._added_ids = []
+        self._added_metadata = []
+
+    # ---------------------------------------------------------------
+    # Opening / writing
+    # ---------------------------------------------------------------
+    @classmethod
+    def open(cls, directory):
+        """Memory-map a docstore previously written with ``write``."""
+        with open(os.path.join(directory, "meta_values.json"), "r", encoding="utf-8") as f:
+            values = json.load(f)
+        with np.load(os.path.join(directory, "meta.npz")) as data:
+            codes = {key: data[key] for key in values}
+        blob = None
+        path = os.path.join(directory, "texts.bin")
+        if os.path.getsize(path):
+            with open(path, "rb") as f:
+                blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        store = cls.from_arrays(blob, np.load(os.path.join(directory, "offsets.npy")),
+                                np.load(os.path.join(directory, "ids.npy")), codes, values)
+        store.directory = directory
+        return store
+
+    @classmethod
+    def from_arrays(cls, blob, offsets, ids, codes, values, order=None):
+        """
+        Docstore over arrays that are already in memory (or mapped from a file).
+
+        Args:
+            blob: Buffer holding the chunk texts; sliced with ``offsets``
+            offsets: int64 start offsets of each row's text in ``blob`` (n + 1 entries)
+            ids: Fixed-width bytes array of chunk IDs
+            codes: ``{key: int32 codes}`` metadata columns (-1 where a row lacks the key)
+            values: ``{key: [JSON-encoded value, ...]}`` indexed by the codes
+            order: Sort order of ``ids``; computed when not given
+        """
+        store = cls()
+        store._blob = blob
+        store._offsets = offsets
+        store._ids = ids
+        store._order = order if order is not None else np.argsort(ids, kind="stable")
+        store._codes = codes
+        store._values = values
+        return store
+
+    @staticmethod
+    def exists(directory):
+        return all(os.path.exists(os.path.join(directory, name)) for name in FILES)
+
+    def _live_rows(self):
+        return [row for row in range(len(self)) if row not in self._deleted]
+
+    @property
+    def nbytes(self):
+        """Approximate resident size of the lookup structures (the text blob is paged in on demand)."""
+        arrays = [self._offsets, self._ids, self._order, *self._codes.values()]
+        return sum(a.nbytes for a in arrays)
+
+    def write(self, directory):
+        """Write the live rows (base + added, minus deleted) as a compacted store in ``directory``."""
+        rows = self._live_rows()
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        keys = set(self._values)
+        for metadata in [*self._added_metadata, *self._updated.values()]:
+            keys.update(metadata)
+        values = {key: [] for key in sorted(keys)}
+        lookup = {key: {} for key in values}
+        codes = {key: np.full(len(rows), -1, dtype=np.int32) for key in values}
+
+        with open(os.path.join(directory, "texts.bin"), "wb") as f:
+            for i, row in enumerate(rows):
+                data = self._text_bytes(row)
+                f.write(data)
+                offsets[i + 1] = offsets[i] + len(data)
+                for key, value in self._metadata_json(row).items():
+                    code = lookup[key].get(value)
+                    if code is None:
+                        code = lookup[key][value] = len(values[key])
+                        values[key].append(value)
+                    codes[key][i] = code
+        ids = np.array([self._row_id(row) for row in rows], dtype="S") if rows else np.zeros(0, dtype="S1")
+        np.save(os.path.join(directory, "offsets.npy"), offsets)
+        np.save(os.path.join(directory, "ids.npy"), ids)
+        np.savez(os.path.join(directory, "meta.npz"), **codes)
+        with open(os.path.join(directory, "meta_values.json"), "w", encoding="utf-8") as f:
+            json.dump(values, f)
+
+    # FAISS.save_local pickles the docstore; the data itself lives in the files
+    # next to the pickle and is reattached by ``index_cache.load_index``
+    def __getstate__(self):
+        return {"format": 1}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    # ---------------------------------------------------------------
+    # Row access
+    # ---------------------------------------------------------------
+    def __len__(self):
+        return len(self._ids) + len(self._spill_offsets) - 1
+
+    def _base_count(self):
+        return len(self._ids)
+
+    def _row_id(self, row):
+        if row < self._base_count():
+            return self._ids[row].decode("utf-8")
+        return self._added_ids[row - self._base_count()]
+
+    def _live(self, row):
+        return row is not None and row not in self._deleted
+
+    def _find(self, doc_id):
+        row = self._added.get(doc_id)
+        if row is not None:
+            return row
+        key = doc_id.encode("utf-8")
+        pos = np.searchsorted(self._ids, key, sorter=self._order)
+        if pos < len(self._order) and self._ids[self._order[pos]] == key:
+            return int(self._order[pos])
+        return None
+
+    def _text_bytes(self, row):
+        base = self._base_count()
+        if row < base:
+            return self._blob[self._offsets[row]:self._offsets[row + 1]] if self._blob is not None else b""
+        i = row - base
+        self._spill.seek(self._spill_offsets[i])
+        return self._spill.read(self._spill_offsets[i + 1] - self._spill_offsets[i])
+
+    def _metadata_json(self, row):
+        """Metadata of a row as ``{key: JSON-encoded value}``."""
+        base = self._base_count()
+        if row >= base:
+            return {k: json.dumps(v) for k, v in self._added_metadata[row - base].items()}
+        metadata = {key: self._values[key][codes[row]] for key, codes in self._codes.items() if codes[row] >= 0}
+        metadata.update(self._updated.get(row, {}))
+        return metadata
+
+    # ---------------------------------------------------------------
+    # Docstore interface
+    # ---------------------------------------------------------------
+    def search(self, search):
+        row = self._find(search)
+        if not self._live(row):
+            return f"ID {search} not found."
+        metadata = {key: json.loads(value) for key, value in self._metadata_json(row).items()}
+        return Document(page_content=self._text_bytes(row).decode("utf-8"), metadata=metadata)
+
+    def add(self, texts):
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(prefix="docstore_spill_")
+        overlapping = [doc_id for doc_id in texts if self._live(self._find(doc_id))]
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        self._spill.seek(0, os.SEEK_END)
+        for doc_id, doc in texts.items():
+            data = doc.page_content.encode("utf-8")
+            self._spill.write(data)
+            self._spill_offsets.append(self._spill_offsets[-1] + len(data))
+            self._added[doc_id] = len(self) - 1
+            self._added_ids.append(doc_id)
+            self._added_metadata.append(dict(doc.metadata))
+
+    def update_metadata(self, doc_id, metadata):
+        """Set metadata keys of a stored chunk; base rows keep the change in memory until ``write``."""
+        row = self._find(doc_id)
+        if not self._live(row):
+            raise ValueError(f"Tried to update an id that does not exist: {doc_id}")
+        if row >= self._base_count():
+            self._added_metadata[row - self._base_count()].update(metadata)
+        else:
+            self._updated.setdefault(row, {}).update({k: json.dumps(v) for k, v in metadata.items()})
+
+    def delete(self, ids):
+        rows = [self._find(doc_id) for doc_id in ids]
+        missing = [doc_id for doc_id, row in zip(ids, rows) if not self._live(row)]
+        if missing:
+            raise ValueError(f"Tried to delete ids that does not exist: {missing}")
+        self._deleted.update(rows)
@@ -0,0 +1,240 @@
+"""
+Persistent chunk-level embedding cache.
+
+Wraps any LangChain ``Embeddings`` so that each chunk text is only ever
+embedded once per model. Vectors live in one append-only matrix file that is
+memory-mapped for reads, next to a file of 16-byte text digests in the same
+row order. Cache misses are deduplicated and sent to the model in large
+batches.
+
+Several processes may share one cache directory (the app, the batch and
+shard scripts, more Streamlit workers). Appends are serialised with an
+exclusive ``flock`` on the directory's ``lock`` file, and row numbers come
+from the files themselves, so rows another process appended are picked up
+rather than overwritten by this process's view of the store.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads within one process are serialised
+    fcntl = None
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag_common.tracing import span
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 16
+_WHITESPACE = re.compile(r"\s+")
+
+
+def text_digest(text):
+    """Hash a chunk text after collapsing whitespace, so reflowed text still hits."""
+    normalized = _WHITESPACE.sub(" ", text).strip()
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped matrix of embeddings addressed by text digest."""
+
+    def __init__(self, directory, dtype="float16"):
+        """
+        Args:
+            directory: Directory for this model's cache files
+            dtype: Storage dtype; float16 halves disk and page-cache use
+        """
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.keys_path = os.path.join(directory, "keys.bin")
+        self.vectors_path = os.path.join(directory, "vectors.bin")
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.lock_path = os.path.join(directory, "lock")
+        self._lock = threading.Lock()
+        self._rows = {}
+        # Complete rows on disk read so far; more than len(_rows) when processes appended the same text
+        self._count = 0
+        self._matrix = None
+        self.dim = None
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._sync()
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the cache directory, shared with other processes."""
+        with open(self.lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _disk_rows(self):
+        row_bytes = self.dim * self.dtype.itemsize
+        sizes = [os.path.getsize(p) if os.path.exists(p) else 0 for p in (self.keys_path, self.vectors_path)]
+        return min(sizes[0] // DIGEST_SIZE, sizes[1] // row_bytes)
+
+    def _sync(self):
+        """Read rows appended since the last sync, by this or another process. Needs ``_lock``."""
+        if self.dim is None:
+            if not os.path.exists(self.meta_path):
+                return
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dim, self.dtype = meta["dim"], np.dtype(meta["dtype"])
+        # Vectors are appended before keys, so a row with a complete key has its vector
+        count = self._disk_rows()
+        if count <= self._count:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._count * DIGEST_SIZE)
+            keys = f.read((count - self._count) * DIGEST_SIZE)
+        for i in range(count - self._count):
+            self._rows[keys[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE]] = self._count + i
+        self._count = count
+        self._matrix = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(count, self.dim))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, digests):
+        """Return a list with a float32 vector for every cached digest and None for misses."""
+        with self._lock:
+            if any(digest not in self._rows for digest in digests):
+                self._sync()
+            rows, matrix = [self._rows.get(digest) for digest in digests], self._matrix
+        return [None if row is None else np.asarray(matrix[row], dtype=np.float32) for row in rows]
+
+    def put(self, digests, vectors):
+        """Append new digest/vector pairs to the store."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock():
+            self._sync()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self.meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self.dim, "dtype": self.dtype.name}, f)
+            fresh = [i for i, d in enumerate(digests) if d not in self._rows]
+            if not fresh:
+                return
+            # A crash between the two appends can leave one file longer than the other; cut both
+            # back to the complete rows so the new rows line up in both files
+            for path, size in ((self.vectors_path, self._count * self.dim * self.dtype.itemsize),
+                               (self.keys_path, self._count * DIGEST_SIZE)):
+                if os.path.exists(path) and os.path.getsize(path) > size:
+                    os.truncate(path, size)
+            # Vectors first: a row without a key is ignored, a key without a row is not safe
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors[fresh].astype(self.dtype).tobytes())
+            with open(self.keys_path, "ab") as f:
+                f.write(b"".join(digests[i] for i in fresh))
+            self._sync()
+
+
+class CachedEmbeddings(Embeddings):
+    """``Embeddings`` wrapper that serves repeated chunk texts from an ``EmbeddingStore``."""
+
+    def __init__(self, embeddings, model_name, cache_dir, batch_size=256, dtype="float16", symmetric=False):
+        """
+        Args:
+            embeddings: Underlying embeddings model
+            model_name: Model identifier; each model gets its own cache directory
+            cache_dir: Root directory for embedding caches
+            batch_size: Number of cache misses sent to the model per call
+            dtype: Storage dtype for cached vectors
+            symmetric: The model embeds queries exactly like documents (no query instruction), so
+                ``embed_queries`` may batch them through ``embed_documents``
+        """
+        self.embeddings = embeddings
+        self.symmetric = symmetric
+        self.batch_size = batch_size
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.store = EmbeddingStore(os.path.join(cache_dir, slug), dtype=dtype)
+        self.hits = 0
+        self.misses = 0
+        self.last_hits = 0
+
+    def embed_documents(self, texts):
+        with span("embed_documents", chunks=len(texts)) as attrs:
+            vectors = self._embed_documents(texts)
+            attrs.update(cache_hits=self.last_hits)
+            return vectors
+
+    def _embed_documents(self, texts):
+        digests = [text_digest(t) for t in texts]
+        vectors = self.store.get(digests)
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(digests[i], i)
+        self.last_hits = len(texts) - sum(v is None for v in vectors)
+        self.hits += self.last_hits
+        self.misses += len(missing)
+
+        pending = list(missing.items())
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            fresh = self.embeddings.embed_documents([texts[i] for _, i in batch])
+            self.store.put([d for d, _ in batch], fresh)
+            for (digest, _), vector in zip(batch, fresh):
+                missing[digest] = np.asarray(vector, dtype=np.float32)
+        if pending:
+            logger.info("Embedding cache: %d hits, %d new chunks embedded", len(texts) - len(pending), len(pending))
+
+        return [(v if v is not None else missing[digests[i]]).tolist() for i, v in enumerate(vectors)]
+
+    def embed_query(self, text):
+        with span("embed_query"):
+            return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts):
+        """
+        Embed several search queries at once, as queries and without caching them.
+
+        Questions are rarely repeated verbatim, so writing them to the store
+        would only grow it.
+        """
+        with span("embed_query", queries=len(texts)):
+            if self.symmetric and len(texts) > 1:
+                return self.embeddings.embed_documents(list(texts))
+            return [self.embeddings.embed_query(text) for text in texts]
+
+
+def embed_queries(embeddings, texts):
+    """``CachedEmbeddings.embed_queries`` for any ``Embeddings`` (one ``embed_query`` per text otherwise)."""
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings.embed_queries(texts)
+    return [embeddings.embed_query(text) for text in texts]
+
+
+def cached_huggingface_embeddings(model_name, cache_dir, batch_size=256, dtype="float16", server=None):
+    """
+    Build a ``HuggingFaceEmbeddings`` model wrapped in a ``CachedEmbeddings``.
+
+    The model's own encode batch size is raised to ``batch_size`` as well, so
+    each batch of misses is one ``encode`` call rather than many small ones.
+    With ``server`` (an embedding server address) the model runs in the shared
+    server process instead, behind the same cache.
+    """
+    if server:
+        from rag_common.embedding_client import RemoteEmbeddings
+
+        model = RemoteEmbeddings(server, model_name)
+    else:
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        model = HuggingFaceEmbeddings(model_name=model_name, encode_kwargs={"batch_size": batch_size})
+    # Neither HuggingFaceEmbeddings nor the server add a query instruction: queries embed like documents
+    return CachedEmbeddings(model, model_name, cache_dir, batch_size=batch_size, dtype=dtype, symmetric=True)
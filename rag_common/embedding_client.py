@@ -0,0 +1,88 @@
+"""
+``Embeddings`` client for the shared embedding server (``rag_common.embedding_server``).
+
+A drop-in for ``HuggingFaceEmbeddings``: the apps keep wrapping it in
+``CachedEmbeddings``, only the model now runs in the server process. Each
+calling thread keeps one keep-alive connection, so a query costs one local
+round trip plus at most the server's batching wait.
+"""
+
+import http.client
+import json
+import socket
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def connect(address, timeout=60.0):
+    """HTTP connection for a server ``address`` (``unix:/path``, ``http://host:port`` or ``host:port``)."""
+    if address.startswith("unix:"):
+        return _UnixHTTPConnection(address[len("unix:"):], timeout)
+    host, _, port = address.removeprefix("http://").rstrip("/").rpartition(":")
+    return http.client.HTTPConnection(host or "127.0.0.1", int(port), timeout=timeout)
+
+
+class RemoteEmbeddings(Embeddings):
+    """Embeddings computed by a shared embedding server."""
+
+    def __init__(self, address, model_name, timeout=60.0):
+        """
+        Args:
+            address: Server address, e.g. ``unix:/tmp/rag-embed.sock`` or ``127.0.0.1:8765``
+            model_name: Model the server should use (loaded there on first use)
+            timeout: Seconds to wait for a response
+        """
+        self.address = address
+        self.model_name = model_name
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _request(self, method, path, body=None, headers=None):
+        # A kept-alive connection may have been closed by the server; retry once on a fresh one
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = connect(self.address, self.timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                return response, response.read()
+            except (ConnectionError, http.client.HTTPException, OSError) as e:
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise ConnectionError(f"Embedding server at {self.address} is unreachable: {e}") from e
+
+    def embed_array(self, texts):
+        """Embed ``texts`` into a float32 matrix (one row per text)."""
+        body = json.dumps({"model": self.model_name, "texts": list(texts)}).encode("utf-8")
+        response, data = self._request("POST", "/embed", body, {"Content-Type": "application/json"})
+        if response.status != 200:
+            raise RuntimeError(f"Embedding server error {response.status}: {data.decode('utf-8', 'replace')}")
+        rows, dim = (int(n) for n in response.getheader("X-Embedding-Shape").split(","))
+        return np.frombuffer(data, dtype="<f4").reshape(rows, dim)
+
+    def health(self):
+        _, data = self._request("GET", "/health")
+        return json.loads(data)
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_array([text])[0].tolist()
@@ -0,0 +1,314 @@
+"""
+Shared local embedding server with dynamic micro-batching.
+
+Every Streamlit worker process used to load its own copy of the
+sentence-transformers model and embed one query at a time. This server
+holds one instance per model for every process on the machine. It listens
+for HTTP on localhost or on a Unix socket, and merges concurrent requests
+into micro-batches:
+
+- each request's texts go into a queue per model; one batcher thread per
+  model takes the oldest request and keeps adding queued requests until the
+  batch holds ``max_batch_size`` texts or the oldest request has waited
+  ``max_wait_ms``
+- the whole batch is one ``embed_documents`` call (one forward pass), and
+  each request gets its own rows back
+
+A lone query waits at most ``max_wait_ms``. Under load, requests that queued
+while the previous batch ran go out together at once, which is where the
+throughput comes from. The queries of both apps' sentence-transformers
+models are embedded exactly like documents, so queries and chunks share the
+batches.
+
+Protocol (see ``rag_common.embedding_client``)::
+
+    POST /embed   {"model": name, "texts": [...]}  ->  float32 rows, ``X-Embedding-Shape: n,dim``
+    GET  /health  ->  JSON with per-model batching statistics
+
+Run it once per machine from the repository root, then set
+``RAG_EMBEDDING_SERVER`` for the apps:
+
+    python -m rag_common.embedding_server --address unix:/tmp/rag-embed.sock \\
+        --model sentence-transformers/all-mpnet-base-v2 --model all-MiniLM-L6-v2
+    RAG_EMBEDDING_SERVER=unix:/tmp/rag-embed.sock streamlit run app.py
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class MicroBatcher:
+    """Runs ``embed_fn`` on micro-batches assembled from concurrent ``embed`` calls."""
+
+    def __init__(self, embed_fn, max_batch_size=64, max_wait_ms=5.0, name="embed-batcher"):
+        """
+        Args:
+            embed_fn: ``fn(texts) -> vectors`` (e.g. a model's ``embed_documents``)
+            max_batch_size: Texts per batch; a single larger request still runs as one batch
+            max_wait_ms: Longest time the oldest queued request waits for others to join it
+            name: Name of the batcher thread
+        """
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "texts": 0, "batches": 0, "embed_s": 0.0, "max_queue_ms": 0.0}
+        threading.Thread(target=self._run, name=name, daemon=True).start()
+
+    def submit(self, texts):
+        """Queue ``texts``; the returned ``Future`` resolves to a float32 matrix with one row per text."""
+        request = _Request(list(texts))
+        self._queue.put(request)
+        return request.future
+
+    def embed(self, texts, timeout=None):
+        return self.submit(texts).result(timeout)
+
+    def _collect(self):
+        first = self._queue.get()
+        batch, size = [first], len(first.texts)
+        # The deadline runs from the oldest request's arrival, so requests that queued
+        # behind a running batch are sent as soon as the model is free
+        deadline = first.enqueued + self.max_wait
+        while size < self.max_batch_size:
+            try:
+                request = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for request in batch for text in request.texts]
+            started = time.monotonic()
+            try:
+                vectors = np.asarray(self.embed_fn(texts), dtype=np.float32) if texts else None
+            except Exception as e:
+                logger.exception("Embedding batch of %d texts failed", len(texts))
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            finished = time.monotonic()
+            start = 0
+            for request in batch:
+                count = len(request.texts)
+                request.future.set_result(vectors[start:start + count] if count else np.zeros((0, 0), np.float32))
+                start += count
+            with self._lock:
+                self.stats["requests"] += len(batch)
+                self.stats["texts"] += len(texts)
+                self.stats["batches"] += 1
+                self.stats["embed_s"] += finished - started
+                queued_ms = (started - batch[0].enqueued) * 1000
+                self.stats["max_queue_ms"] = max(self.stats["max_queue_ms"], queued_ms)
+
+    def summary(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["mean_batch_texts"] = round(stats["texts"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["embed_s"] = round(stats["embed_s"], 3)
+        stats["max_queue_ms"] = round(stats["max_queue_ms"], 2)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+
+def huggingface_model(model_name, batch_size):
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=model_name, encode_kwargs={"batch_size": batch_size})
+
+
+class ModelRegistry:
+    """One model instance and ``MicroBatcher`` per model name, loaded on first use."""
+
+    def __init__(self, model_factory=huggingface_model, max_batch_size=64, max_wait_ms=5.0):
+        """
+        Args:
+            model_factory: ``fn(model_name, batch_size) -> Embeddings``
+            max_batch_size: See ``MicroBatcher``
+            max_wait_ms: See ``MicroBatcher``
+        """
+        self.model_factory = model_factory
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._batchers = {}
+        # Models being loaded: name -> Future of the batcher, awaited by concurrent requests for it
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name):
+        # The load runs outside the lock, so /health and other models are not held up by a cold load
+        with self._lock:
+            batcher = self._batchers.get(model_name)
+            if batcher is not None:
+                return batcher
+            future = self._loading.get(model_name)
+            if future is None:
+                future = self._loading[model_name] = Future()
+                loader = True
+            else:
+                loader = False
+        if not loader:
+            return future.result()
+        try:
+            logger.info("Loading embedding model %s", model_name)
+            model = self.model_factory(model_name, self.max_batch_size)
+            batcher = MicroBatcher(
+                model.embed_documents, self.max_batch_size, self.max_wait_ms, name=f"embed-{model_name}")
+        except BaseException as e:
+            # Waiting requests fail with the same error; the next request tries again
+            with self._lock:
+                del self._loading[model_name]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._batchers[model_name] = batcher
+            del self._loading[model_name]
+        future.set_result(batcher)
+        return batcher
+
+    def summary(self):
+        with self._lock:
+            return {name: batcher.summary() for name, batcher in self._batchers.items()}
+
+
+class EmbeddingHandler(BaseHTTPRequestHandler):
+    # Keep-alive: each client thread reuses one connection
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def _reply(self, status, body, content_type="application/json", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._reply(status, json.dumps({"error": message}).encode("utf-8"))
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self._error(404, f"Unknown path {self.path}")
+        self._reply(200, json.dumps({"status": "ok", "models": self.server.registry.summary()}).encode("utf-8"))
+
+    def do_POST(self):
+        if self.path != "/embed":
+            return self._error(404, f"Unknown path {self.path}")
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            model_name, texts = request["model"], request["texts"]
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise ValueError("\"texts\" must be a list of strings")
+        except (KeyError, ValueError) as e:
+            return self._error(400, f"Bad request: {e}")
+        try:
+            vectors = self.server.registry.get(model_name).embed(texts)
+        except Exception as e:
+            return self._error(500, repr(e))
+        shape = f"{len(texts)},{vectors.shape[1] if len(texts) else 0}"
+        self._reply(200, vectors.astype("<f4").tobytes(), "application/octet-stream",
+                    [("X-Embedding-Shape", shape)])
+
+
+class _TCPEmbeddingHandler(EmbeddingHandler):
+    # Headers and body are written separately; without this, Nagle's algorithm holds the
+    # body back until the client's delayed ACK arrives (~40 ms per request)
+    disable_nagle_algorithm = True
+
+
+class _TCPHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Every session connects at once after a restart; the default backlog of 5 drops SYNs
+    request_queue_size = 128
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def make_server(address, registry):
+    """
+    HTTP server for ``address``: ``unix:/path/to.sock``, ``http://host:port`` or ``host:port``.
+    """
+    if address.startswith("unix:"):
+        path = address[len("unix:"):]
+        if os.path.exists(path):
+            os.unlink(path)
+        server = _UnixHTTPServer(path, EmbeddingHandler)
+    else:
+        host, _, port = address.removeprefix("http://").rstrip("/").rpartition(":")
+        server = _TCPHTTPServer((host or "127.0.0.1", int(port)), _TCPEmbeddingHandler)
+    server.registry = registry
+    return server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--address", default="127.0.0.1:8765", help="host:port or unix:/path/to.sock")
+    parser.add_argument("--model", action="append", default=[], help="Model to load at startup (repeatable)")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--fake", action="store_true", help="Serve hashing embeddings instead of real models")
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = parse_args()
+    if args.fake:
+        from rag_common.fakes import HashingEmbeddings
+
+        def factory(model_name, batch_size):
+            return HashingEmbeddings()
+    else:
+        factory = huggingface_model
+    registry = ModelRegistry(factory, args.max_batch_size, args.max_wait_ms)
+    for name in args.model:
+        registry.get(name)
+    server = make_server(args.address, registry)
+    logger.info("Embedding server listening on %s", args.address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
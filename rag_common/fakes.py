@@ -0,0 +1,259 @@
+"""
+Deterministic local stand-ins for the Groq chat model and HuggingFace embeddings.
+
+They let the RAG chains run end to end with no network and no model
+download, e.g. for benchmarks. ``HashingEmbeddings`` uses feature hashing of
+word tokens, so texts sharing words still get similar vectors and retrieval
+results stay meaningful. ``FakeChatModel`` answers after a configurable
+first-token latency and streams at a configurable token rate.
+``FakeChatServer`` serves the same answers over HTTP as an OpenAI-compatible
+``/chat/completions`` endpoint, with injectable 429s, 5xx errors and slow
+tails, for exercising ``rag_common.llm_client``.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from rag_common.ratelimit import TokenBucket
+
+_TOKEN = re.compile(r"\w+")
+
+
+class HashingEmbeddings(Embeddings):
+    """Bag-of-words feature-hashing embeddings, L2-normalised."""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in _TOKEN.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[h % self.dim] += 1.0 if (h >> 63) else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def _answer_tokens(prompt, count):
+    # Deterministic per prompt, so repeated questions give repeated answers
+    seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return [f"{seed[i % 60:i % 60 + 4]} " for i in range(count)]
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that echoes a fixed-length answer with simulated latency."""
+
+    first_token_latency: float = 0.2
+    tokens_per_second: float = 200.0
+    answer_tokens: int = 50
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _answer_tokens(self, messages):
+        return _answer_tokens(str(messages[-1].content), self.answer_tokens)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._answer_tokens(messages)
+        time.sleep(self.first_token_latency + len(tokens) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        time.sleep(self.first_token_latency)
+        for token in self._answer_tokens(messages):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            time.sleep(1.0 / self.tokens_per_second)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        await asyncio.sleep(self.first_token_latency)
+        for token in self._answer_tokens(messages):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(1.0 / self.tokens_per_second)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._answer_tokens(messages)
+        await asyncio.sleep(self.first_token_latency + len(tokens) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.fake.count("connections")
+
+    def _send(self, status, body, headers):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunk(self, payload):
+        data = f"data: {json.dumps(payload) if isinstance(payload, dict) else payload}\n\n".encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self):
+        try:
+            self._post()
+        except ConnectionError:
+            # The client hung up, e.g. a hedged request that lost the race and was cancelled
+            self.close_connection = True
+
+    def _post(self):
+        fake = self.server.fake
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            return self._send(404, {"error": {"message": f"Unknown path {self.path}"}}, {})
+        prompt = "".join(str(m.get("content", "")) for m in body.get("messages", ()))
+        tokens = _answer_tokens(prompt, fake.answer_tokens)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(tokens),
+                 "total_tokens": len(prompt) // 4 + len(tokens)}
+        status, delay, headers = fake.admit(usage["total_tokens"])
+        if status != 200:
+            time.sleep(delay)
+            message = "Rate limit reached" if status == 429 else "Service unavailable"
+            return self._send(status, {"error": {"message": message}}, headers)
+        model = body.get("model", "fake")
+        if not body.get("stream"):
+            time.sleep(delay + len(tokens) / fake.tokens_per_second)
+            return self._send(200, {
+                "id": "chatcmpl-fake", "object": "chat.completion", "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            }, headers)
+        time.sleep(delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        for token in tokens:
+            self._chunk({"object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+            time.sleep(1.0 / fake.tokens_per_second)
+        self._chunk({"object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}})
+        self._chunk("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class FakeChatServer:
+    """
+    Local OpenAI-compatible chat completions server with Groq-style rate limits.
+
+    Answers like ``FakeChatModel`` after ``first_token_latency``; a
+    ``slow_rate`` share of requests takes ``slow_latency`` seconds longer (the
+    slow tail hedging is meant for) and an ``error_rate`` share fails with
+    503. With ``requests_per_minute`` or ``tokens_per_minute`` set, requests
+    beyond the quota get 429 with ``Retry-After``, and every response carries
+    ``x-ratelimit-*`` headers. ``stats`` counts connections, requests and
+    responses by status.
+
+    Use as a context manager; ``base_url`` is the API root for the client.
+    """
+
+    def __init__(self, first_token_latency=0.05, tokens_per_second=2000.0, answer_tokens=50,
+                 slow_rate=0.0, slow_latency=1.0, error_rate=0.0, requests_per_minute=0,
+                 tokens_per_minute=0, burst_seconds=60.0, seed=0):
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        # Quotas are enforced as token buckets holding ``burst_seconds`` worth of requests and tokens
+        self._requests = TokenBucket(requests_per_minute / 60.0, requests_per_minute / 60.0 * burst_seconds)
+        self._tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute / 60.0 * burst_seconds)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"connections": 0, "requests": 0}
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}/openai/v1"
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def admit(self, tokens):
+        """Decide a request's fate: ``(status, delay, headers)``."""
+        now = time.monotonic()
+        with self._lock:
+            self.stats["requests"] += 1
+            roll = self._random.random()
+            slow = self._random.random() < self.slow_rate
+            limited = (self.requests_per_minute and self._requests.available(now) < 1) or \
+                (self.tokens_per_minute and self._tokens.available(now) < tokens)
+            if not limited:
+                self._requests.try_take(1, now)
+                self._tokens.reserve(tokens, now)
+            request_wait = max(0.0, 1 - self._requests.available(now)) / self._requests.rate \
+                if self.requests_per_minute else 0.0
+            token_wait = max(0.0, tokens - self._tokens.available(now)) / self._tokens.rate \
+                if self.tokens_per_minute else 0.0
+            headers = {}
+            if self.requests_per_minute:
+                headers.update({"x-ratelimit-limit-requests": str(self.requests_per_minute),
+                                "x-ratelimit-remaining-requests": str(max(0, int(self._requests.available(now)))),
+                                "x-ratelimit-reset-requests": f"{request_wait:.2f}s"})
+            if self.tokens_per_minute:
+                headers.update({"x-ratelimit-limit-tokens": str(self.tokens_per_minute),
+                                "x-ratelimit-remaining-tokens": str(max(0, int(self._tokens.available(now))))})
+            if limited:
+                headers["retry-after"] = f"{max(request_wait, token_wait, 0.01):.2f}"
+                status, delay = 429, 0.0
+            elif roll < self.error_rate:
+                status, delay = 503, self.first_token_latency
+            else:
+                status, delay = 200, self.first_token_latency + (self.slow_latency if slow else 0.0)
+            self.stats[status] = self.stats.get(status, 0) + 1
+        return status, delay, headers
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, name="fake-chat-server", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,154 @@
+"""
+Hybrid lexical + dense retrieval with reciprocal-rank fusion.
+
+The BM25 and FAISS searches run concurrently on a shared thread pool (both
+release the GIL for their numeric work) and their rankings are fused with
+RRF: ``score(d) = sum(1 / (rrf_k + rank))`` over the lists ``d`` appears in.
+Async callers await the same pool, so the event loop is never blocked.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from rag_common.embedding_cache import embed_queries
+from rag_common.tracing import run_in_trace, span
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+
+
+def dense_search(vectors, query, k, embedding=None):
+    """
+    Return the top ``k`` docstore IDs from a LangChain FAISS store, best first.
+
+    ``embedding`` is the query vector, if the caller already computed it.
+    """
+    embedding = np.asarray([vectors._embed_query(query) if embedding is None else embedding], dtype=np.float32)
+    if vectors._normalize_L2:
+        embedding /= np.linalg.norm(embedding, axis=1, keepdims=True)
+    with span("dense", k=k):
+        _, positions = vectors.index.search(embedding, k)
+    return [vectors.index_to_docstore_id[int(p)] for p in positions[0] if p != -1]
+
+
+def dense_search_batch(vectors, query_embeddings, k):
+    """Top ``k`` docstore IDs for every row of ``query_embeddings``, from one matrix search."""
+    matrix = np.asarray(query_embeddings, dtype=np.float32)
+    if vectors._normalize_L2:
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    with span("dense", k=k, queries=len(matrix)):
+        _, positions = vectors.index.search(matrix, k)
+    return [[vectors.index_to_docstore_id[int(p)] for p in row if p != -1] for row in positions]
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=60):
+    """
+    Fuse several best-first lists of IDs.
+
+    Returns:
+        List of ``(id, score)`` pairs, best first
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever fusing BM25 and dense FAISS results over the same chunks (dense only without ``bm25``).
+
+    ``invoke`` / ``ainvoke`` accept an ``embedding=`` keyword with the query
+    vector, for callers that already embedded the question for something else.
+    """
+
+    vectors: Any
+    bm25: Any
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def lexical_search(self, query):
+        with span("bm25", k=self.fetch_k):
+            return [doc_id for doc_id, _ in self.bm25.search(query, self.fetch_k)]
+
+    def search_ids(self, query, embedding=None):
+        """Run both searches concurrently and return fused ``(id, score)`` pairs."""
+        if self.bm25 is None:
+            return [(doc_id, None) for doc_id in dense_search(self.vectors, query, self.k, embedding)]
+        dense = _executor.submit(run_in_trace(dense_search, self.vectors, query, self.fetch_k, embedding))
+        lexical = self.lexical_search(query)
+        return reciprocal_rank_fusion([dense.result(), lexical], self.rrf_k)[:self.k]
+
+    async def asearch_ids(self, query, embedding=None):
+        """``search_ids`` for asyncio callers: both searches run on the pool while the loop stays free."""
+        loop = asyncio.get_running_loop()
+        if self.bm25 is None:
+            dense = await loop.run_in_executor(
+                _executor, run_in_trace(dense_search, self.vectors, query, self.k, embedding))
+            return [(doc_id, None) for doc_id in dense]
+        dense, lexical = await asyncio.gather(
+            loop.run_in_executor(_executor, run_in_trace(dense_search, self.vectors, query, self.fetch_k, embedding)),
+            loop.run_in_executor(_executor, run_in_trace(self.lexical_search, query)),
+        )
+        return reciprocal_rank_fusion([dense, lexical], self.rrf_k)[:self.k]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, embedding: Optional[List[float]] = None
+    ) -> List[Document]:
+        return [self.vectors.docstore.search(doc_id) for doc_id, _ in self.search_ids(query, embedding)]
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun, embedding: Optional[List[float]] = None
+    ) -> List[Document]:
+        return [self.vectors.docstore.search(doc_id) for doc_id, _ in await self.asearch_ids(query, embedding)]
+
+
+class RetrievalIndex:
+    """A vector store plus the optional BM25 index built over the same chunks."""
+
+    def __init__(self, vectors, bm25=None, k=4, fetch_k=20, rrf_k=60):
+        self.vectors = vectors
+        self.bm25 = bm25
+        self.k = k
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+
+    def __len__(self):
+        return len(self.vectors.index_to_docstore_id)
+
+    def search_batch(self, queries):
+        """
+        Retrieve for many queries at once, ranked the same way as ``as_retriever``.
+
+        The queries are embedded as queries, batched where the model allows it
+        (``CachedEmbeddings.embed_queries``) and never written to the chunk
+        cache, then searched as one matrix; BM25 and fusion run per query.
+
+        Returns:
+            One list of Documents per query, best first
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        embeddings = embed_queries(self.vectors.embeddings, queries)
+        dense = dense_search_batch(self.vectors, embeddings, self.k if self.bm25 is None else self.fetch_k)
+        results = []
+        for query, dense_ids in zip(queries, dense):
+            if self.bm25 is None:
+                ids = dense_ids[:self.k]
+            else:
+                lexical = [doc_id for doc_id, _ in self.bm25.search(query, self.fetch_k)]
+                ids = [doc_id for doc_id, _ in reciprocal_rank_fusion([dense_ids, lexical], self.rrf_k)[:self.k]]
+            results.append([self.vectors.docstore.search(doc_id) for doc_id in ids])
+        return results
+
+    def as_retriever(self):
+        """Hybrid retriever when a BM25 index is present, dense-only otherwise."""
+        return HybridRetriever(vectors=self.vectors, bm25=self.bm25, k=self.k, fetch_k=self.fetch_k, rrf_k=self.rrf_k)
@@ -0,0 +1,176 @@
+"""
+On-disk cache for FAISS vector indexes.
+
+The cache is keyed by a hash of the corpus (every PDF's content hash), the
+splitter settings and the embedding model name. A saved index is only reused
+when the key matches, so editing a paper, changing the chunking or swapping
+the embedding model triggers a rebuild automatically.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from langchain_community.vectorstores import FAISS
+
+from rag_common.docstore import MmapDocstore
+
+logger = logging.getLogger(__name__)
+
+KEY_FILE = "cache_key.json"
+
+
+def hash_file(path, block_size=1 << 20):
+    """
+    Compute the SHA-256 of a file without reading it into memory at once.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_pdfs(directory):
+    """Return the sorted relative paths of every PDF under ``directory``."""
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                paths.append(os.path.relpath(os.path.join(root, name), directory))
+    return sorted(paths)
+
+
+def corpus_key(directory, chunk_size, chunk_overlap, model_name, **extra):
+    """
+    Build the cache key for a PDF directory and its ingestion settings.
+
+    Args:
+        directory: Directory holding the PDFs
+        chunk_size: Splitter chunk size
+        chunk_overlap: Splitter chunk overlap
+        model_name: Embedding model name
+        **extra: Any further settings that change the index contents
+
+    Returns:
+        Hex digest string identifying the corpus + settings combination
+    """
+    payload = {
+        "files": {rel: hash_file(os.path.join(directory, rel)) for rel in list_pdfs(directory)},
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "model_name": model_name,
+        "extra": extra,
+    }
+    encoded = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def read_meta(cache_dir):
+    """Return the metadata stored with a cached index, or an empty dict if there is none."""
+    try:
+        with open(os.path.join(cache_dir, KEY_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def read_key(cache_dir):
+    """Return the key stored with a cached index, or None if there is no usable cache."""
+    return read_meta(cache_dir).get("key")
+
+
+def load_index(cache_dir, key, embeddings):
+    """
+    Load a cached FAISS index if it was built for ``key``.
+
+    Args:
+        cache_dir: Directory the index was saved to
+        key: Expected cache key (see ``corpus_key``)
+        embeddings: Embeddings instance used for query encoding
+
+    Returns:
+        FAISS vector store, or None on a cache miss
+    """
+    if read_key(cache_dir) != key:
+        return None
+    try:
+        # The pickle was written by this module, never taken from users.
+        vectors = FAISS.load_local(cache_dir, embeddings, allow_dangerous_deserialization=True)
+        if isinstance(vectors.docstore, MmapDocstore):
+            vectors.docstore = MmapDocstore.open(cache_dir)
+        return vectors
+    except Exception as e:
+        logger.warning("Ignoring unreadable index cache at %s: %s", cache_dir, e)
+        return None
+
+
+def save_index(vectors, cache_dir, key, **meta):
+    """
+    Persist a FAISS index together with its cache key.
+
+    The index is written to a temporary sibling directory first and then
+    swapped into place, so a crash mid-write never leaves a half-written
+    index behind a valid key. An ``MmapDocstore`` is compacted into the same
+    directory and reopened from it, which releases any chunks it was holding
+    in its spill file.
+
+    Args:
+        vectors: FAISS vector store
+        cache_dir: Target directory
+        key: Cache key to record
+        **meta: Extra JSON-serialisable metadata stored alongside the key
+    """
+    parent = os.path.dirname(os.path.abspath(cache_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".faiss_tmp_", dir=parent)
+    try:
+        vectors.save_local(tmp_dir)
+        if isinstance(vectors.docstore, MmapDocstore):
+            vectors.docstore.write(tmp_dir)
+        with open(os.path.join(tmp_dir, KEY_FILE), "w", encoding="utf-8") as f:
+            json.dump(dict(meta, key=key), f)
+        if os.path.exists(cache_dir):
+            shutil.rmtree(cache_dir)
+        os.replace(tmp_dir, cache_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    if isinstance(vectors.docstore, MmapDocstore):
+        vectors.docstore = MmapDocstore.open(cache_dir)
+
+
+def load_or_build(cache_dir, key, embeddings, build_fn):
+    """
+    Return the cached index for ``key``, building and saving it on a miss.
+
+    Args:
+        cache_dir: Directory the index is cached in
+        key: Cache key for the current corpus and settings
+        embeddings: Embeddings instance used for query encoding
+        build_fn: Zero-argument callable returning a fresh FAISS store, or None if there
+            is nothing to index
+
+    Returns:
+        Tuple of (vector store or None, cache_hit)
+    """
+    vectors = load_index(cache_dir, key, embeddings)
+    if vectors is not None:
+        logger.info("Loaded cached index from %s", cache_dir)
+        return vectors, True
+    logger.info("Index cache miss, rebuilding %s", cache_dir)
+    vectors = build_fn()
+    if vectors is None:
+        # An empty corpus leaves nothing to save; the next run checks again
+        return None, False
+    save_index(vectors, cache_dir, key)
+    return vectors, False
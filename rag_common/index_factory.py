@@ -0,0 +1,161 @@
+"""
+Approximate-nearest-neighbour index options for the FAISS vector store.
+
+``FAISS.from_documents`` always builds an exact ``IndexFlatL2``. Ingest keeps
+doing that: the flat index is the persisted source of truth, because it
+needs no training and supports the deletes that incremental ingest relies
+on. The ANN index is derived from it with the same row order, so the
+LangChain docstore and ID mapping stay valid, and is cached next to it:
+
+- ``flat``: exact search, full float32 vectors
+- ``ivf_flat``: inverted lists, full vectors; tune ``nlist`` / ``nprobe``
+- ``ivf_pq``: inverted lists, product-quantised vectors; ``pq_m`` x ``pq_nbits`` bits each
+- ``hnsw``: graph index; tune ``hnsw_m`` / ``ef_construction`` / ``ef_search``
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# faiss warns below roughly this many training points per IVF centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+class IndexSpec:
+    """Build and search parameters for one index type."""
+
+    def __init__(self, kind="flat", nlist=1024, nprobe=16, pq_m=32, pq_nbits=8,
+                 hnsw_m=32, ef_construction=200, ef_search=64):
+        if kind not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {kind!r}; expected one of {', '.join(INDEX_TYPES)}")
+        self.kind = kind
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+
+    def build_params(self):
+        """Parameters that change the index contents (used in cache keys)."""
+        params = {"kind": self.kind}
+        if self.kind.startswith("ivf"):
+            params["nlist"] = self.nlist
+        if self.kind == "ivf_pq":
+            params.update(pq_m=self.pq_m, pq_nbits=self.pq_nbits)
+        if self.kind == "hnsw":
+            params.update(hnsw_m=self.hnsw_m, ef_construction=self.ef_construction)
+        return params
+
+    def __repr__(self):
+        return f"IndexSpec({self.build_params()}, nprobe={self.nprobe}, ef_search={self.ef_search})"
+
+
+def make_index(spec, dim, ntotal):
+    """
+    Create an empty (untrained) faiss index for ``spec``.
+
+    ``nlist`` is capped so every centroid gets enough training points from a
+    corpus of ``ntotal`` vectors; corpora too small to train an ANN index at
+    all fall back to an exact flat index.
+    """
+    if spec.kind == "flat":
+        return faiss.IndexFlatL2(dim)
+    if spec.kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, spec.hnsw_m)
+        index.hnsw.efConstruction = spec.ef_construction
+        return index
+
+    nlist = min(spec.nlist, ntotal // MIN_POINTS_PER_CENTROID)
+    if nlist < 1 or (spec.kind == "ivf_pq" and ntotal < 2 ** spec.pq_nbits):
+        logger.warning("Corpus of %d vectors is too small for %s, keeping a flat index", ntotal, spec.kind)
+        return faiss.IndexFlatL2(dim)
+    quantizer = faiss.IndexFlatL2(dim)
+    if spec.kind == "ivf_flat":
+        return faiss.IndexIVFFlat(quantizer, dim, nlist)
+    if dim % spec.pq_m:
+        raise ValueError(f"pq_m={spec.pq_m} must divide the embedding dimension {dim}")
+    return faiss.IndexIVFPQ(quantizer, dim, nlist, spec.pq_m, spec.pq_nbits)
+
+
+def apply_search_params(index, spec):
+    """Set the query-time knobs (``nprobe`` / ``efSearch``) on a built index."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = spec.nprobe
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = spec.ef_search
+
+
+def iter_vectors(index, batch_size=65536):
+    """Yield the stored vectors of a flat index in row order, one batch at a time."""
+    for start in range(0, index.ntotal, batch_size):
+        yield index.reconstruct_n(start, min(batch_size, index.ntotal - start))
+
+
+def train_sample(index, max_points=100000, seed=0):
+    """Draw up to ``max_points`` stored vectors for training."""
+    if index.ntotal <= max_points:
+        return index.reconstruct_n(0, index.ntotal)
+    rows = np.sort(np.random.default_rng(seed).choice(index.ntotal, max_points, replace=False))
+    return np.vstack([index.reconstruct(int(i)) for i in rows])
+
+
+def build_from(flat_index, spec):
+    """Build a trained index for ``spec`` holding the same vectors, in the same order, as ``flat_index``."""
+    index = make_index(spec, flat_index.d, flat_index.ntotal)
+    if not index.is_trained:
+        index.train(train_sample(flat_index))
+    for batch in iter_vectors(flat_index):
+        index.add(batch)
+    apply_search_params(index, spec)
+    return index
+
+
+def load_or_convert(vectors, spec, cache_dir=None):
+    """
+    Swap the flat faiss index inside a LangChain FAISS store for the type in ``spec``.
+
+    When ``cache_dir`` is given the converted index is stored there, named
+    after its build parameters. Every save of the flat index replaces the
+    whole cache directory, so a converted index on disk always matches the
+    flat index next to it.
+
+    Returns:
+        The same FAISS store, for chaining
+    """
+    if vectors is None or spec.kind == "flat" or not isinstance(vectors.index, faiss.IndexFlat):
+        if vectors is not None:
+            apply_search_params(vectors.index, spec)
+        return vectors
+    path = None
+    if cache_dir:
+        digest = hashlib.sha256(json.dumps(spec.build_params(), sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        path = os.path.join(cache_dir, f"ann_{digest}.faiss")
+    if path and os.path.exists(path):
+        index = faiss.read_index(path)
+    else:
+        logger.info("Building %r over %d vectors", spec, vectors.index.ntotal)
+        index = build_from(vectors.index, spec)
+        if path:
+            faiss.write_index(index, path)
+    if index.ntotal != vectors.index.ntotal:
+        logger.warning("Cached ANN index at %s is stale, keeping the flat index", path)
+        return vectors
+    apply_search_params(index, spec)
+    vectors.index = index
+    return vectors
+
+
+def index_memory_bytes(index):
+    """Size of the serialised index, a close proxy for its resident memory."""
+    return int(faiss.serialize_index(index).nbytes)
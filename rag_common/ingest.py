@@ -0,0 +1,255 @@
+"""
+Incremental ingestion of a PDF directory into a FAISS index.
+
+A manifest stored with the cached index records, for every PDF, its content
+hash, size, mtime and the IDs of the chunks it produced. On each run only new
+or modified files are loaded, split and embedded; chunks of removed or
+modified files are deleted from the index by ID, and the index is updated in
+place instead of being rebuilt from scratch.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+from rag_common import dedup, index_cache
+from rag_common.pdf_loader import ParallelPDFLoader
+
+logger = logging.getLogger(__name__)
+
+
+def settings_key(chunk_size, chunk_overlap, model_name, **extra):
+    """
+    Hash the settings that make an existing index incompatible when changed.
+
+    Unlike ``index_cache.corpus_key`` this ignores file contents, which are
+    tracked per file in the manifest instead.
+    """
+    payload = {
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "model_name": model_name,
+        "extra": extra,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def chunk_ids(rel_path, file_hash, count):
+    """
+    Deterministic vector-store IDs for the chunks of one file version.
+
+    The path is part of the ID so two identical copies of a paper under
+    different names do not collide in the docstore.
+    """
+    prefix = hashlib.sha256(f"{rel_path}\0{file_hash}".encode("utf-8")).hexdigest()[:16]
+    return [f"{prefix}-{i}" for i in range(count)]
+
+
+def batched(items, size):
+    """Yield lists of up to ``size`` items from any iterable without materialising it."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_chunks(pages, splitter, pages_per_batch=64):
+    """Split a stream of page Documents into a stream of chunk Documents."""
+    # Batches let a token-aware splitter tokenize many pages in one call
+    for batch in batched(pages, pages_per_batch):
+        yield from splitter.split_documents(batch)
+
+
+def new_store(embeddings, text_embeddings, metadatas, ids, docstore=None):
+    """Create a FAISS store from a first batch, backed by ``docstore`` (default: in-memory)."""
+    if docstore is None:
+        return FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas, ids=ids)
+    vectors = FAISS(embeddings, faiss.IndexFlatL2(len(text_embeddings[0][1])), docstore, {})
+    vectors.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+    return vectors
+
+
+def stream_into_index(chunks, embeddings, batch_size=256, vectors=None, ids=None, docstore=None, duplicates=None):
+    """
+    Embed and index a stream of chunks one bounded batch at a time.
+
+    Peak memory for the pipeline is set by ``batch_size`` rather than by the
+    size of the corpus: each batch is embedded and appended to the index
+    before the next one is pulled from ``chunks``.
+
+    Args:
+        chunks: Iterable of chunk Documents (may be a generator)
+        embeddings: Embeddings instance
+        batch_size: Chunks embedded and indexed per step
+        vectors: Existing FAISS store to append to, or None to create one
+        ids: Optional iterable of IDs aligned with ``chunks``
+        docstore: Empty docstore for a newly created store, e.g. ``MmapDocstore()``
+        duplicates: Optional ``dedup.NearDuplicateIndex``; near-duplicate chunks are
+            dropped before embedding and recorded on the chunk they duplicate
+
+    Returns:
+        The FAISS store, or None if ``chunks`` was empty and none was given
+    """
+    id_iter = iter(ids) if ids is not None else None
+    for batch in batched(chunks, batch_size):
+        batch_ids = [next(id_iter) for _ in batch] if id_iter is not None else None
+        if duplicates is not None:
+            batch, batch_ids, _ = duplicates.filter(batch, batch_ids)
+            if not batch:
+                continue
+        texts = [chunk.page_content for chunk in batch]
+        metadatas = [chunk.metadata for chunk in batch]
+        text_embeddings = list(zip(texts, embeddings.embed_documents(texts)))
+        if vectors is None:
+            vectors = new_store(embeddings, text_embeddings, metadatas, batch_ids, docstore)
+        else:
+            vectors.add_embeddings(text_embeddings, metadatas=metadatas, ids=batch_ids)
+    if duplicates is not None and vectors is not None:
+        duplicates.apply_provenance(vectors.docstore)
+    return vectors
+
+
+def drop_provenance(vectors, doc_ids, source):
+    """Remove ``source`` from the ``duplicates`` lists of the chunks ``doc_ids``."""
+    for doc_id in doc_ids:
+        dedup.update_provenance(
+            vectors.docstore, doc_id, lambda entries: [e for e in entries if e.get("source") != source])
+
+
+def scan_changes(directory, manifest, files=None):
+    """
+    Compare the PDFs on disk with a manifest.
+
+    Files whose size and mtime match the manifest are assumed unchanged and
+    are not re-hashed, so a no-op scan only costs one ``stat`` per file.
+
+    Args:
+        directory: Directory holding the PDFs
+        manifest: Mapping of relative path -> manifest entry
+        files: Relative paths to consider (default: every PDF under ``directory``)
+
+    Returns:
+        Tuple of (changed, removed) where ``changed`` maps relative path to
+        its new ``(hash, size, mtime)`` and ``removed`` lists relative paths
+    """
+    changed = {}
+    on_disk = index_cache.list_pdfs(directory) if files is None else sorted(files)
+    for rel in on_disk:
+        st = os.stat(os.path.join(directory, rel))
+        entry = manifest.get(rel)
+        if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+            continue
+        file_hash = index_cache.hash_file(os.path.join(directory, rel))
+        if entry and entry["hash"] == file_hash:
+            # Touched but identical: refresh the stat info only
+            entry["size"], entry["mtime"] = st.st_size, st.st_mtime
+            continue
+        changed[rel] = (file_hash, st.st_size, st.st_mtime)
+    removed = sorted(set(manifest) - set(on_disk))
+    return changed, removed
+
+
+def incremental_ingest(directory, cache_dir, embeddings, splitter, key, max_workers=None, pages_per_task=64,
+                       batch_size=256, docstore=None, files=None, dedup_settings=None):
+    """
+    Bring the cached index for ``directory`` up to date.
+
+    Args:
+        directory: Directory holding the PDFs
+        cache_dir: Directory the index and manifest are cached in
+        embeddings: Embeddings instance
+        splitter: Text splitter with a ``split_documents`` method
+        key: Settings key (see ``settings_key``); a mismatch forces a full rebuild
+        max_workers: Processes used to parse changed PDFs (see ``ParallelPDFLoader``)
+        pages_per_task: Page-range size for splitting very large PDFs
+        batch_size: Chunks embedded and indexed per step
+        docstore: Empty docstore used if the index has to be created from scratch
+        files: Relative paths of the PDFs this index covers (default: every PDF in ``directory``);
+            tracked files missing from the list are removed from the index
+        dedup_settings: ``dedup.NearDuplicateIndex`` settings to drop near-duplicate chunks
+            before embedding, or None to embed every chunk
+
+    Returns:
+        Tuple of (vector store or None if the directory has no PDFs, report dict)
+    """
+    meta = index_cache.read_meta(cache_dir)
+    vectors = index_cache.load_index(cache_dir, key, embeddings)
+    manifest = copy.deepcopy(meta.get("manifest", {})) if vectors is not None else {}
+
+    changed, removed = scan_changes(directory, manifest, files)
+    report = {"added": [], "modified": [], "removed": removed, "requeued": [], "chunks_embedded": 0,
+              "chunks_collapsed": 0}
+    duplicates = dedup.load_or_build(vectors, cache_dir, **dedup_settings) if dedup_settings is not None else None
+
+    stale_ids = set()
+    for rel in [*removed, *changed]:
+        stale_ids.update(manifest.get(rel, {}).get("chunk_ids", ()))
+    # Chunks collapsed into a chunk that is going away must be embedded again: re-ingest their files
+    requeue = True
+    while requeue:
+        requeue = False
+        for rel, entry in manifest.items():
+            if rel not in changed and rel not in removed and stale_ids.intersection(entry.get("collapsed_into", ())):
+                changed[rel] = (entry["hash"], entry["size"], entry["mtime"])
+                stale_ids.update(entry["chunk_ids"])
+                report["requeued"].append(rel)
+                requeue = True
+    for rel in removed:
+        entry = manifest.pop(rel)
+        drop_provenance(vectors, entry.get("collapsed_into", ()), os.path.join(directory, rel))
+    for rel in changed:
+        if rel in manifest:
+            drop_provenance(vectors, manifest[rel].get("collapsed_into", ()), os.path.join(directory, rel))
+            if rel not in report["requeued"]:
+                report["modified"].append(rel)
+        else:
+            report["added"].append(rel)
+    if stale_ids:
+        vectors.delete(list(stale_ids))
+        if duplicates is not None:
+            duplicates.remove(stale_ids)
+
+    paths = {os.path.join(directory, rel): rel for rel in sorted(changed)}
+    loaded = ParallelPDFLoader(list(paths), max_workers, pages_per_task).load_files()
+    for path, pages in loaded:
+        rel = paths[path]
+        file_hash, size, mtime = changed[rel]
+        chunks = splitter.split_documents(pages)
+        ids = chunk_ids(rel, file_hash, len(chunks))
+        targets = []
+        if duplicates is not None:
+            chunks, ids, targets = duplicates.filter(chunks, ids)
+        vectors = stream_into_index(chunks, embeddings, batch_size, vectors, ids, docstore)
+        manifest[rel] = {"hash": file_hash, "size": size, "mtime": mtime, "chunk_ids": ids,
+                         "collapsed_into": sorted(set(targets))}
+        report["chunks_embedded"] += len(chunks)
+        report["chunks_collapsed"] += len(targets)
+    if duplicates is not None and vectors is not None:
+        duplicates.apply_provenance(vectors.docstore)
+    for rel in changed:
+        # PDFs without any pages produce no chunks but are still tracked
+        if rel not in manifest or manifest[rel]["hash"] != changed[rel][0]:
+            file_hash, size, mtime = changed[rel]
+            manifest[rel] = {"hash": file_hash, "size": size, "mtime": mtime, "chunk_ids": []}
+
+    dirty = changed or removed or manifest != meta.get("manifest")
+    if vectors is not None and dirty:
+        index_cache.save_index(vectors, cache_dir, key, manifest=manifest)
+        if duplicates is not None:
+            # Saved after the swap: the save replaces the whole cache directory
+            duplicates.save(os.path.join(cache_dir, "minhash.npz"))
+    logger.info(
+        "Incremental ingest: %d added, %d modified, %d removed, %d requeued, %d chunks embedded, %d collapsed",
+        len(report["added"]), len(report["modified"]), len(report["removed"]), len(report["requeued"]),
+        report["chunks_embedded"], report["chunks_collapsed"],
+    )
+    return vectors, report
@@ -0,0 +1,346 @@
+"""
+Pooled, rate-aware client for Groq's chat completions API.
+
+The apps built a ``ChatGroq`` per process (2.RAG) or per rerun (3.RAG), each
+with its own HTTP client. Nothing paced requests against the account's
+quotas, a 429 or 503 surfaced as an error, and one slow request held up the
+answer for as long as it took. ``GroqClient`` is shared by every session of
+a process and adds:
+
+- one ``httpx.AsyncClient`` connection pool per event loop, kept alive
+  between requests, so a question does not pay a TCP + TLS handshake
+- a ``QuotaLimiter`` on requests and tokens per minute that follows the
+  ``x-ratelimit-*`` headers of every response and pauses all senders when a
+  429 asks for ``Retry-After``
+- retries on 429, 5xx and transport errors with full-jitter exponential
+  backoff, never sooner than ``Retry-After``
+- optional hedging: a request that has not answered within the recent p95
+  latency gets a second copy (if the quota has room right now), the first
+  answer wins and the other request is cancelled
+
+``PooledChatGroq`` wraps it as a LangChain chat model, so the chains use it
+like ``ChatGroq``. It talks to the OpenAI-compatible endpoint directly, so
+any server implementing ``POST /chat/completions`` works too, including the
+local stand-in ``rag_common.fakes.FakeChatServer``.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Optional
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, ChatMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from rag_common import async_runtime
+from rag_common.ratelimit import QuotaLimiter, parse_duration
+
+logger = logging.getLogger(__name__)
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+_ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+
+class _Retryable(Exception):
+    """A failed attempt worth repeating (429, 5xx, connection or timeout error)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def backoff_delay(attempt, base=0.5, cap=20.0, retry_after=None):
+    """Full-jitter exponential backoff before retry ``attempt`` (0-based), at least ``retry_after``."""
+    return max(random.uniform(0, min(cap, base * 2 ** attempt)), retry_after or 0.0)
+
+
+class LatencyWindow:
+    """Latencies of the most recent successful requests, for the hedging delay."""
+
+    def __init__(self, size=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds):
+        self._samples.append(seconds)
+
+    def percentile(self, p):
+        """The ``p``-th percentile, or None until ``min_samples`` requests have been seen."""
+        samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, max(0, math.ceil(p / 100 * len(samples)) - 1))]
+
+
+class GroqClient:
+    """Chat completions over a shared connection pool, with quotas, retries and hedging."""
+
+    def __init__(self, api_key, base_url=GROQ_BASE_URL, requests_per_minute=30, tokens_per_minute=6000,
+                 max_connections=20, timeout=60.0, max_retries=4, backoff_base=0.5, backoff_max=20.0,
+                 hedge=False, hedge_percentile=95.0, expected_completion_tokens=256):
+        """
+        Args:
+            api_key: Groq API key
+            base_url: OpenAI-compatible API root; requests go to ``<base_url>/chat/completions``
+            requests_per_minute: Request quota of the key (0 disables request pacing)
+            tokens_per_minute: Token quota of the key (0 disables token pacing)
+            max_connections: Size of the connection pool per event loop
+            timeout: Seconds to wait for a response (and between streamed chunks)
+            max_retries: Extra attempts after a 429, 5xx or transport error
+            backoff_base: Upper bound of the first backoff in seconds; doubles per attempt
+            backoff_max: Cap on the backoff upper bound
+            hedge: Send a second copy of a request that is slower than ``hedge_percentile``
+            hedge_percentile: Latency percentile of recent requests after which to hedge
+            expected_completion_tokens: Completion tokens reserved when a request sets no ``max_tokens``
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.expected_completion_tokens = expected_completion_tokens
+        self.limiter = QuotaLimiter(requests_per_minute, tokens_per_minute)
+        # Headers of a streamed response arrive with the first token, so the two are tracked apart
+        self.latency = {False: LatencyWindow(), True: LatencyWindow()}
+        self.stats = {"requests": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "throttled_s": 0.0}
+        self._pools = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _pool(self):
+        # An httpx client is bound to the loop it first ran on, so each loop gets its own pool
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                pool = self._pools[loop] = httpx.AsyncClient(
+                    base_url=self.base_url,
+                    headers={"Authorization": f"Bearer {self.api_key}"},
+                    timeout=httpx.Timeout(self.timeout, connect=min(10.0, self.timeout)),
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_connections),
+                )
+        return pool
+
+    async def aclose(self):
+        """Close the connection pool of the running event loop."""
+        with self._lock:
+            pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.aclose()
+
+    def estimate_tokens(self, body):
+        """Tokens a request is expected to use: about 4 characters per prompt token plus the completion."""
+        prompt = sum(len(str(message.get("content") or "")) for message in body.get("messages", ()))
+        return prompt // 4 + (body.get("max_tokens") or self.expected_completion_tokens)
+
+    def hedge_delay(self, stream):
+        """Seconds after which a request is hedged, or None when hedging is off or there is no history yet."""
+        return self.latency[stream].percentile(self.hedge_percentile) if self.hedge else None
+
+    async def _send(self, body, stream):
+        """One HTTP attempt; returns the response once it succeeded (a stream's body is left unread)."""
+        start = time.perf_counter()
+        self._count("requests")
+        pool = self._pool()
+        try:
+            response = await pool.send(pool.build_request("POST", "/chat/completions", json=body), stream=True)
+            try:
+                self.limiter.observe(response.headers)
+                # Reading the whole body also hands the connection back to the pool
+                if response.status_code != 200 or not stream:
+                    await response.aread()
+            except BaseException:
+                await response.aclose()
+                raise
+        except httpx.TransportError as e:
+            raise _Retryable(f"{type(e).__name__}: {e}") from e
+        status = response.status_code
+        if status == 200:
+            self.latency[stream].record(time.perf_counter() - start)
+            return response
+        detail = response.text[:500]
+        retry_after = parse_duration(response.headers.get("retry-after"))
+        if status == 429 and retry_after:
+            self.limiter.pause(retry_after)
+        if status == 429 or status >= 500:
+            raise _Retryable(f"HTTP {status}: {detail}", retry_after)
+        raise RuntimeError(f"LLM API error {status}: {detail}")
+
+    async def _attempt(self, body, stream, tokens):
+        """Send ``body`` within the quota, hedged when enabled; returns the first successful response."""
+        self._count("throttled_s", await self.limiter.acquire(tokens))
+        primary = asyncio.ensure_future(self._send(body, stream))
+        pending = {primary}
+        try:
+            delay = self.hedge_delay(stream)
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                # A hedge must not push the key over its quota; without room the primary runs alone
+                if not done and self.limiter.try_acquire(tokens):
+                    self._count("hedges")
+                    pending.add(asyncio.ensure_future(self._send(body, stream)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    for extra in succeeded[1:]:
+                        await extra.result().aclose()
+                    if succeeded[0] is not primary:
+                        self._count("hedge_wins")
+                    return succeeded[0].result()
+                error = error or next(iter(done)).exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _request(self, body, stream):
+        tokens = self.estimate_tokens(body)
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._attempt(body, stream, tokens), tokens
+            except _Retryable as e:
+                if attempt == self.max_retries:
+                    raise RuntimeError(f"LLM request failed after {attempt + 1} attempts: {e}") from e
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, e.retry_after)
+                logger.warning("LLM request failed (%s); retrying in %.2fs", e, delay)
+                self._count("retries")
+                await asyncio.sleep(delay)
+
+    async def complete(self, body):
+        """POST a chat completion request body and return the response JSON."""
+        response, tokens = await self._request({**body, "stream": False}, stream=False)
+        data = response.json()
+        self.limiter.settle(tokens, (data.get("usage") or {}).get("total_tokens"))
+        return data
+
+    async def stream(self, body):
+        """POST a streaming chat completion request body and yield every server-sent chunk as a dict."""
+        response, tokens = await self._request({**body, "stream": True}, stream=True)
+        usage = None
+        try:
+            # Read to the end of the body even after [DONE], so the connection goes back to the pool
+            async for line in response.aiter_lines():
+                data = line[len("data:"):].strip() if line.startswith("data:") else ""
+                if not data or data == "[DONE]":
+                    continue
+                chunk = json.loads(data)
+                # Groq reports usage in the last chunk's ``x_groq``, OpenAI-style servers in ``usage``
+                usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage") or usage
+                yield chunk
+        finally:
+            await response.aclose()
+            self.limiter.settle(tokens, (usage or {}).get("total_tokens"))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def shared_client(api_key, **settings):
+    """The process-wide ``GroqClient`` for ``api_key`` and ``settings`` (``GroqClient`` arguments)."""
+    key = (api_key, tuple(sorted(settings.items())))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = GroqClient(api_key, **settings)
+    return client
+
+
+def _usage_metadata(usage):
+    if not usage:
+        return None
+    return {"input_tokens": usage.get("prompt_tokens", 0), "output_tokens": usage.get("completion_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0)}
+
+
+class PooledChatGroq(BaseChatModel):
+    """LangChain chat model on a shared ``GroqClient``; a drop-in for ``ChatGroq`` in the chains."""
+
+    client: Any
+    model_name: str = "llama-3.1-8b-instant"
+    temperature: float = 0.7
+    max_tokens: Optional[int] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "groq-pooled"
+
+    @property
+    def _identifying_params(self):
+        return {"model_name": self.model_name, "temperature": self.temperature, "max_tokens": self.max_tokens}
+
+    def _body(self, messages, stop):
+        body = {
+            "model": self.model_name,
+            "messages": [{"role": m.role if isinstance(m, ChatMessage) else _ROLES.get(m.type, "user"),
+                          "content": m.content} for m in messages],
+            "temperature": self.temperature,
+        }
+        if self.max_tokens:
+            body["max_tokens"] = self.max_tokens
+        if stop:
+            body["stop"] = stop
+        return body
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        data = await self.client.complete(self._body(messages, stop))
+        choice = data["choices"][0]
+        usage = data.get("usage") or {}
+        message = AIMessage(
+            content=choice["message"].get("content") or "",
+            response_metadata={"model_name": data.get("model", self.model_name),
+                               "finish_reason": choice.get("finish_reason"), "token_usage": usage},
+            usage_metadata=_usage_metadata(usage),
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)],
+                          llm_output={"token_usage": usage, "model_name": self.model_name})
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        async for data in self.client.stream(self._body(messages, stop)):
+            choice = (data.get("choices") or [{}])[0]
+            usage = data.get("usage") or (data.get("x_groq") or {}).get("usage")
+            content = (choice.get("delta") or {}).get("content") or ""
+            if not content and not usage and not choice.get("finish_reason"):
+                continue
+            metadata = {"finish_reason": choice["finish_reason"]} if choice.get("finish_reason") else {}
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=content, response_metadata=metadata, usage_metadata=_usage_metadata(usage)))
+            if run_manager:
+                await run_manager.on_llm_new_token(content, chunk=chunk)
+            yield chunk
+
+    # The synchronous paths run on the shared event loop, so they use the same connection pool
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return async_runtime.run(self._agenerate(messages, stop))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        for chunk in async_runtime.iterate(self._astream(messages, stop)):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def chat_model(api_key, model_name=None):
+    """``PooledChatGroq`` on the shared client for ``api_key``, configured from ``Config``."""
+    from rag_common.config import Config
+
+    return PooledChatGroq(client=shared_client(api_key, **Config.llm_client_settings()),
+                          model_name=model_name or Config.LLM_MODEL)
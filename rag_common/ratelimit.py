@@ -0,0 +1,236 @@
+"""
+Request rate limiting for calls to hosted LLM APIs.
+
+Groq, like most hosted APIs, enforces requests-per-minute and
+tokens-per-minute limits and answers with HTTP 429 once they are exceeded.
+Pacing requests on the client side keeps a concurrent batch just under the
+limit instead of bouncing off it.
+"""
+
+import asyncio
+import re
+import threading
+import time
+
+
+class AsyncRateLimiter:
+    """Token bucket for asyncio code: ``rate`` requests per second, bursts of up to ``burst``."""
+
+    def __init__(self, rate, burst=1):
+        """
+        Args:
+            rate: Sustained requests per second; 0 or less disables limiting
+            burst: Requests allowed back to back after an idle period
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute, burst=1):
+        return cls(requests_per_minute / 60.0, burst)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        if self.rate <= 0:
+            return
+        # Waiters queue on the lock, so requests go out in arrival order
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations instead of sleeping.
+
+    ``reserve`` takes the tokens at once, letting the level go negative, and
+    returns a ticket; ``wait_time`` says how long the ticket's holder still
+    has to wait. Waiters are served in the order they reserved, and since the
+    wait is recomputed from the current level and rate, a later rate change
+    or refund applies to requests already waiting. Callers sleep on their own
+    (``time.sleep`` or ``asyncio.sleep``). Not thread-safe on its own.
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        Args:
+            rate: Tokens added per second; 0 or less disables the bucket
+            capacity: Most tokens the bucket holds after an idle period
+        """
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.level = self.capacity
+        self._taken = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount, now):
+        """
+        Take ``amount`` tokens, available or not; returns the ticket to pass to ``wait_time``.
+
+        An amount above ``capacity`` is charged as one full bucket, so it goes
+        out as soon as the bucket is full instead of waiting for tokens the
+        bucket can never hold.
+        """
+        amount = min(amount, self.capacity)
+        if self.rate > 0:
+            self._refill(now)
+            self.level -= amount
+            self._taken += amount
+        return self._taken
+
+    def wait_time(self, ticket, now):
+        """Seconds until the tokens of ``ticket`` are covered by the bucket."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        # Tokens reserved after this ticket do not delay it
+        owed = -self.level - (self._taken - ticket)
+        return owed / self.rate if owed > 0 else 0.0
+
+    def available(self, now):
+        """Tokens that could be taken right now without waiting."""
+        if self.rate <= 0:
+            return float("inf")
+        self._refill(now)
+        return self.level
+
+    def try_take(self, amount, now):
+        """Take ``amount`` tokens only if they are available right now."""
+        if self.available(now) < min(amount, self.capacity):
+            return False
+        self.reserve(amount, now)
+        return True
+
+
+class QuotaLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits for one API key.
+
+    Groq enforces both quotas per key. Every request reserves one request and
+    an estimate of the tokens it will use; ``settle`` corrects the estimate
+    with the usage the response reports. ``observe`` applies the provider's
+    ``x-ratelimit-*`` response headers, so the limiter follows the quota the
+    server actually enforces rather than only the configured one, and
+    ``pause`` holds every sender back after a 429 with ``Retry-After``.
+    Thread-safe; waiting is done with ``asyncio.sleep`` by ``acquire``.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute, burst_seconds=60.0):
+        """
+        Args:
+            requests_per_minute: Request quota; 0 disables request limiting
+            tokens_per_minute: Token quota (prompt + completion); 0 disables token limiting
+            burst_seconds: Seconds of quota that may be spent back to back after an idle period;
+                the default holds the whole per-minute quota, as the provider's window does
+        """
+        self.burst_seconds = burst_seconds
+        self.requests = TokenBucket(requests_per_minute / 60.0, requests_per_minute / 60.0 * burst_seconds)
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute / 60.0 * burst_seconds)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_time(self, tickets):
+        now = time.monotonic()
+        with self._lock:
+            return max(self.requests.wait_time(tickets[0], now), self.tokens.wait_time(tickets[1], now),
+                       self._paused_until - now)
+
+    async def acquire(self, tokens=0):
+        """Wait until a request costing about ``tokens`` may be sent; returns the seconds waited."""
+        start = time.monotonic()
+        with self._lock:
+            tickets = (self.requests.reserve(1, start), self.tokens.reserve(tokens, start))
+        # Re-checked at least every second, so quota updates and 429 pauses reach waiting requests
+        while (delay := self._wait_time(tickets)) > 0:
+            await asyncio.sleep(min(delay, 1.0))
+        return time.monotonic() - start
+
+    def try_acquire(self, tokens=0):
+        """Reserve a request only if the quota allows sending it right now (used for hedged requests)."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._paused_until:
+                return False
+            if self.tokens.available(now) < tokens or not self.requests.try_take(1, now):
+                return False
+            self.tokens.reserve(tokens, now)
+            return True
+
+    def settle(self, estimated, actual):
+        """Correct a request's token reservation with the ``actual`` usage (None when unknown)."""
+        if actual is None or self.tokens.rate <= 0:
+            return
+        with self._lock:
+            # ``reserve`` charged at most one full bucket
+            estimated = min(estimated, self.tokens.capacity)
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + estimated - actual)
+
+    def pause(self, seconds):
+        """Send nothing for ``seconds``, e.g. the ``Retry-After`` of a 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def observe(self, headers):
+        """
+        Follow the quota reported in a response's ``x-ratelimit-*`` headers.
+
+        ``limit-tokens`` is the per-minute token quota and replaces the
+        configured one when they differ (unless token limiting is off). ``remaining-tokens`` and
+        ``remaining-requests`` cap what the buckets may still hand out (on
+        Groq the request figures are per day, so that cap only bites close to
+        the daily limit), and once no requests remain every sender waits for
+        ``reset-requests``.
+        """
+        limit = _header_number(headers, "x-ratelimit-limit-tokens")
+        remaining_tokens = _header_number(headers, "x-ratelimit-remaining-tokens")
+        remaining_requests = _header_number(headers, "x-ratelimit-remaining-requests")
+        with self._lock:
+            if limit and self.tokens.rate > 0 and abs(limit / 60.0 - self.tokens.rate) > 1e-9:
+                self.tokens.rate = limit / 60.0
+                self.tokens.capacity = max(1.0, self.tokens.rate * self.burst_seconds)
+            if remaining_tokens is not None and self.tokens.rate > 0:
+                self.tokens.level = min(self.tokens.level, remaining_tokens)
+            if remaining_requests is not None and self.requests.rate > 0:
+                self.requests.level = min(self.requests.level, remaining_requests)
+        if remaining_requests == 0:
+            reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+            if reset:
+                self.pause(reset)
+
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value):
+    """Seconds in a rate-limit header such as ``"7.66s"``, ``"2m59.56s"``, ``"120ms"`` or ``"3"``; None if absent."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    return sum(float(n) * _UNITS[unit] for n, unit in parts) if parts else None
+
+
+def _header_number(headers, name):
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
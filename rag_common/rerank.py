@@ -0,0 +1,69 @@
+"""
+Cross-encoder reranking of retrieved candidates.
+
+The retriever cheaply fetches a larger candidate set, a local cross-encoder
+scores every (query, chunk) pair in one batched forward pass on CPU, and only
+the best ``top_k`` chunks go on to the prompt.
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+from rag_common.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """Scores candidates with a sentence-transformers ``CrossEncoder``."""
+
+    def __init__(self, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2", top_k=4, max_length=512, device="cpu"):
+        """
+        Args:
+            model_name: Cross-encoder model to load (on first use)
+            top_k: Chunks kept after reranking
+            max_length: Token limit per (query, chunk) pair
+            device: Torch device; CPU by default
+        """
+        self.model_name = model_name
+        self.top_k = top_k
+        self.max_length = max_length
+        self.device = device
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length, device=self.device)
+        return self._model
+
+    def rerank(self, query, documents, top_k=None):
+        """
+        Return the ``top_k`` documents ordered by cross-encoder score.
+
+        Args:
+            query: User question
+            documents: Candidate Documents from the retriever
+            top_k: Overrides the instance ``top_k``
+        """
+        top_k = top_k or self.top_k
+        if len(documents) <= 1:
+            return documents
+        with span("rerank", candidates=len(documents), top_k=top_k) as attrs:
+            start = time.perf_counter()
+            pairs = [(query, doc.page_content) for doc in documents]
+            # The whole candidate set goes through the model as a single batch
+            scores = np.asarray(self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False))
+            order = np.argsort(-scores)[:top_k]
+            elapsed = time.perf_counter() - start
+            attrs.update(top_score=float(scores[order[0]]))
+        logger.info("Reranked %d candidates to %d in %.0f ms", len(documents), len(order), elapsed * 1000)
+        return [documents[i] for i in order]
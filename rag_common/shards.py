@@ -0,0 +1,176 @@
+"""
+Sharded document index: several independent FAISS (+ BM25) indexes searched in parallel.
+
+Each PDF is assigned to a shard by a hash of its relative path, so a file
+stays in the same shard when it is edited. Every shard is an ordinary cached
+index in its own directory (incremental ingest, ANN conversion, BM25), and
+can be updated or rebuilt without touching the others.
+
+A query is embedded once and fanned out with one task per shard on a thread
+pool. faiss and numpy release the GIL, so shard searches run on separate
+cores. Each task returns that shard's top ``fetch_k`` dense hits (by
+distance) and BM25 hits (by score). The per-shard lists are merged into
+global top-k lists and fused with RRF exactly like a single
+``RetrievalIndex``. BM25 scores use per-shard IDF statistics, which is
+close to global IDF while the shards are of similar size.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+import faiss
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from rag_common.embedding_cache import embed_queries
+from rag_common.hybrid import reciprocal_rank_fusion
+from rag_common.tracing import run_in_trace, span
+
+
+def shard_of(rel_path, num_shards):
+    """Shard number of a PDF, from a hash of its path relative to the documents directory."""
+    digest = hashlib.sha256(rel_path.replace(os.sep, "/").encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % num_shards
+
+
+def partition(rel_paths, num_shards):
+    """Split relative PDF paths into ``num_shards`` lists (see ``shard_of``)."""
+    groups = [[] for _ in range(num_shards)]
+    for rel in rel_paths:
+        groups[shard_of(rel, num_shards)].append(rel)
+    return groups
+
+
+def shard_dir(cache_dir, shard, num_shards):
+    """Cache directory of one shard; changing the shard count starts a new set of directories."""
+    return os.path.join(cache_dir, f"{shard:03d}-of-{num_shards:03d}")
+
+
+def _search_shard(shard, embeddings, queries, fetch_k):
+    """Dense and BM25 top ``fetch_k`` of one shard, as ``(value, doc_id)`` lists per query."""
+    vectors = shard.vectors
+    distances, positions = vectors.index.search(embeddings, fetch_k)
+    dense = [
+        [(float(d), vectors.index_to_docstore_id[int(p)]) for d, p in zip(row_d, row_p) if p != -1]
+        for row_d, row_p in zip(distances, positions)
+    ]
+    lexical = [shard.bm25.search(query, fetch_k) for query in queries] if shard.bm25 is not None else None
+    return dense, lexical
+
+
+def _merge(lists, k, largest):
+    """Global top ``k`` ``(doc_id, shard)`` pairs from per-shard best-first ``(value, doc_id)`` lists."""
+    tagged = [(value, shard, doc_id) for shard, hits in enumerate(lists) for value, doc_id in hits]
+    pick = heapq.nlargest if largest else heapq.nsmallest
+    return [(doc_id, shard) for _, shard, doc_id in pick(k, tagged, key=lambda hit: hit[0])]
+
+
+class ShardedIndex:
+    """``RetrievalIndex`` over several shards; same ``search_batch`` / ``as_retriever`` interface."""
+
+    def __init__(self, shards, k=4, fetch_k=20, rrf_k=60, workers=0):
+        """
+        Args:
+            shards: Non-empty ``RetrievalIndex`` per shard, all with the same embeddings
+            k: Chunks returned per query
+            fetch_k: Candidates taken from each ranking (dense, BM25) before fusion
+            rrf_k: RRF constant
+            workers: Threads searching shards in parallel (0: one per shard, up to the core count)
+        """
+        self.shards = list(shards)
+        self.k = k
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+        self.hybrid = all(shard.bm25 is not None for shard in self.shards)
+        # Shards share one embedding model and metric, so their distances are comparable
+        first = self.shards[0].vectors
+        self._embeddings = first
+        self._largest = first.index.metric_type == faiss.METRIC_INNER_PRODUCT
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or min(len(self.shards), os.cpu_count() or 1),
+            thread_name_prefix="shard-search",
+        )
+
+    def __len__(self):
+        return sum(len(shard.vectors.index_to_docstore_id) for shard in self.shards)
+
+    def _embed(self, queries, embeddings=None):
+        store = self._embeddings
+        if embeddings is None:
+            embeddings = embed_queries(store.embeddings, queries)
+        matrix = np.array(embeddings, dtype=np.float32)
+        if store._normalize_L2:
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix
+
+    def search_ids(self, queries, embeddings=None):
+        """
+        Fan ``queries`` out to every shard and merge the results.
+
+        Args:
+            queries: Query strings
+            embeddings: Precomputed query vectors aligned with ``queries``, if any
+
+        Returns:
+            One best-first list of ``(doc_id, shard)`` pairs per query
+        """
+        queries = list(queries)
+        embeddings = self._embed(queries, embeddings)
+        fetch_k = self.fetch_k if self.hybrid else self.k
+        with span("shard_search", shards=len(self.shards), queries=len(queries)):
+            futures = [
+                self._executor.submit(run_in_trace(_search_shard, shard, embeddings, queries, fetch_k))
+                for shard in self.shards
+            ]
+            per_shard = [future.result() for future in futures]
+        results = []
+        for q in range(len(queries)):
+            dense = _merge([hits[q] for hits, _ in per_shard], fetch_k, self._largest)
+            if not self.hybrid:
+                results.append(dense[:self.k])
+                continue
+            lexical = _merge([[(s, d) for d, s in hits[q]] for _, hits in per_shard], fetch_k, True)
+            owner = dict(dense + lexical)
+            fused = reciprocal_rank_fusion([[d for d, _ in dense], [d for d, _ in lexical]], self.rrf_k)
+            results.append([(doc_id, owner[doc_id]) for doc_id, _ in fused[:self.k]])
+        return results
+
+    def documents(self, ids):
+        return [self.shards[shard].vectors.docstore.search(doc_id) for doc_id, shard in ids]
+
+    def search(self, query, embedding=None):
+        """Documents for one query, best first (``embedding``: precomputed query vector)."""
+        return self.documents(self.search_ids([query], None if embedding is None else [embedding])[0])
+
+    def search_batch(self, queries):
+        """One list of Documents per query: one embedding call and one fan-out for the whole batch."""
+        queries = list(queries)
+        if not queries:
+            return []
+        return [self.documents(ids) for ids in self.search_ids(queries)]
+
+    def as_retriever(self):
+        return ShardedRetriever(index=self)
+
+
+class ShardedRetriever(BaseRetriever):
+    """LangChain retriever over a ``ShardedIndex``; takes an ``embedding=`` keyword like ``HybridRetriever``."""
+
+    index: Any
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, embedding: Optional[List[float]] = None
+    ) -> List[Document]:
+        return self.index.search(query, embedding)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun, embedding: Optional[List[float]] = None
+    ) -> List[Document]:
+        # The fan-out blocks on the shard pool; keep it off the event loop
+        return await asyncio.to_thread(self.index.search, query, embedding)
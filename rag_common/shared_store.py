@@ -0,0 +1,73 @@
+"""
+Process-wide, read-mostly vector index shared by every Streamlit session.
+
+Sessions read the current index through ``SharedIndex.get()`` and never
+mutate it. A rebuild constructs a complete new index off to the side and
+publishes it with a single reference swap, so in-flight searches keep using
+the snapshot they started with and new searches see the new one.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SharedIndex:
+    """Holds one published vector store and serialises rebuilds of it."""
+
+    def __init__(self, build_fn):
+        """
+        Args:
+            build_fn: Zero-argument callable returning a new, fully built
+                vector store (or None if there is nothing to index). It must
+                not mutate the currently published store.
+        """
+        self._build_fn = build_fn
+        self._vectors = None
+        self._swap_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.version = 0
+        self.built_at = None
+
+    def get(self):
+        """Return the currently published vector store, or None before the first build."""
+        return self._vectors
+
+    def snapshot(self):
+        """Return ``(vector store, version)`` read consistently with respect to swaps."""
+        with self._swap_lock:
+            return self._vectors, self.version
+
+    def publish(self, vectors):
+        """Atomically replace the published vector store."""
+        with self._swap_lock:
+            self._vectors = vectors
+            self.version += 1
+            self.built_at = time.time()
+        logger.info("Published shared index version %d", self.version)
+
+    def rebuild(self):
+        """
+        Build a new index and publish it.
+
+        Only one rebuild runs at a time; readers are never blocked while it runs.
+
+        Returns:
+            The newly published vector store
+        """
+        with self._build_lock:
+            vectors = self._build_fn()
+            self.publish(vectors)
+            return vectors
+
+    def ensure_built(self):
+        """Build the index once if nothing has been published yet, and return it."""
+        if self._vectors is not None:
+            return self._vectors
+        with self._build_lock:
+            # Another session may have finished the build while we waited
+            if self._vectors is None:
+                self.publish(self._build_fn())
+            return self._vectors
@@ -0,0 +1,334 @@
+"""
+Single-file index snapshots for shipping a prebuilt index to serving nodes.
+
+A snapshot packs everything a node needs to serve retrieval into one
+versioned file: the faiss index (flat or ANN), the chunk IDs in index
+order, chunk texts and columnar metadata (the ``MmapDocstore`` layout),
+the BM25 postings, the embedding-model fingerprint and the settings the
+index was built with. A batch job builds the index once and exports it;
+every replica then opens the same file instead of parsing and embedding
+the PDFs itself.
+
+Layout::
+
+    header    64 bytes: magic, format version, manifest offset / length / crc32
+    sections  raw arrays, each 64-byte aligned, crc32 per section
+    manifest  JSON: fingerprint, settings and the section table
+
+Loading memory-maps the file and wraps every section in a numpy view, so
+nothing is copied or parsed per chunk: the docstore reads texts straight
+from the mapping, chunk IDs are decoded only when a search returns them,
+and a flat faiss index searches the mapped vectors in place. With
+checksum verification on, startup costs one sequential read of the file.
+"""
+
+import datetime
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from collections.abc import Mapping
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+from rag_common.bm25 import BM25Index
+from rag_common.docstore import MmapDocstore
+from rag_common.hybrid import RetrievalIndex
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RAGSNAP\0"
+VERSION = 1
+# magic, version, reserved, manifest offset, manifest length, manifest crc32
+HEADER = struct.Struct("<8sHHQQI")
+HEADER_SIZE = 64
+ALIGN = 64
+# Embedded at export and again at load: a different model (or different weights) under the
+# same name gives a different vector
+PROBE_TEXT = "Attention is all you need: retrieval-augmented generation over research papers."
+PROBE_MIN_COSINE = 0.999
+
+
+class SnapshotIds(Mapping):
+    """``index_to_docstore_id`` over the snapshot's ID array, decoding each ID on lookup."""
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def __getitem__(self, position):
+        if not 0 <= position < len(self.ids):
+            raise KeyError(position)
+        return self.ids[position].decode("utf-8")
+
+    def __iter__(self):
+        return iter(range(len(self.ids)))
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class _Writer:
+    """Appends aligned, checksummed sections to an open file."""
+
+    def __init__(self, f):
+        self.f = f
+        self.sections = {}
+        f.write(b"\0" * HEADER_SIZE)
+
+    def add(self, name, data):
+        """Write ``data`` (a numpy array or bytes) as section ``name``."""
+        array = np.ascontiguousarray(data) if not isinstance(data, bytes) else np.frombuffer(data, np.uint8)
+        self.f.write(b"\0" * (-self.f.tell() % ALIGN))
+        offset = self.f.tell()
+        # memoryview of the array: no copy, even for large sections
+        view = memoryview(array).cast("B") if array.size else b""
+        self.f.write(view)
+        self.sections[name] = {
+            "offset": offset,
+            "nbytes": array.nbytes,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "crc32": zlib.crc32(view),
+        }
+
+    def add_file(self, name, path, block_size=1 << 22):
+        """Copy a file (e.g. a docstore text blob) into section ``name`` without loading it whole."""
+        self.f.write(b"\0" * (-self.f.tell() % ALIGN))
+        offset = self.f.tell()
+        crc = 0
+        with open(path, "rb") as src:
+            for block in iter(lambda: src.read(block_size), b""):
+                self.f.write(block)
+                crc = zlib.crc32(block, crc)
+        nbytes = self.f.tell() - offset
+        self.sections[name] = {"offset": offset, "nbytes": nbytes, "dtype": "|u1", "shape": [nbytes], "crc32": crc}
+
+    def finish(self, manifest):
+        manifest = dict(manifest, sections=self.sections)
+        data = json.dumps(manifest, sort_keys=True).encode("utf-8")
+        offset = self.f.tell()
+        self.f.write(data)
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, VERSION, 0, offset, len(data), zlib.crc32(data)))
+
+
+def embedding_fingerprint(embeddings, model_name):
+    """Model name plus the model's vector for ``PROBE_TEXT``."""
+    probe = np.asarray(embeddings.embed_query(PROBE_TEXT), dtype=np.float32)
+    return {"model": model_name, "dim": int(probe.shape[0]), "probe_text": PROBE_TEXT}, probe
+
+
+def export_snapshot(index, path, embeddings, model_name, settings=None):
+    """
+    Write a ``RetrievalIndex`` to a single snapshot file.
+
+    The docstore is repacked in index order, so one ID array serves as the
+    docstore IDs, the ``index_to_docstore_id`` mapping and the BM25 doc IDs.
+    The file is written next to ``path`` and renamed into place.
+
+    Args:
+        index: ``RetrievalIndex`` to export
+        path: Snapshot file to write
+        embeddings: Embeddings the index was built with (fingerprinted)
+        model_name: Embedding model name
+        settings: JSON-serialisable build settings (splitter, chunking, ANN...)
+
+    Returns:
+        The manifest that was written
+    """
+    vectors = index.vectors
+    count = len(vectors.index_to_docstore_id)
+    if not count:
+        raise ValueError("Cannot export an empty index")
+    fingerprint, probe = embedding_fingerprint(embeddings, model_name)
+    if vectors.index.d != fingerprint["dim"]:
+        raise ValueError(f"Index dimension {vectors.index.d} does not match {model_name} ({fingerprint['dim']})")
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".snapshot_tmp_", dir=parent)
+    try:
+        # Repack the chunks in index order through MmapDocstore, whatever docstore the index uses
+        docstore = MmapDocstore()
+        for start in range(0, count, 1024):
+            ids = [vectors.index_to_docstore_id[i] for i in range(start, min(start + 1024, count))]
+            docstore.add({doc_id: vectors.docstore.search(doc_id) for doc_id in ids})
+        docstore.write(tmp_dir)
+        doc_ids = np.load(os.path.join(tmp_dir, "ids.npy"))
+        with np.load(os.path.join(tmp_dir, "meta.npz")) as data:
+            codes = {key: data[key] for key in data.files}
+
+        tmp_path = os.path.join(tmp_dir, "snapshot")
+        with open(tmp_path, "wb") as f:
+            writer = _Writer(f)
+            writer.add("faiss", faiss.serialize_index(vectors.index))
+            writer.add("ids", doc_ids)
+            writer.add("id_order", np.argsort(doc_ids, kind="stable"))
+            writer.add_file("texts", os.path.join(tmp_dir, "texts.bin"))
+            writer.add("text_offsets", np.load(os.path.join(tmp_dir, "offsets.npy")))
+            with open(os.path.join(tmp_dir, "meta_values.json"), "rb") as values:
+                writer.add("meta_values", values.read())
+            for key, column in codes.items():
+                writer.add(f"meta.{key}", column)
+            if index.bm25 is not None:
+                if len(index.bm25) != count or str(index.bm25.doc_ids[0]) != vectors.index_to_docstore_id[0]:
+                    raise ValueError("BM25 postings are not in index order; rebuild them before exporting")
+                terms = [None] * len(index.bm25.vocab)
+                for term, i in index.bm25.vocab.items():
+                    terms[i] = term
+                # \w+ tokens never contain a newline
+                writer.add("bm25.terms", "\n".join(terms).encode("utf-8"))
+                writer.add("bm25.offsets", index.bm25.offsets)
+                writer.add("bm25.docs", index.bm25.docs)
+                writer.add("bm25.impacts", index.bm25.impacts)
+            writer.add("embedding_probe", probe)
+            manifest = {
+                "format_version": VERSION,
+                "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+                "chunks": count,
+                "embedding": dict(fingerprint, normalize_L2=bool(vectors._normalize_L2),
+                                  distance_strategy=str(vectors.distance_strategy.value)),
+                "index": {"type": type(vectors.index).__name__, "ntotal": int(vectors.index.ntotal)},
+                "meta_keys": sorted(codes),
+                "settings": settings or {},
+            }
+            writer.finish(manifest)
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    logger.info("Exported %d chunks to snapshot %s (%.1f MB)", count, path, os.path.getsize(path) / 1e6)
+    return dict(manifest, sections=writer.sections)
+
+
+class Snapshot:
+    """A memory-mapped snapshot file and typed views of its sections."""
+
+    def __init__(self, path, verify=True):
+        """
+        Args:
+            path: Snapshot file
+            verify: Check every section's crc32 (reads the whole file once)
+
+        Raises:
+            ValueError: If the file is not a snapshot, has an unsupported version or fails a checksum
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER_SIZE:
+            raise ValueError(f"{path} is not an index snapshot")
+        magic, version, _, offset, length, crc = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an index snapshot")
+        if version != VERSION:
+            raise ValueError(f"{path} has snapshot format version {version}; this code reads version {VERSION}")
+        data = self._mmap[offset:offset + length]
+        if zlib.crc32(data) != crc:
+            raise ValueError(f"{path}: manifest checksum mismatch")
+        self.manifest = json.loads(data)
+        self.sections = self.manifest["sections"]
+        if verify:
+            self.verify()
+
+    def __contains__(self, name):
+        return name in self.sections
+
+    def raw(self, name):
+        """Section ``name`` as a flat uint8 view of the mapping."""
+        section = self.sections[name]
+        return np.frombuffer(self._mmap, dtype=np.uint8, count=section["nbytes"], offset=section["offset"])
+
+    def array(self, name):
+        """Section ``name`` as a read-only numpy view with its stored dtype and shape."""
+        section = self.sections[name]
+        return self.raw(name).view(np.dtype(section["dtype"])).reshape(section["shape"])
+
+    def verify(self):
+        """Raise ``ValueError`` naming the first section whose checksum does not match."""
+        for name, section in self.sections.items():
+            if zlib.crc32(self.raw(name)) != section["crc32"]:
+                raise ValueError(f"{self.path}: checksum mismatch in section {name!r}")
+
+    def faiss_index(self):
+        """The faiss index; flat indexes search the mapped vectors without copying them."""
+        data = self.raw("faiss")
+        index = faiss.read_index(faiss.ZeroCopyIOReader(faiss.swig_ptr(data), data.size), faiss.IO_FLAG_MMAP_IFC)
+        # The index may point into ``data``; keep the mapping alive as long as the index
+        index.referenced_objects = [data]
+        return index
+
+    def docstore(self):
+        """``MmapDocstore`` reading chunk texts directly from the mapping."""
+        values = json.loads(self.raw("meta_values").tobytes())
+        codes = {key: self.array(f"meta.{key}") for key in self.manifest["meta_keys"]}
+        # Offsets are relative to the texts section; the store slices the whole mapping
+        offsets = self.array("text_offsets") + self.sections["texts"]["offset"]
+        return MmapDocstore.from_arrays(self._mmap, offsets, self.array("ids"), codes, values, self.array("id_order"))
+
+    def bm25(self):
+        """BM25 postings over the same chunks, or None if the index was exported without them."""
+        if "bm25.terms" not in self:
+            return None
+        terms = self.raw("bm25.terms").tobytes().decode("utf-8").split("\n")
+        vocab = {term: i for i, term in enumerate(terms)} if terms != [""] else {}
+        return BM25Index(self.array("ids"), vocab, self.array("bm25.offsets"), self.array("bm25.docs"),
+                         self.array("bm25.impacts"))
+
+
+def check_fingerprint(snapshot, embeddings, model_name):
+    """
+    Raise ``ValueError`` unless ``embeddings`` is the model the snapshot was built with.
+
+    The model name must match, and the model must embed ``PROBE_TEXT`` to
+    (almost exactly) the vector stored at export.
+    """
+    stored = snapshot.manifest["embedding"]
+    if stored["model"] != model_name:
+        raise ValueError(f"{snapshot.path} was built with {stored['model']}, not {model_name}")
+    probe = np.asarray(embeddings.embed_query(stored["probe_text"]), dtype=np.float32)
+    expected = snapshot.array("embedding_probe")
+    if probe.shape != expected.shape:
+        raise ValueError(f"{snapshot.path}: {model_name} returns {probe.shape[0]}-d vectors, "
+                         f"the snapshot holds {expected.shape[0]}-d vectors")
+    cosine = float(probe @ expected / max(np.linalg.norm(probe) * np.linalg.norm(expected), 1e-12))
+    if cosine < PROBE_MIN_COSINE:
+        raise ValueError(f"{snapshot.path}: {model_name} embeds differently from the model the snapshot "
+                         f"was built with (probe cosine {cosine:.4f})")
+
+
+def load_snapshot(path, embeddings, model_name, k=4, fetch_k=20, rrf_k=60, verify=True, settings=None):
+    """
+    Open a snapshot as a read-only ``RetrievalIndex``.
+
+    Args:
+        path: Snapshot file
+        embeddings: Embeddings used to encode queries
+        model_name: Embedding model name; must match the snapshot's fingerprint
+        k: Chunks to retrieve
+        fetch_k: Candidates per search before fusion
+        rrf_k: RRF constant
+        verify: Check section checksums before use
+        settings: Current build settings; differences from the snapshot's are logged
+
+    Returns:
+        ``RetrievalIndex`` (with BM25 when the snapshot holds postings)
+    """
+    snapshot = Snapshot(path, verify=verify)
+    check_fingerprint(snapshot, embeddings, model_name)
+    if settings is not None and settings != snapshot.manifest["settings"]:
+        logger.warning("Snapshot %s was built with settings %s, this node is configured with %s",
+                       path, snapshot.manifest["settings"], settings)
+    stored = snapshot.manifest["embedding"]
+    vectors = FAISS(embeddings, snapshot.faiss_index(), snapshot.docstore(), SnapshotIds(snapshot.array("ids")),
+                    normalize_L2=stored["normalize_L2"],
+                    distance_strategy=DistanceStrategy(stored["distance_strategy"]))
+    logger.info("Loaded snapshot %s: %d chunks built %s", path, snapshot.manifest["chunks"],
+                snapshot.manifest["created"])
+    return RetrievalIndex(vectors, snapshot.bm25(), k, fetch_k, rrf_k)
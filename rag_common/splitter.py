@@ -0,0 +1,172 @@
+"""
+Token-aware text splitting in one pass per text.
+
+``RecursiveCharacterTextSplitter`` sizes chunks in characters and finds split
+points by recursively re-splitting strings in Python. ``TokenAwareSplitter``
+instead:
+
+1. tokenizes every text of a batch in one call to a fast (Rust) tokenizer,
+   which also gives each token's character offsets
+2. finds every candidate boundary once: word gaps come straight from the
+   token offsets, while paragraph, line and sentence ends come from a single
+   regex scan. Each boundary is mapped to the token it precedes, giving one
+   ``level`` array (0 = paragraph ... 3 = word gap, 4 = no boundary)
+3. packs chunks greedily: each chunk ends at the furthest best-level
+   boundary within ``chunk_size`` tokens, and the next one starts
+   ``chunk_overlap`` tokens earlier, snapped to a word boundary
+
+Chunks are slices of the original text, and sizes are measured in the tokens
+that actually bound the embedding model and the LLM context.
+"""
+
+import copy
+import functools
+import logging
+import re
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import TextSplitter
+
+logger = logging.getLogger(__name__)
+
+# Paragraph break, line break, sentence end (closing quote/bracket allowed)
+_BOUNDARY = re.compile(r"(\n[ \t]*\n\s*)|(\n\s*)|([.!?][\"')\]]?\s+)")
+WORD_LEVEL = 3
+NO_BOUNDARY = 4
+
+
+class _Encoding:
+    def __init__(self, offsets):
+        self.offsets = offsets
+
+
+class RegexTokenizer:
+    """
+    Offline stand-in for a subword tokenizer: words and punctuation marks.
+
+    Counts run roughly 25% below a WordPiece/BPE tokenizer on English text.
+    It is only used when the configured tokenizer cannot be loaded.
+    """
+
+    _TOKEN = re.compile(r"\w+|[^\w\s]")
+
+    def encode_batch(self, texts, add_special_tokens=False):
+        return [_Encoding([m.span() for m in self._TOKEN.finditer(text)]) for text in texts]
+
+
+@functools.lru_cache(maxsize=None)
+def load_tokenizer(name):
+    """
+    Fast tokenizer for a HuggingFace model (from the local cache or the hub).
+
+    Falls back to ``RegexTokenizer`` with a warning if ``tokenizers`` is not
+    installed or the tokenizer cannot be fetched.
+    """
+    try:
+        from tokenizers import Tokenizer
+
+        tokenizer = Tokenizer.from_pretrained(name)
+    except Exception as e:
+        logger.warning("Could not load tokenizer %s (%s); counting regex word pieces instead", name, e)
+        return RegexTokenizer()
+    # Model tokenizers ship with truncation to the model's max length; chunking needs every token
+    tokenizer.no_truncation()
+    tokenizer.no_padding()
+    return tokenizer
+
+
+def boundary_levels(text, starts, ends):
+    """
+    Boundary level before each token: ``levels[j]`` rates cutting between tokens ``j - 1`` and ``j``.
+
+    Returns:
+        int8 array of ``len(starts) + 1`` levels; the end of the text is level 0
+    """
+    n = len(starts)
+    levels = np.full(n + 1, NO_BOUNDARY, dtype=np.int8)
+    levels[n] = 0
+    if n > 1:
+        levels[1:n][starts[1:] > ends[:-1]] = WORD_LEVEL
+    matches = [(m.end(), m.lastindex - 1) for m in _BOUNDARY.finditer(text)]
+    if matches:
+        positions, match_levels = np.asarray(matches, dtype=np.int64).T
+        tokens = np.searchsorted(starts, positions, side="left")
+        inside = (tokens > 0) & (tokens < n)
+        np.minimum.at(levels, tokens[inside], match_levels[inside].astype(np.int8))
+    return levels
+
+
+class TokenAwareSplitter(TextSplitter):
+    """Drop-in for ``RecursiveCharacterTextSplitter`` with sizes in tokens."""
+
+    def __init__(self, tokenizer, chunk_size=256, chunk_overlap=50, min_fill=0.5, **kwargs):
+        """
+        Args:
+            tokenizer: Object with ``encode_batch(texts, add_special_tokens=False)`` returning
+                encodings with ``offsets`` (a ``tokenizers.Tokenizer``, see ``load_tokenizer``)
+            chunk_size: Maximum tokens per chunk
+            chunk_overlap: Tokens repeated at the start of the next chunk
+            min_fill: A chunk is only cut at a boundary once it holds this share of ``chunk_size``,
+                so a short heading paragraph does not become a chunk of its own
+            **kwargs: ``add_start_index`` / ``strip_whitespace`` as for other LangChain splitters
+        """
+        super().__init__(chunk_size=chunk_size, chunk_overlap=chunk_overlap, **kwargs)
+        self.tokenizer = tokenizer
+        self.min_fill = min_fill
+
+    def _offsets(self, texts):
+        encodings = self.tokenizer.encode_batch(list(texts), add_special_tokens=False)
+        for encoding in encodings:
+            offsets = np.asarray(encoding.offsets, dtype=np.int64).reshape(-1, 2)
+            # Some tokenizers emit zero-width tokens (e.g. markers); they cannot carry a boundary
+            yield offsets[offsets[:, 1] > offsets[:, 0]]
+
+    def _spans(self, text, offsets):
+        """Yield ``(start_char, end_char)`` of every chunk of ``text``."""
+        starts, ends = offsets[:, 0], offsets[:, 1]
+        n = len(starts)
+        if n == 0:
+            return
+        levels = boundary_levels(text, starts, ends)
+        size, overlap = self._chunk_size, self._chunk_overlap
+        min_tokens = max(1, int(size * self.min_fill))
+        s = 0
+        while True:
+            limit = min(s + size, n)
+            e = limit
+            if limit < n:
+                window = levels[s + min_tokens:limit + 1]
+                best = window.min() if len(window) else NO_BOUNDARY
+                if best < NO_BOUNDARY:
+                    e = s + min_tokens + int(np.flatnonzero(window == best)[-1])
+            yield starts[s], ends[e - 1]
+            if e >= n:
+                return
+            # Start the next chunk ``overlap`` tokens back, at a word boundary if there is one
+            nxt = max(e - overlap, s + 1)
+            gaps = np.flatnonzero(levels[nxt:e] <= WORD_LEVEL)
+            s = nxt + int(gaps[0]) if len(gaps) else nxt
+
+    def _chunks(self, text, offsets):
+        for start, end in self._spans(text, offsets):
+            chunk = text[start:end]
+            if self._strip_whitespace:
+                chunk = chunk.strip()
+            if chunk:
+                yield int(start), chunk
+
+    def split_text(self, text):
+        return [chunk for _, chunk in self._chunks(text, next(self._offsets([text])))]
+
+    def create_documents(self, texts, metadatas=None):
+        """Split many texts with one batched tokenizer call; same output shape as LangChain's."""
+        metadatas = metadatas or [{}] * len(texts)
+        documents = []
+        for text, metadata, offsets in zip(texts, metadatas, self._offsets(texts)):
+            for start, chunk in self._chunks(text, offsets):
+                chunk_metadata = copy.deepcopy(metadata)
+                if self._add_start_index:
+                    chunk_metadata["start_index"] = start
+                documents.append(Document(page_content=chunk, metadata=chunk_metadata))
+        return documents
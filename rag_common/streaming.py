@@ -0,0 +1,86 @@
+"""
+Wall-clock latency metrics for streamed LLM answers.
+
+``time.process_time()`` only counts CPU time of this process and misses the
+network wait for the LLM entirely. ``StreamTimer`` wraps a token stream and
+records, with ``time.perf_counter()``, the time to first token and the total
+time from when the question was received, the generation time from when the
+stream was first pulled (i.e. the LLM request was sent), and the chunk rate.
+"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StreamTimer:
+    """Iterator wrapper that times a stream of answer chunks."""
+
+    def __init__(self, stream, start=None):
+        """
+        Args:
+            stream: Iterable of text chunks (e.g. ``chain.stream(...)``)
+            start: ``time.perf_counter()`` value the request started at;
+                defaults to now. Pass the time the question was received to
+                include retrieval in time-to-first-token.
+        """
+        self.stream = stream
+        self.start = time.perf_counter() if start is None else start
+        self.generation_start = None
+        self.first_token_at = None
+        self.end = None
+        self.chunks = 0
+        self.parts = []
+
+    def __iter__(self):
+        # Streams are lazy: the LLM request goes out when the first chunk is pulled
+        self.generation_start = time.perf_counter()
+        for chunk in self.stream:
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            self.chunks += 1
+            self.parts.append(chunk)
+            yield chunk
+        self.end = time.perf_counter()
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    @property
+    def time_to_first_token(self):
+        return None if self.first_token_at is None else self.first_token_at - self.start
+
+    @property
+    def total_time(self):
+        """Time from ``start`` to the last chunk, including retrieval before the stream began."""
+        return None if self.end is None else self.end - self.start
+
+    @property
+    def generation_time(self):
+        """Time from sending the LLM request to the last chunk."""
+        return None if self.end is None else self.end - self.generation_start
+
+    @property
+    def chunks_per_second(self):
+        """Streamed chunks per second after the first one (a chunk may hold more than one token)."""
+        if self.end is None or self.first_token_at is None or self.end == self.first_token_at:
+            return None
+        return (self.chunks - 1) / (self.end - self.first_token_at)
+
+    def summary(self):
+        """One-line human readable summary of the metrics."""
+        parts = []
+        if self.time_to_first_token is not None:
+            parts.append(f"first token {self.time_to_first_token:.2f}s")
+        if self.generation_time is not None:
+            parts.append(f"generation {self.generation_time:.2f}s")
+        if self.total_time is not None:
+            parts.append(f"total {self.total_time:.2f}s")
+        if self.chunks_per_second is not None:
+            parts.append(f"{self.chunks_per_second:.1f} chunks/s")
+        return " | ".join(parts) or "no tokens"
+
+    def log(self, label="answer"):
+        logger.info("%s: %s (%d chunks)", label, self.summary(), self.chunks)
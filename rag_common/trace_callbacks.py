@@ -0,0 +1,92 @@
+"""
+LangChain callback handler feeding the retriever, prompt and LLM runs of a
+chain into a ``rag_common.tracing.Trace``.
+
+Kept apart from ``rag_common.tracing`` so that module does not import
+langchain, and the apps can create their tracer before any heavy import.
+"""
+
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+def _approx_tokens(text):
+    # Roughly four characters per token for English text
+    return max(1, len(text) // 4)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler turning retriever, prompt and LLM runs into spans."""
+
+    PROMPT_CHAINS = {"format_inputs"}
+
+    def __init__(self, trace):
+        self.trace = trace
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, name, **attrs):
+        with self._lock:
+            self._runs[run_id] = (name, time.perf_counter(), attrs)
+
+    def _end(self, run_id, **attrs):
+        with self._lock:
+            started = self._runs.pop(run_id, None)
+        if started is None:
+            return
+        name, start, start_attrs = started
+        start_attrs.update(attrs)
+        self.trace.add(name, start, time.perf_counter(), **start_attrs)
+
+    # Retriever
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id, "search", query_tokens=_approx_tokens(query))
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id, chunks=len(documents))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=repr(error))
+
+    # Prompt building (document formatting + template)
+    def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        if kwargs.get("run_type") == "prompt" or name in self.PROMPT_CHAINS:
+            chunks = None
+            if isinstance(inputs, dict) and isinstance(inputs.get("context"), list):
+                chunks = len(inputs["context"])
+            self._start(run_id, "prompt_build", chunks=chunks)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        tokens = None
+        if hasattr(outputs, "to_string"):
+            tokens = _approx_tokens(outputs.to_string())
+        self._end(run_id, approx_tokens=tokens)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=repr(error))
+
+    # LLM
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, kwargs.get("name") or "llm", streamed_tokens=0)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, kwargs.get("name") or "llm", streamed_tokens=0)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            if run_id in self._runs:
+                self._runs[run_id][2]["streamed_tokens"] += 1
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self._end(
+            run_id,
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=repr(error))
@@ -0,0 +1,154 @@
+"""
+Per-stage tracing for the RAG chains.
+
+A trace covers one question. Inside it, spans record how long each stage
+took along with its input size and cache hits:
+
+- ``embed_query`` / ``embed_documents``: recorded by ``CachedEmbeddings``
+- ``search``: the retriever call, from LangChain callbacks (includes the
+  query embedding when the vector store embeds the query itself; see
+  ``rag_common.trace_callbacks``)
+- ``bm25`` / ``dense``: the two halves of a hybrid search
+- ``prompt_build``: formatting documents and the prompt template
+- ``llm`` (or the LLM's ``run_name``): the model call, with token usage
+- ``answer_cache`` / ``render``: recorded explicitly by the apps
+
+Spans are appended to a JSONL trace file, and the last few traces are kept
+in memory for the in-app latency breakdown panel.
+"""
+
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("rag_trace", default=None)
+
+
+class Trace:
+    """Spans recorded for one request."""
+
+    def __init__(self, name):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name, start, end, **attrs):
+        """Record a finished span given ``time.perf_counter()`` start and end values."""
+        span = {
+            "span": name,
+            "start_ms": round((start - self.start) * 1000, 3),
+            "duration_ms": round((end - start) * 1000, 3),
+        }
+        span.update((k, v) for k, v in attrs.items() if v is not None)
+        with self._lock:
+            self.spans.append(span)
+
+    def stage_totals(self):
+        """Total milliseconds per span name."""
+        totals = {}
+        for span in self.spans:
+            totals[span["span"]] = totals.get(span["span"], 0.0) + span["duration_ms"]
+        return totals
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a block as a span of the current trace; a no-op outside a trace.
+
+    Yields a dict the block can add attributes to (e.g. ``chunks``, ``cache_hit``).
+    """
+    trace = _current.get()
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        if trace is not None:
+            trace.add(name, start, time.perf_counter(), **attrs)
+
+
+def current_trace():
+    return _current.get()
+
+
+def run_in_trace(fn, *args, **kwargs):
+    """Wrap ``fn`` so it records into the caller's trace when run on another thread."""
+    context = contextvars.copy_context()
+    return lambda: context.run(fn, *args, **kwargs)
+
+
+class Tracer:
+    """Writes traces to a JSONL file and keeps a rolling window in memory."""
+
+    def __init__(self, path=None, window=50):
+        """
+        Args:
+            path: JSONL file spans are appended to, or None to keep them in memory only
+            window: Number of recent traces kept for ``breakdown``
+        """
+        self.path = path
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self, name="query", **attrs):
+        """Open a trace for one request; spans recorded inside the block belong to it."""
+        trace = Trace(name)
+        token = _current.set(trace)
+        try:
+            yield trace
+        finally:
+            _current.reset(token)
+            trace.add("total", trace.start, time.perf_counter(), **attrs)
+            self._finish(trace)
+
+    def _finish(self, trace):
+        with self._lock:
+            self.recent.append(trace)
+            if not self.path:
+                return
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    for s in trace.spans:
+                        record = {"trace_id": trace.trace_id, "trace": trace.name, "ts": trace.started_at}
+                        record.update(s)
+                        f.write(json.dumps(record, default=str) + "\n")
+            except OSError as e:
+                logger.warning("Could not write trace file %s: %s", self.path, e)
+
+    def breakdown(self):
+        """
+        Per-stage latency over the recent traces.
+
+        Returns:
+            List of dicts with ``stage``, ``count``, ``mean_ms``, ``p50_ms`` and ``p95_ms``
+        """
+        with self._lock:
+            totals = [trace.stage_totals() for trace in self.recent]
+        stages = {}
+        for trace_totals in totals:
+            for stage, ms in trace_totals.items():
+                stages.setdefault(stage, []).append(ms)
+        rows = []
+        for stage, values in stages.items():
+            values = np.asarray(values)
+            rows.append({
+                "stage": stage,
+                "count": len(values),
+                "mean_ms": round(float(values.mean()), 1),
+                "p50_ms": round(float(np.percentile(values, 50)), 1),
+                "p95_ms": round(float(np.percentile(values, 95)), 1),
+            })
+        return sorted(rows, key=lambda row: row["stage"] == "total")
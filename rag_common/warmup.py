@@ -0,0 +1,66 @@
+"""
+Background warm-up of heavy imports and models.
+
+Streamlit runs an app's script when the first browser session connects, and
+everything imported or built at the top of the script delays that first page
+paint (and, if built outside a cached function, every rerun after it). The
+apps therefore import langchain, FAISS, Chroma and the embedding models only
+inside the functions that need them, and hand those functions to a
+``Warmup``, which runs them on a daemon thread so they are usually loaded by
+the time the first question is asked.
+"""
+
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def import_modules(names):
+    """Import ``names`` so later imports of them are dictionary lookups."""
+    for name in names:
+        importlib.import_module(name)
+
+
+class Warmup:
+    """Runs named warm-up tasks once, in order, on a background thread."""
+
+    def __init__(self, tasks):
+        """
+        Args:
+            tasks: Iterable of (name, zero-argument callable) pairs
+        """
+        self.tasks = list(tasks)
+        self.timings = {}
+        self.errors = {}
+        self.done = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the warm-up thread (only the first call does anything)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="rag-warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def run(self):
+        """Run every task in the calling thread. A failing task is logged and skipped."""
+        for name, task in self.tasks:
+            start = time.perf_counter()
+            try:
+                task()
+            except Exception as e:
+                # The same call fails again, visibly, when the app makes it for real
+                self.errors[name] = repr(e)
+                logger.warning("Warm-up task %s failed: %s", name, e)
+            self.timings[name] = time.perf_counter() - start
+            logger.info("Warm-up task %s took %.2fs", name, self.timings[name])
+        self.done.set()
+
+    def wait(self, timeout=None):
+        """Block until every task has run; returns False on timeout."""
+        return self.done.wait(timeout)
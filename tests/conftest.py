@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The apps and scripts put the repository root on sys.path the same way
+sys.path.append(str(Path(__file__).resolve().parents[1]))
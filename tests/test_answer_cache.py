@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag_common.answer_cache import AnswerCache, context_key
+
+CONTEXT = context_key([Document(page_content="attention", metadata={"source": "a.pdf", "page": 1})])
+OTHER = context_key([Document(page_content="attention", metadata={"source": "b.pdf", "page": 1})])
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_similar_question_with_identical_context_hits():
+    cache = AnswerCache(threshold=0.95)
+    cache.store(unit(1, 0, 0), CONTEXT, "answer", index_version=1)
+    assert cache.lookup(unit(1, 0.1, 0), CONTEXT, 1) == "answer"
+    # Too far apart, or a different context: miss
+    assert cache.lookup(unit(1, 1, 0), CONTEXT, 1) is None
+    assert cache.lookup(unit(1, 0, 0), OTHER, 1) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_index_version_change_drops_every_entry():
+    cache = AnswerCache()
+    cache.store(unit(1, 0), CONTEXT, "answer", index_version=1)
+    assert cache.lookup(unit(1, 0), CONTEXT, 2) is None
+    assert cache.lookup(unit(1, 0), CONTEXT, 1) is None
+
+
+def test_entries_expire_and_are_evicted_lru(monkeypatch):
+    cache = AnswerCache(ttl_seconds=10, max_entries=2)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    cache.store(unit(1, 0, 0), CONTEXT, "a", 1)
+    cache.store(unit(0, 1, 0), CONTEXT, "b", 1)
+    assert cache.lookup(unit(1, 0, 0), CONTEXT, 1) == "a"
+    cache.store(unit(0, 0, 1), CONTEXT, "c", 1)
+    # "b" was the least recently used
+    assert cache.lookup(unit(0, 1, 0), CONTEXT, 1) is None
+    assert cache.lookup(unit(0, 0, 1), CONTEXT, 1) == "c"
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.lookup(unit(1, 0, 0), CONTEXT, 1) is None
+
@@ -0,0 +1,83 @@
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from rag_common.context import (
+    ContextProcessor, SentenceEmbeddings, keep_relevant_sentences, merge_overlapping, remove_near_duplicates,
+    split_sentences,
+)
+from rag_common.fakes import HashingEmbeddings
+
+TEXT = (
+    "The transformer relies entirely on attention to draw global dependencies between input and output. "
+    "Multi-head attention lets the model jointly attend to information from different subspaces. "
+    "Positional encodings inject information about the relative position of tokens in the sequence. "
+    "Training used the Adam optimizer with a warmup schedule for the learning rate. "
+    "Label smoothing hurts perplexity but improves accuracy and BLEU score."
+)
+
+
+def page(text, source="paper.pdf", page=0):
+    return Document(page_content=text, metadata={"source": source, "page": page})
+
+
+def test_overlapping_chunks_are_merged_back():
+    chunks = RecursiveCharacterTextSplitter(chunk_size=150, chunk_overlap=60).split_text(TEXT)
+    assert len(chunks) > 2
+    # Retrieved out of order, with a chunk of another page in between
+    documents = [page(chunks[1]), page("unrelated text", page=1), page(chunks[0]), page(chunks[2])]
+    merged = merge_overlapping(documents)
+    assert [doc.metadata["page"] for doc in merged] == [0, 1]
+    assert merged[0].page_content in TEXT and merged[0].page_content.startswith(chunks[0][:40])
+    assert merged[0].page_content.endswith(chunks[2][-40:])
+
+
+def test_same_text_on_another_page_is_not_merged():
+    assert len(merge_overlapping([page(TEXT), page(TEXT, page=3)])) == 2
+
+
+def test_near_duplicates_of_a_higher_ranked_passage_are_dropped():
+    near_copy = TEXT.replace("Adam", "ADAM")
+    documents = [page(TEXT), page(near_copy, "copy.pdf"), page("A different passage about retrieval.", "b.pdf")]
+    kept = remove_near_duplicates(documents, threshold=0.85)
+    assert [doc.metadata["source"] for doc in kept] == ["paper.pdf", "b.pdf"]
+    assert len(remove_near_duplicates(documents, threshold=1.01)) == 3
+
+
+def test_sentence_budget_keeps_the_most_relevant_sentences_in_order():
+    documents = [page(TEXT), page("Cats purr. Optimizer warmup matters for Adam.", "b.pdf")]
+    kept = keep_relevant_sentences(documents, "Adam optimizer warmup learning rate", HashingEmbeddings(), 2)
+    sentences = [s for doc in kept for s in split_sentences(doc.page_content)]
+    assert len(sentences) == 2
+    assert any("Adam" in s for s in sentences)
+    assert all("Cats" not in s for s in sentences)
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def test_sentence_embeddings_are_cached_and_bounded():
+    model = CountingEmbeddings()
+    sentences = SentenceEmbeddings(model, max_size=2)
+    sentences.embed_documents(["a", "b", "a"])
+    assert model.embedded == ["a", "b"]
+    sentences.embed_documents(["b", "c"])
+    assert model.embedded == ["a", "b", "c"]
+    # "a" was evicted, "b" and "c" are still cached
+    sentences.embed_documents(["a", "c"])
+    assert model.embedded == ["a", "b", "c", "a"]
+
+
+def test_processor_steps_can_be_switched_off():
+    documents = [page(TEXT), page(TEXT)]
+    assert len(ContextProcessor().process(documents, "attention")) == 1
+    assert len(ContextProcessor(merge=False, dedup_threshold=0).process(documents, "attention")) == 2
+    compressed = ContextProcessor(HashingEmbeddings(), max_sentences=1).process(documents, "label smoothing BLEU")
+    assert [doc.page_content for doc in compressed] == [
+        "Label smoothing hurts perplexity but improves accuracy and BLEU score."]
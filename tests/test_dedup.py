@@ -0,0 +1,100 @@
+import os
+import random
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from benchmarks.corpus import WORDS, write_pdf
+from rag_common import ingest
+from rag_common.dedup import MinHasher, NearDuplicateIndex
+from rag_common.docstore import MmapDocstore
+from rag_common.fakes import HashingEmbeddings
+
+_rng = random.Random(0)
+TEXT = " ".join(_rng.choices(WORDS, k=200))
+
+
+def edited(text, changes, seed=1):
+    rng = random.Random(seed)
+    words = text.split()
+    for i in rng.sample(range(len(words)), changes):
+        words[i] = "edited"
+    return " ".join(words)
+
+
+def jaccard(a, b, size=5):
+    def shingles(text):
+        words = text.split()
+        return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+def test_signature_agreement_estimates_jaccard():
+    hasher = MinHasher(num_perm=256)
+    for changes in (2, 10, 40):
+        other = edited(TEXT, changes)
+        estimate = float(np.mean(hasher.signature(TEXT) == hasher.signature(other)))
+        assert abs(estimate - jaccard(TEXT, other)) < 0.1
+
+
+def test_filter_collapses_near_duplicates_and_keeps_provenance():
+    index = NearDuplicateIndex(threshold=0.8)
+    chunks = [
+        Document(page_content=TEXT, metadata={"source": "preprint.pdf", "page": 0}),
+        Document(page_content=edited(TEXT, 2), metadata={"source": "camera-ready.pdf", "page": 3}),
+        Document(page_content=edited(TEXT, 60), metadata={"source": "other.pdf", "page": 1}),
+    ]
+    kept, ids, targets = index.filter(chunks, ["a", "b", "c"])
+    assert ids == ["a", "c"] and targets == ["a"] and index.collapsed == 1
+    assert [chunk.metadata["source"] for chunk in kept] == ["preprint.pdf", "other.pdf"]
+    assert index.pending == {"a": [{"source": "camera-ready.pdf", "page": 3}]}
+
+    # Once the kept chunk is removed, its copy is kept again
+    index.remove(["a"])
+    assert index.filter(chunks[1:2], ["b"])[1] == ["b"]
+
+
+def test_save_and_load(tmp_path):
+    index = NearDuplicateIndex()
+    index.filter([Document(page_content=TEXT)], ["a"])
+    path = str(tmp_path / "minhash.npz")
+    index.save(path)
+    loaded = NearDuplicateIndex().load(path)
+    assert loaded.query(loaded.hasher.signature(edited(TEXT, 1))) == "a"
+
+
+def test_stream_into_index_records_duplicates_on_the_kept_chunk():
+    chunks = [Document(page_content=TEXT, metadata={"source": "a.pdf", "page": 0}),
+              Document(page_content=edited(TEXT, 1), metadata={"source": "b.pdf", "page": 2})]
+    vectors = ingest.stream_into_index(chunks, HashingEmbeddings(), 8, ids=["a", "b"], docstore=MmapDocstore(),
+                                       duplicates=NearDuplicateIndex())
+    assert list(vectors.index_to_docstore_id.values()) == ["a"]
+    assert vectors.docstore.search("a").metadata["duplicates"] == [{"source": "b.pdf", "page": 2}]
+
+
+def test_incremental_ingest_requeues_copies_of_a_removed_chunk(tmp_path):
+    papers, cache_dir = tmp_path / "papers", tmp_path / "index"
+    papers.mkdir()
+    page = [TEXT[i:i + 90] for i in range(0, len(TEXT), 90)]
+    write_pdf(str(papers / "a.pdf"), [page])
+    write_pdf(str(papers / "b.pdf"), [page])
+    splitter = RecursiveCharacterTextSplitter(chunk_size=4000, chunk_overlap=0)
+
+    def run():
+        return ingest.incremental_ingest(str(papers), str(cache_dir), HashingEmbeddings(), splitter, "key",
+                                         max_workers=1, dedup_settings={"threshold": 0.8, "num_perm": 128})
+
+    vectors, report = run()
+    assert vectors.index.ntotal == 1 and report["chunks_collapsed"] == 1
+    kept = next(iter(vectors.docstore._dict.values()))
+    assert os.path.basename(kept.metadata["source"]) == "a.pdf"
+    assert [os.path.basename(d["source"]) for d in kept.metadata["duplicates"]] == ["b.pdf"]
+
+    os.remove(papers / "a.pdf")
+    vectors, report = run()
+    assert report["removed"] == ["a.pdf"] and report["requeued"] == ["b.pdf"]
+    kept = next(iter(vectors.docstore._dict.values()))
+    assert vectors.index.ntotal == 1 and os.path.basename(kept.metadata["source"]) == "b.pdf"
+    assert not kept.metadata.get("duplicates")
@@ -0,0 +1,68 @@
+import pytest
+from langchain_core.documents import Document
+
+from rag_common import index_cache, ingest
+from rag_common.docstore import MmapDocstore
+from rag_common.fakes import HashingEmbeddings
+
+
+def doc(text, **metadata):
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_added_deleted_and_updated_rows_survive_a_write(tmp_path):
+    store = MmapDocstore()
+    store.add({"a": doc("first chunk", source="a.pdf", page=0), "b": doc("zweiter Abschnitt ü", source="b.pdf"),
+               "c": doc("third", source="a.pdf", page=2, extra=[1, 2])})
+    store.delete(["b"])
+    store.update_metadata("a", {"duplicates": [{"source": "copy.pdf", "page": 0}]})
+    assert store.search("b") == "ID b not found."
+    with pytest.raises(ValueError):
+        store.add({"a": doc("again")})
+    store.write(str(tmp_path))
+
+    opened = MmapDocstore.open(str(tmp_path))
+    assert len(opened) == 2 and MmapDocstore.exists(str(tmp_path))
+    assert opened.search("a") == doc("first chunk", source="a.pdf", page=0,
+                                     duplicates=[{"source": "copy.pdf", "page": 0}])
+    assert opened.search("c") == doc("third", source="a.pdf", page=2, extra=[1, 2])
+    assert opened.search("b") == "ID b not found."
+
+    # Changes on top of the mapped base rows, then a second compaction
+    opened.add({"d": doc("fourth chunk", source="d.pdf")})
+    opened.delete(["a"])
+    opened.update_metadata("c", {"page": 3})
+    second = tmp_path / "second"
+    second.mkdir()
+    opened.write(str(second))
+    reopened = MmapDocstore.open(str(second))
+    assert sorted(reopened._live_rows()) == [0, 1]
+    assert reopened.search("c").metadata["page"] == 3
+    assert reopened.search("d").page_content == "fourth chunk"
+    with pytest.raises(ValueError):
+        reopened.delete(["a"])
+
+
+def test_empty_store_round_trip(tmp_path):
+    MmapDocstore().write(str(tmp_path))
+    assert len(MmapDocstore.open(str(tmp_path))) == 0
+
+
+def test_faiss_store_with_mmap_docstore_survives_the_cache(tmp_path):
+    cache_dir = str(tmp_path / "index")
+    embeddings = HashingEmbeddings()
+    texts = ["attention heads", "retrieval index"]
+    vectors = ingest.new_store(embeddings, list(zip(texts, embeddings.embed_documents(texts))),
+                               [{"source": "a.pdf"}, {"source": "b.pdf"}], ["0", "1"], MmapDocstore())
+    index_cache.save_index(vectors, cache_dir, "key")
+
+    loaded = index_cache.load_index(cache_dir, "key", embeddings)
+    assert isinstance(loaded.docstore, MmapDocstore)
+    assert loaded.similarity_search("retrieval", k=1)[0] == doc("retrieval index", source="b.pdf")
+    # Incremental updates delete and append through the docstore interface
+    loaded.delete(["0"])
+    loaded.add_texts(["learning rate"], metadatas=[{"source": "c.pdf"}], ids=["2"])
+    index_cache.save_index(loaded, cache_dir, "key")
+    reloaded = index_cache.load_index(cache_dir, "key", embeddings)
+    assert sorted(reloaded.index_to_docstore_id.values()) == ["1", "2"]
+    assert reloaded.docstore.search("2") == doc("learning rate", source="c.pdf")
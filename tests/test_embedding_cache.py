@@ -0,0 +1,74 @@
+import threading
+
+import numpy as np
+
+from rag_common.embedding_cache import EmbeddingStore, text_digest
+
+
+def vector(seed, dim=8):
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+def test_two_writers_on_one_directory(tmp_path):
+    # Two stores stand in for two processes (e.g. the app and batch_query) sharing a cache dir
+    a = EmbeddingStore(str(tmp_path), dtype="float32")
+    b = EmbeddingStore(str(tmp_path), dtype="float32")
+    a.put([text_digest("alpha")], [vector(1)])
+    b.put([text_digest("beta")], [vector(2)])
+    a.put([text_digest("gamma"), text_digest("beta")], [vector(3), vector(2)])
+
+    for store in (a, b, EmbeddingStore(str(tmp_path), dtype="float32")):
+        alpha, beta, gamma = store.get([text_digest(t) for t in ("alpha", "beta", "gamma")])
+        np.testing.assert_array_equal(alpha, vector(1))
+        np.testing.assert_array_equal(beta, vector(2))
+        np.testing.assert_array_equal(gamma, vector(3))
+
+
+def test_concurrent_writers(tmp_path):
+    stores = [EmbeddingStore(str(tmp_path), dtype="float32") for _ in range(4)]
+
+    def write(store, worker):
+        for i in range(50):
+            key = f"text {worker}-{i}"
+            store.put([text_digest(key)], [vector(hash(key) % 10_000)])
+
+    threads = [threading.Thread(target=write, args=(store, w)) for w, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    fresh = EmbeddingStore(str(tmp_path), dtype="float32")
+    assert len(fresh) == 200
+    for w in range(4):
+        for i in range(50):
+            key = f"text {w}-{i}"
+            np.testing.assert_array_equal(fresh.get([text_digest(key)])[0], vector(hash(key) % 10_000))
+
+
+def test_recovers_from_a_torn_append(tmp_path):
+    store = EmbeddingStore(str(tmp_path), dtype="float32")
+    store.put([text_digest("alpha")], [vector(1)])
+    # A crash after the vector append but before the key append
+    with open(store.vectors_path, "ab") as f:
+        f.write(vector(9).tobytes())
+    other = EmbeddingStore(str(tmp_path), dtype="float32")
+    other.put([text_digest("beta")], [vector(2)])
+    np.testing.assert_array_equal(EmbeddingStore(str(tmp_path), dtype="float32").get([text_digest("beta")])[0],
+                                  vector(2))
+
+
+def test_queries_and_sentences_are_not_written_to_the_store(tmp_path):
+    from langchain_core.documents import Document
+
+    from rag_common.context import ContextProcessor
+    from rag_common.embedding_cache import CachedEmbeddings, embed_queries
+    from rag_common.fakes import HashingEmbeddings
+
+    embeddings = CachedEmbeddings(HashingEmbeddings(), "hashing", str(tmp_path), symmetric=True)
+    embeddings.embed_documents(["a chunk of text"])
+    assert len(embed_queries(embeddings, ["first question", "second question"])) == 2
+    processor = ContextProcessor(embeddings, max_sentences=1)
+    document = Document(page_content="Attention is all you need. Cats purr. Dogs bark.")
+    assert processor.process([document], "attention")[0].page_content == "Attention is all you need."
+    assert len(embeddings.store) == 1
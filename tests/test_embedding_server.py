@@ -0,0 +1,33 @@
+import threading
+import time
+
+from rag_common.embedding_server import ModelRegistry
+from rag_common.fakes import HashingEmbeddings
+
+
+def test_cold_load_does_not_block_other_models():
+    release = threading.Event()
+    loads = []
+
+    def factory(model_name, batch_size):
+        loads.append(model_name)
+        if model_name == "slow":
+            release.wait(5)
+        return HashingEmbeddings(dim=8)
+
+    registry = ModelRegistry(factory, max_batch_size=4, max_wait_ms=0.0)
+    slow = [threading.Thread(target=registry.get, args=("slow",)) for _ in range(3)]
+    for thread in slow:
+        thread.start()
+    time.sleep(0.05)
+
+    start = time.perf_counter()
+    assert registry.get("fast").embed(["hello"]).shape == (1, 8)
+    assert "fast" in registry.summary()
+    assert time.perf_counter() - start < 1.0
+
+    release.set()
+    for thread in slow:
+        thread.join()
+    # Concurrent requests for the cold model share one load
+    assert loads.count("slow") == 1
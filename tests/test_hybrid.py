@@ -0,0 +1,110 @@
+import asyncio
+import math
+from collections import Counter
+
+from langchain_community.vectorstores import FAISS
+
+from rag_common import bm25
+from rag_common.bm25 import BM25Index
+from rag_common.fakes import HashingEmbeddings
+from rag_common.hybrid import HybridRetriever, RetrievalIndex, reciprocal_rank_fusion
+
+TEXTS = [
+    "Attention is all you need: the transformer uses multi-head attention.",
+    "BERT pre-trains deep bidirectional transformers for language understanding.",
+    "Retrieval augmented generation combines a retriever with a generator.",
+    "Dense passage retrieval encodes questions and passages with two encoders.",
+    "Adam is a method for stochastic optimization with adaptive learning rates.",
+]
+
+
+def reference_bm25(query, texts, k1=1.5, b=0.75):
+    docs = [Counter(bm25.tokenize(text)) for text in texts]
+    avgdl = sum(sum(d.values()) for d in docs) / len(docs)
+    scores = []
+    for doc in docs:
+        length, score = sum(doc.values()), 0.0
+        for term in set(bm25.tokenize(query)):
+            df = sum(term in d for d in docs)
+            if not df:
+                continue
+            idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+            tf = doc[term]
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avgdl))
+        scores.append(score)
+    return scores
+
+
+def test_bm25_matches_the_formula():
+    ids = [f"doc-{i}" for i in range(len(TEXTS))]
+    index = BM25Index.build(ids, TEXTS)
+    for query in ("transformer attention", "retrieval passages", "learning rates", "unknown words"):
+        expected = reference_bm25(query, TEXTS)
+        results = index.search(query, k=len(TEXTS))
+        assert [doc_id for doc_id, _ in results] == [ids[i] for i in sorted(
+            (i for i, s in enumerate(expected) if s > 0), key=lambda i: -expected[i])]
+        for doc_id, score in results:
+            assert math.isclose(score, expected[ids.index(doc_id)], rel_tol=1e-5)
+
+
+def test_bm25_save_and_load(tmp_path):
+    index = BM25Index.build(["a", "b", "c"], TEXTS[:3])
+    path = str(tmp_path / "bm25.npz")
+    index.save(path)
+    assert BM25Index.load(path).search("retriever generator", 2) == index.search("retriever generator", 2)
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], rrf_k=60)
+    assert [doc_id for doc_id, _ in fused] == ["a", "c", "b"]
+    assert math.isclose(dict(fused)["a"], 1 / 61 + 1 / 62)
+
+
+def test_hybrid_retriever_fuses_both_searches(tmp_path):
+    vectors = FAISS.from_texts(TEXTS, HashingEmbeddings(), ids=[str(i) for i in range(len(TEXTS))])
+    lexical = bm25.load_or_build(vectors, str(tmp_path))
+    assert (tmp_path / "bm25.npz").exists()
+    index = RetrievalIndex(vectors, lexical, k=2, fetch_k=5)
+    retriever = index.as_retriever()
+    assert isinstance(retriever, HybridRetriever)
+
+    docs = retriever.invoke("stochastic optimization Adam")
+    assert docs[0].page_content == TEXTS[4] and len(docs) == 2
+    assert [d.page_content for d in asyncio.run(retriever.ainvoke("stochastic optimization Adam"))] == \
+        [d.page_content for d in docs]
+    # The batch path ranks the same way as the retriever
+    assert [d.page_content for d in index.search_batch(["stochastic optimization Adam"])[0]] == \
+        [d.page_content for d in docs]
+
+
+def test_without_bm25_the_retriever_is_dense_only():
+    vectors = FAISS.from_texts(TEXTS, HashingEmbeddings())
+    docs = RetrievalIndex(vectors, None, k=3).as_retriever().invoke("transformer")
+    assert [d.page_content for d in docs] == [d.page_content for d in vectors.similarity_search("transformer", k=3)]
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.queries = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+
+def test_retrievers_reuse_a_precomputed_query_embedding():
+    texts = ["attention heads", "retrieval index", "learning rate schedule"]
+    embeddings = CountingEmbeddings()
+    vectors = FAISS.from_texts(texts, embeddings, ids=["0", "1", "2"])
+    query = "retrieval"
+    embedding = embeddings.embed_query(query)
+    for bm25 in (None, BM25Index.build(["0", "1", "2"], texts)):
+        retriever = RetrievalIndex(vectors, bm25, k=2, fetch_k=3).as_retriever()
+        embeddings.queries = 0
+        docs = retriever.invoke(query, embedding=embedding)
+        adocs = asyncio.run(retriever.ainvoke(query, embedding=embedding))
+        assert embeddings.queries == 0
+        assert docs[0].page_content == adocs[0].page_content == "retrieval index"
+        assert [d.page_content for d in retriever.invoke(query)] == [d.page_content for d in docs]
+        assert embeddings.queries == 1
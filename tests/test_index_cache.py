@@ -0,0 +1,68 @@
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.corpus import write_pdf
+from rag_common import doc_index, index_cache
+from rag_common.config import Config
+from rag_common.fakes import HashingEmbeddings
+
+
+def test_empty_corpus_is_not_saved(tmp_path):
+    cache_dir = str(tmp_path / "index")
+    vectors, hit = index_cache.load_or_build(cache_dir, "key", HashingEmbeddings(), lambda: None)
+    assert (vectors, hit) == (None, False)
+    assert index_cache.read_key(cache_dir) is None
+
+
+def test_full_mode_on_an_empty_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "INGEST_MODE", "full")
+    monkeypatch.setattr(Config, "SPLITTER", "recursive")
+    monkeypatch.setattr(Config, "INDEX_CACHE_DIR", str(tmp_path / "index"))
+    papers = tmp_path / "papers"
+    papers.mkdir()
+    assert doc_index.load_vector_index(str(papers), HashingEmbeddings()) is None
+    assert doc_index.load_retrieval_index(str(papers), HashingEmbeddings()) is None
+
+
+def write_papers(directory, *texts):
+    directory.mkdir(exist_ok=True)
+    for i, text in enumerate(texts):
+        write_pdf(str(directory / f"paper{i}.pdf"), [[text]])
+
+
+def build(texts, embeddings):
+    return FAISS.from_texts(texts, embeddings, ids=[str(i) for i in range(len(texts))])
+
+
+def test_corpus_key_tracks_contents_and_settings(tmp_path):
+    papers = tmp_path / "papers"
+    write_papers(papers, "attention is all you need", "retrieval augmented generation")
+    key = index_cache.corpus_key(str(papers), 1000, 200, "model")
+    assert index_cache.corpus_key(str(papers), 1000, 200, "model") == key
+    assert index_cache.corpus_key(str(papers), 500, 200, "model") != key
+    assert index_cache.corpus_key(str(papers), 1000, 200, "other-model") != key
+    assert index_cache.corpus_key(str(papers), 1000, 200, "model", docstore="mmap") != key
+
+    write_papers(papers, "attention is all you need", "a different second paper")
+    assert index_cache.corpus_key(str(papers), 1000, 200, "model") != key
+
+
+def test_save_and_load_round_trip(tmp_path):
+    cache_dir = str(tmp_path / "index")
+    embeddings = HashingEmbeddings()
+    built = []
+
+    def build_fn():
+        built.append(1)
+        return build(["attention heads", "retrieval index"], embeddings)
+
+    vectors, hit = index_cache.load_or_build(cache_dir, "key-1", embeddings, build_fn)
+    assert not hit
+    vectors, hit = index_cache.load_or_build(cache_dir, "key-1", embeddings, build_fn)
+    assert hit and len(built) == 1
+    assert vectors.similarity_search("retrieval", k=1)[0].page_content == "retrieval index"
+
+    # A different key is a miss, and rebuilding replaces the cached index
+    assert index_cache.load_index(cache_dir, "key-2", embeddings) is None
+    index_cache.load_or_build(cache_dir, "key-2", embeddings, build_fn)
+    assert len(built) == 2 and index_cache.read_key(cache_dir) == "key-2"
+
@@ -0,0 +1,59 @@
+import os
+
+import faiss
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+
+from rag_common import index_factory
+from rag_common.fakes import HashingEmbeddings
+from rag_common.index_factory import IndexSpec
+
+
+def flat_index(n, dim=16, seed=0):
+    index = faiss.IndexFlatL2(dim)
+    index.add(np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32))
+    return index
+
+
+def test_unknown_index_type_is_rejected():
+    with pytest.raises(ValueError):
+        IndexSpec("annoy")
+
+
+def test_build_params_only_cover_build_time_settings():
+    assert IndexSpec("hnsw", ef_search=10).build_params() == IndexSpec("hnsw", ef_search=500).build_params()
+    assert IndexSpec("ivf_flat", nlist=8).build_params() != IndexSpec("ivf_flat", nlist=16).build_params()
+
+
+def test_small_corpus_falls_back_to_flat():
+    assert isinstance(index_factory.make_index(IndexSpec("ivf_flat", nlist=64), 16, 20), faiss.IndexFlatL2)
+    assert isinstance(index_factory.make_index(IndexSpec("ivf_pq", pq_m=4), 16, 100), faiss.IndexFlatL2)
+
+
+@pytest.mark.parametrize("kind", ["ivf_flat", "ivf_pq", "hnsw"])
+def test_ann_index_keeps_row_order(kind):
+    flat = flat_index(2000)
+    spec = IndexSpec(kind, nlist=16, nprobe=16, pq_m=4, pq_nbits=4, ef_search=128)
+    index = index_factory.build_from(flat, spec)
+    assert index.ntotal == flat.ntotal
+    queries = flat.reconstruct_n(0, 50)
+    _, rows = index.search(queries, 1)
+    # Every stored vector finds its own row (approximately, for product quantisation)
+    assert (rows[:, 0] == np.arange(50)).mean() >= (0.8 if kind == "ivf_pq" else 0.98)
+
+
+def test_load_or_convert_caches_the_ann_index(tmp_path):
+    texts = [f"document {i} about topic {i % 7} and subject {i % 11}" for i in range(400)]
+    vectors = FAISS.from_texts(texts, HashingEmbeddings(dim=32))
+    spec = IndexSpec("ivf_flat", nlist=4, nprobe=4)
+    converted = index_factory.load_or_convert(vectors, spec, str(tmp_path))
+    assert faiss.try_extract_index_ivf(converted.index) is not None
+    cached = [name for name in os.listdir(tmp_path) if name.startswith("ann_")]
+    assert len(cached) == 1
+
+    # A second conversion reads the cached file, and search results still map to documents
+    again = FAISS.from_texts(texts, HashingEmbeddings(dim=32))
+    again = index_factory.load_or_convert(again, spec, str(tmp_path))
+    assert faiss.try_extract_index_ivf(again.index).nprobe == 4
+    assert again.similarity_search(texts[5], k=1)[0].page_content == texts[5]
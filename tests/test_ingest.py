@@ -0,0 +1,117 @@
+import os
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from benchmarks.corpus import write_pdf
+from rag_common import index_cache, ingest
+from rag_common.fakes import HashingEmbeddings
+
+SPLITTER = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=0)
+
+
+def run(papers, cache_dir, key="key"):
+    return ingest.incremental_ingest(str(papers), str(cache_dir), HashingEmbeddings(), SPLITTER, key, max_workers=1)
+
+
+def sources(vectors):
+    return sorted({os.path.basename(doc.metadata["source"]) for doc in vectors.docstore._dict.values()})
+
+
+def test_adds_changes_and_removes_files(tmp_path):
+    papers, cache_dir = tmp_path / "papers", tmp_path / "index"
+    papers.mkdir()
+    write_pdf(str(papers / "a.pdf"), [["attention heads and transformer layers"]])
+    write_pdf(str(papers / "b.pdf"), [["retrieval index and vector search"]])
+
+    vectors, report = run(papers, cache_dir)
+    assert report["added"] == ["a.pdf", "b.pdf"] and report["chunks_embedded"] == 2
+    assert sources(vectors) == ["a.pdf", "b.pdf"]
+
+    # Nothing changed: nothing is parsed or embedded
+    vectors, report = run(papers, cache_dir)
+    assert (report["added"], report["modified"], report["removed"], report["chunks_embedded"]) == ([], [], [], 0)
+
+    write_pdf(str(papers / "a.pdf"), [["gradient descent and learning rate"]])
+    write_pdf(str(papers / "c.pdf"), [["benchmark dataset evaluation"]])
+    os.remove(papers / "b.pdf")
+    vectors, report = run(papers, cache_dir)
+    assert (report["added"], report["modified"], report["removed"]) == (["c.pdf"], ["a.pdf"], ["b.pdf"])
+    assert report["chunks_embedded"] == 2
+    assert sources(vectors) == ["a.pdf", "c.pdf"]
+    texts = sorted(doc.page_content for doc in vectors.docstore._dict.values())
+    assert texts == ["benchmark dataset evaluation", "gradient descent and learning rate"]
+    assert vectors.index.ntotal == 2
+
+    # The updated index and manifest were persisted
+    manifest = index_cache.read_meta(str(cache_dir))["manifest"]
+    assert sorted(manifest) == ["a.pdf", "c.pdf"]
+    reloaded, report = run(papers, cache_dir)
+    assert report["chunks_embedded"] == 0 and reloaded.index.ntotal == 2
+
+
+def test_touched_but_identical_file_is_not_reembedded(tmp_path):
+    papers, cache_dir = tmp_path / "papers", tmp_path / "index"
+    papers.mkdir()
+    write_pdf(str(papers / "a.pdf"), [["attention heads"]])
+    run(papers, cache_dir)
+    stat = os.stat(papers / "a.pdf")
+    os.utime(papers / "a.pdf", (stat.st_atime, stat.st_mtime + 10))
+
+    _, report = run(papers, cache_dir)
+    assert report["modified"] == [] and report["chunks_embedded"] == 0
+
+
+def test_settings_change_rebuilds_everything(tmp_path):
+    papers, cache_dir = tmp_path / "papers", tmp_path / "index"
+    papers.mkdir()
+    write_pdf(str(papers / "a.pdf"), [["attention heads"]])
+    run(papers, cache_dir)
+
+    key = ingest.settings_key(500, 0, "other-model")
+    vectors, report = run(papers, cache_dir, key)
+    assert report["added"] == ["a.pdf"] and vectors.index.ntotal == 1
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(len(texts))
+        return super().embed_documents(texts)
+
+
+def test_stream_into_index_embeds_bounded_batches():
+    def chunks():
+        for i in range(10):
+            yield Document(page_content=f"chunk number {i}", metadata={"i": i})
+
+    embeddings = CountingEmbeddings()
+    ids = [f"id-{i}" for i in range(10)]
+    vectors = ingest.stream_into_index(chunks(), embeddings, batch_size=4, ids=ids)
+    assert embeddings.batches == [4, 4, 2]
+    assert vectors.index.ntotal == 10 and list(vectors.index_to_docstore_id.values()) == ids
+    assert vectors.docstore.search("id-7").metadata == {"i": 7}
+
+    # Appending to an existing store keeps the earlier chunks
+    vectors = ingest.stream_into_index([Document(page_content="extra")], embeddings, 4, vectors, ["id-10"])
+    assert vectors.index.ntotal == 11
+
+
+def test_stream_into_index_of_nothing_is_none():
+    assert ingest.stream_into_index(iter([]), HashingEmbeddings(), 4) is None
+
+
+def test_iter_chunks_is_lazy():
+    pulled = []
+
+    def pages():
+        for i in range(100):
+            pulled.append(i)
+            yield Document(page_content=f"page {i}")
+
+    chunks = ingest.iter_chunks(pages(), SPLITTER, pages_per_batch=8)
+    assert next(chunks).page_content == "page 0"
+    assert len(pulled) == 8
@@ -0,0 +1,28 @@
+import asyncio
+
+from rag_common.fakes import FakeChatServer
+from rag_common.llm_client import GroqClient
+from rag_common.ratelimit import QuotaLimiter
+
+
+def test_idle_client_sends_large_request_without_waiting():
+    # About 5000 prompt tokens + 256 reserved for the completion, under the default 6000 TPM
+    body = {"model": "fake", "messages": [{"role": "user", "content": "word " * 4000}]}
+    with FakeChatServer(first_token_latency=0.0) as server:
+        client = GroqClient("test", server.base_url)
+        assert client.estimate_tokens(body) > 5000
+
+        async def main():
+            try:
+                return await client.complete(body)
+            finally:
+                await client.aclose()
+
+        asyncio.run(main())
+    assert client.stats["throttled_s"] < 0.05
+    assert client.stats["retries"] == 0
+
+
+def test_request_above_quota_waits_only_for_a_full_bucket():
+    limiter = QuotaLimiter(0, 6000)
+    assert asyncio.run(limiter.acquire(8000)) < 0.05
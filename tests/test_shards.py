@@ -0,0 +1,83 @@
+import asyncio
+import random
+
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.corpus import WORDS, write_pdf
+from rag_common import doc_index, shards
+from rag_common.bm25 import BM25Index
+from rag_common.config import Config
+from rag_common.fakes import HashingEmbeddings
+from rag_common.hybrid import RetrievalIndex
+
+TOPICS = ["attention heads", "retrieval index", "learning rate", "gradient descent", "token embedding",
+          "benchmark dataset", "memory latency", "query vector"]
+# Random word mixes, so no two chunks tie on distance to a query
+_rng = random.Random(0)
+TEXTS = [" ".join(_rng.choices(WORDS, k=_rng.randint(5, 15))) for _ in range(40)]
+
+
+def index_over(texts, ids, hybrid):
+    vectors = FAISS.from_texts(texts, HashingEmbeddings(), ids=ids)
+    return RetrievalIndex(vectors, BM25Index.build(ids, texts) if hybrid else None, k=4, fetch_k=10)
+
+
+def split(hybrid, count=3):
+    ids = [str(i) for i in range(len(TEXTS))]
+    parts = [[i for i in range(len(TEXTS)) if i % count == s] for s in range(count)]
+    shard_list = [index_over([TEXTS[i] for i in part], [ids[i] for i in part], hybrid) for part in parts]
+    return shards.ShardedIndex(shard_list, k=4, fetch_k=10), index_over(TEXTS, ids, hybrid)
+
+
+def contents(documents):
+    return [doc.page_content for doc in documents]
+
+
+def test_partition_is_stable_and_complete():
+    paths = [f"dir/paper{i}.pdf" for i in range(50)]
+    groups = shards.partition(paths, 4)
+    assert sorted(p for group in groups for p in group) == sorted(paths)
+    assert all(shards.shard_of(p, 4) == s for s, group in enumerate(groups) for p in group)
+    # Adding files never moves existing ones
+    more = shards.partition(paths + [f"new{i}.pdf" for i in range(10)], 4)
+    assert all(set(group) <= set(bigger) for group, bigger in zip(groups, more))
+
+
+def test_dense_fan_out_matches_a_single_index():
+    sharded, single = split(hybrid=False)
+    assert len(sharded) == len(TEXTS)
+    queries = ["retrieval index", "learning rate gradient", "memory latency compute cluster"]
+    assert [contents(docs) for docs in sharded.search_batch(queries)] == \
+        [contents(docs) for docs in single.search_batch(queries)]
+
+
+def test_hybrid_fan_out_finds_the_best_match_in_any_shard():
+    sharded, _ = split(hybrid=True)
+    retriever = sharded.as_retriever()
+    for i in (0, 5, 13):
+        query = TEXTS[i]
+        assert contents(retriever.invoke(query))[0] == query
+        assert contents(asyncio.run(retriever.ainvoke(query)))[0] == query
+        embedding = HashingEmbeddings().embed_query(query)
+        assert contents(retriever.invoke(query, embedding=embedding)) == contents(retriever.invoke(query))
+
+
+def test_sharded_index_from_config(tmp_path, monkeypatch):
+    papers = tmp_path / "papers"
+    papers.mkdir()
+    for i, topic in enumerate(TOPICS):
+        write_pdf(str(papers / f"{i}.pdf"), [[f"{topic} paper number {i}"]])
+    monkeypatch.setattr(Config, "SHARDS", 3)
+    monkeypatch.setattr(Config, "SHARD_CACHE_DIR", str(tmp_path / "shards"))
+    monkeypatch.setattr(Config, "SPLITTER", "recursive")
+    monkeypatch.setattr(Config, "PDF_WORKERS", 1)
+    index = doc_index.load_retrieval_index(str(papers), HashingEmbeddings())
+    assert isinstance(index, shards.ShardedIndex) and len(index) == len(TOPICS)
+    assert contents(index.search("gradient descent paper number 3"))[0] == "gradient descent paper number 3"
+
+    # Editing one PDF only re-ingests its own shard
+    shard = shards.shard_of("3.pdf", 3)
+    write_pdf(str(papers / "3.pdf"), [["stochastic optimisation paper number 3"]])
+    files = shards.partition(sorted(p.name for p in papers.iterdir()), 3)
+    reports = [doc_index.update_shard(str(papers), HashingEmbeddings(), s, files[s])[1] for s in range(3)]
+    assert [report["modified"] for report in reports] == [["3.pdf"] if s == shard else [] for s in range(3)]
@@ -0,0 +1,50 @@
+import threading
+import time
+
+from rag_common.shared_store import SharedIndex
+
+
+def test_concurrent_sessions_build_once():
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.05)
+        return object()
+
+    shared = SharedIndex(build)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(shared.ensure_built())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert len(set(map(id, results))) == 1 and shared.version == 1
+
+
+def test_rebuild_swaps_without_touching_the_published_store():
+    stores = iter([["v1"], ["v2"]])
+    shared = SharedIndex(lambda: next(stores))
+    first = shared.ensure_built()
+    second = shared.rebuild()
+    # A reader holding the first store still sees it unchanged
+    assert first == ["v1"] and second == ["v2"]
+    assert shared.snapshot() == (["v2"], 2)
+    assert shared.ensure_built() is second
+
+
+def test_readers_are_not_blocked_by_a_rebuild():
+    release = threading.Event()
+    shared = SharedIndex(lambda: "old")
+    shared.ensure_built()
+    shared._build_fn = lambda: release.wait(5) and "new"
+    rebuild = threading.Thread(target=shared.rebuild)
+    rebuild.start()
+    time.sleep(0.02)
+    start = time.perf_counter()
+    assert shared.get() == "old" and shared.snapshot() == ("old", 1)
+    assert time.perf_counter() - start < 0.5
+    release.set()
+    rebuild.join()
+    assert shared.snapshot() == ("new", 2)
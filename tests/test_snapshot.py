@@ -0,0 +1,79 @@
+import pytest
+from langchain_community.vectorstores import FAISS
+
+from rag_common import index_factory, snapshot
+from rag_common.bm25 import BM25Index
+from rag_common.fakes import HashingEmbeddings
+from rag_common.hybrid import RetrievalIndex
+from rag_common.index_factory import IndexSpec
+
+TEXTS = [f"chunk {i} about {topic} and {other}" for i, (topic, other) in enumerate(
+    [("attention", "heads"), ("retrieval", "index"), ("learning", "rate"), ("gradient", "descent"),
+     ("token", "embedding"), ("benchmark", "dataset"), ("memory", "latency"), ("query", "vector")] * 60)]
+
+
+def build(embeddings, bm25=True):
+    ids = [f"id-{i}" for i in range(len(TEXTS))]
+    metadatas = [{"source": f"paper{i % 5}.pdf", "page": i % 7} for i in range(len(TEXTS))]
+    vectors = FAISS.from_texts(TEXTS, embeddings, metadatas=metadatas, ids=ids)
+    return RetrievalIndex(vectors, BM25Index.build(ids, TEXTS) if bm25 else None, k=4, fetch_k=20)
+
+
+def contents(documents):
+    return [(doc.page_content, doc.metadata) for doc in documents]
+
+
+@pytest.mark.parametrize("bm25", [True, False])
+def test_loaded_snapshot_retrieves_like_the_source_index(tmp_path, bm25):
+    embeddings = HashingEmbeddings(dim=64)
+    index = build(embeddings, bm25)
+    path = str(tmp_path / "index.ragsnap")
+    manifest = snapshot.export_snapshot(index, path, embeddings, "hashing", {"chunk_size": 1000})
+    assert manifest["chunks"] == len(TEXTS)
+
+    loaded = snapshot.load_snapshot(path, embeddings, "hashing", k=4, fetch_k=20)
+    assert (loaded.bm25 is not None) == bm25 and len(loaded) == len(TEXTS)
+    queries = ["retrieval index", "chunk 17", "memory latency query"]
+    assert [contents(docs) for docs in loaded.search_batch(queries)] == \
+        [contents(docs) for docs in index.search_batch(queries)]
+    assert contents(loaded.as_retriever().invoke("gradient descent")) == \
+        contents(index.as_retriever().invoke("gradient descent"))
+
+
+def test_ann_index_round_trips(tmp_path):
+    embeddings = HashingEmbeddings(dim=64)
+    index = build(embeddings)
+    index_factory.load_or_convert(index.vectors, IndexSpec("hnsw", ef_search=64))
+    path = str(tmp_path / "index.ragsnap")
+    snapshot.export_snapshot(index, path, embeddings, "hashing")
+    loaded = snapshot.load_snapshot(path, embeddings, "hashing")
+    assert type(loaded.vectors.index).__name__ == type(index.vectors.index).__name__
+    assert contents(loaded.search_batch(["token embedding"])[0]) == contents(index.search_batch(["token embedding"])[0])
+
+
+def test_wrong_model_and_corruption_are_rejected(tmp_path):
+    embeddings = HashingEmbeddings(dim=64)
+    path = tmp_path / "index.ragsnap"
+    snapshot.export_snapshot(build(embeddings), str(path), embeddings, "hashing")
+    with pytest.raises(ValueError, match="built with"):
+        snapshot.load_snapshot(str(path), embeddings, "another-model")
+    with pytest.raises(ValueError, match="-d vectors"):
+        snapshot.load_snapshot(str(path), HashingEmbeddings(dim=32), "hashing")
+
+    data = bytearray(path.read_bytes())
+    section = snapshot.Snapshot(str(path)).sections["texts"]
+    data[section["offset"]] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="checksum mismatch in section 'texts'"):
+        snapshot.load_snapshot(str(path), embeddings, "hashing")
+    with pytest.raises(ValueError, match="not an index snapshot"):
+        (tmp_path / "other").write_bytes(b"x" * 100)
+        snapshot.Snapshot(str(tmp_path / "other"))
+
+
+def test_empty_index_is_not_exported(tmp_path):
+    embeddings = HashingEmbeddings(dim=64)
+    index = build(embeddings)
+    index.vectors.delete(list(index.vectors.index_to_docstore_id.values()))
+    with pytest.raises(ValueError):
+        snapshot.export_snapshot(index, str(tmp_path / "empty.ragsnap"), embeddings, "hashing")
@@ -0,0 +1,52 @@
+from rag_common.splitter import RegexTokenizer, TokenAwareSplitter
+
+TOKENIZER = RegexTokenizer()
+SENTENCE = "The model attends to every token in the sequence with several heads."
+
+
+def tokens(text):
+    return len(TOKENIZER.encode_batch([text])[0].offsets)
+
+
+def paragraphs(count, sentences=4):
+    return "\n\n".join(" ".join([SENTENCE] * sentences) for _ in range(count))
+
+
+def test_chunks_fit_the_token_budget_and_are_slices_of_the_text():
+    text = paragraphs(12)
+    splitter = TokenAwareSplitter(TOKENIZER, chunk_size=60, chunk_overlap=10)
+    chunks = splitter.split_text(text)
+    assert len(chunks) > 5
+    assert all(tokens(chunk) <= 60 for chunk in chunks)
+    assert all(chunk in text for chunk in chunks)
+    # Together the chunks cover the whole text
+    assert chunks[0] == text[:len(chunks[0])] and text.endswith(chunks[-1])
+
+
+def test_chunks_end_at_the_best_boundary():
+    text = paragraphs(6, sentences=3)
+    chunks = TokenAwareSplitter(TOKENIZER, chunk_size=50, chunk_overlap=0).split_text(text)
+    # One paragraph is 3 x 14 = 42 tokens: every chunk is a whole paragraph
+    assert chunks == [" ".join([SENTENCE] * 3)] * 6
+    # Without paragraphs, chunks end at sentence ends
+    flat = " ".join([SENTENCE] * 10)
+    assert all(chunk.endswith(".") for chunk in TokenAwareSplitter(TOKENIZER, 50, 0).split_text(flat))
+
+
+def test_overlap_repeats_the_end_of_the_previous_chunk():
+    text = " ".join(f"word{i}" for i in range(200))
+    chunks = TokenAwareSplitter(TOKENIZER, chunk_size=50, chunk_overlap=10).split_text(text)
+    for first, second in zip(chunks, chunks[1:]):
+        assert first.split()[-10:] == second.split()[:10]
+
+
+def test_create_documents_keeps_metadata_and_start_index():
+    text = paragraphs(4)
+    splitter = TokenAwareSplitter(TOKENIZER, chunk_size=60, chunk_overlap=0, add_start_index=True)
+    documents = splitter.create_documents([text, "", "short text"], [{"page": 1}, {"page": 2}, {"page": 3}])
+    assert [doc.metadata["page"] for doc in documents][-1] == 3
+    assert 2 not in [doc.metadata["page"] for doc in documents]
+    for doc in documents:
+        source = text if doc.metadata["page"] == 1 else "short text"
+        start = doc.metadata["start_index"]
+        assert source[start:start + len(doc.page_content)] == doc.page_content
@@ -0,0 +1,34 @@
+import time
+
+from rag_common.streaming import StreamTimer
+
+
+def stream(first_delay, chunks, delay):
+    time.sleep(first_delay)
+    for i in range(chunks):
+        if i:
+            time.sleep(delay)
+        yield f"chunk{i} "
+
+
+def test_generation_time_excludes_work_before_the_stream():
+    start = time.perf_counter()
+    # Stands in for retrieval and rerank before the LLM request
+    time.sleep(0.2)
+    timer = StreamTimer(stream(0.05, 5, 0.01), start)
+    assert "".join(timer) == timer.text == "chunk0 chunk1 chunk2 chunk3 chunk4 "
+    assert timer.chunks == 5
+    assert timer.time_to_first_token >= 0.25
+    assert timer.total_time >= 0.29
+    assert 0.09 <= timer.generation_time < 0.2
+    # Four chunks after the first, about 10ms apart
+    assert 40 < timer.chunks_per_second <= 100
+    summary = timer.summary()
+    assert "generation" in summary and "chunks/s" in summary
+
+
+def test_no_chunks():
+    timer = StreamTimer(iter([]))
+    assert list(timer) == []
+    assert timer.time_to_first_token is None and timer.chunks_per_second is None
+    assert timer.summary().startswith("generation")